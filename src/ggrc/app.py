@@ -150,6 +150,13 @@ def init_permissions_provider():
   permissions.get_permissions_provider()
 
 
+def init_json_publishers():
+  """Compile JSON publishers of all models before the first request."""
+  import ggrc.builder.json
+  from ggrc.models import all_models
+  ggrc.builder.json.compile_publishers(all_models.all_models)
+
+
 def init_extra_listeners():
   """Initializes listeners for additional services"""
   from ggrc.automapper import register_automapping_listeners
@@ -246,6 +253,7 @@ init_extension_blueprints(app)
 init_indexer()
 init_permissions_provider()
 init_extra_listeners()
+init_json_publishers()
 notifications.register_notification_listeners()
 
 _enable_debug_toolbar()
@@ -5,14 +5,16 @@ from datetime import datetime
 from logging import getLogger
 import collections
 
-from sqlalchemy.sql.expression import tuple_
+from sqlalchemy import select
 
 from ggrc import db
 from ggrc import models
+from ggrc.automapper.graph import RelationshipGraph
+from ggrc.automapper.graph import Stub
 from ggrc.automapper.rules import rules
 from ggrc.login import get_current_user
 from ggrc.models.relationship import Relationship
-from ggrc.rbac.permissions import is_allowed_update
+from ggrc.rbac.permissions import allowed_update_ids
 from ggrc.services.common import get_cache
 from ggrc.services import signals
 from ggrc.utils import benchmark, with_nop
@@ -22,24 +24,22 @@ from ggrc.utils import benchmark, with_nop
 logger = getLogger(__name__)
 
 
-class Stub(collections.namedtuple("Stub", ["type", "id"])):
-
-  @classmethod
-  def from_source(cls, relationship):
-    return Stub(relationship.source_type, relationship.source_id)
-
-  @classmethod
-  def from_destination(cls, relationship):
-    return Stub(relationship.destination_type, relationship.destination_id)
-
-
 class AutomapperGenerator(object):
+  """Generator of automappings for new relationships.
 
-  def __init__(self, use_benchmark=True):
+  The relationships subgraph around the new relationship is loaded into an
+  in-memory graph one BFS level at a time, so each level costs a single
+  relationships query no matter how many objects it contains. Rules are
+  evaluated against that graph and all new edges are inserted at once.
+  """
+
+  def __init__(self, use_benchmark=True, graph=None):
     self.processed = set()
     self.queue = set()
-    self.cache = collections.defaultdict(set)
+    self.graph = graph if graph is not None else RelationshipGraph(
+        types=rules.types)
     self.instance_cache = {}
+    self.permission_cache = {}
     self.auto_mappings = set()
     if use_benchmark:
       self.benchmark = benchmark
@@ -47,48 +47,7 @@ class AutomapperGenerator(object):
       self.benchmark = with_nop
 
   def related(self, obj):
-    if obj in self.cache:
-      return self.cache[obj]
-    # Pre-fetch neighborhood for enqueued object since we're gonna need that
-    # results in a few steps. This drastically reduces number of queries.
-    stubs = {s for rel in self.queue for s in rel}
-    stubs.add(obj)
-    # Union is here to convince mysql to use two separate indices and
-    # merge te results. Just using `or` results in a full-table scan
-    # Manual column list avoids loading the full object which would also try to
-    # load related objects
-    cols = db.session.query(
-        Relationship.source_type, Relationship.source_id,
-        Relationship.destination_type, Relationship.destination_id)
-    relationships = cols.filter(
-        tuple_(Relationship.source_type, Relationship.source_id).in_(
-            [(s.type, s.id) for s in stubs]
-        )
-    ).union_all(
-        cols.filter(
-            tuple_(Relationship.destination_type,
-                   Relationship.destination_id).in_(
-                       [(s.type, s.id) for s in stubs]))
-    ).all()
-    batch_requests = collections.defaultdict(set)
-    for (src_type, src_id, dst_type, dst_id) in relationships:
-      src = Stub(src_type, src_id)
-      dst = Stub(dst_type, dst_id)
-      # only store a neighbor if we queried for it since this way we know
-      # we'll be storing complete neighborhood by the end of the loop
-      batch_requests[src_type].add(src_id)
-      batch_requests[dst_type].add(dst_id)
-      if src in stubs:
-        self.cache[src].add(dst)
-      if dst in stubs:
-        self.cache[dst].add(src)
-
-    for type_, ids in batch_requests.iteritems():
-      model = getattr(models.all_models, type_)
-      instances = model.query.filter(model.id.in_(ids))
-      for instance in instances:
-        self.instance_cache[Stub(type_, instance.id)] = instance
-    return self.cache[obj]
+    return set(self.graph.neighbors(obj))
 
   def relate(self, src, dst):
     if src < dst:
@@ -104,27 +63,12 @@ class AutomapperGenerator(object):
       # neighborhood
       src = Stub.from_source(relationship)
       dst = Stub.from_destination(relationship)
-      self._step(src, dst)
-      self._step(dst, src)
-      count = 0
-      while len(self.queue) > 0:
+      self._steps([(src, dst), (dst, src)], relationship)
+      while self.queue:
         if len(self.auto_mappings) > rules.count_limit:
           break
-        count += 1
-        src, dst = entry = self.queue.pop()
-
-        if not (self._can_map_to(src, relationship) and
-                self._can_map_to(dst, relationship)):
-          continue
-
-        created = self._ensure_relationship(src, dst)
-        self.processed.add(entry)
-        if not created:
-          # If the edge already exists it means that auto mappings for it have
-          # already been processed and it is safe to cut here.
-          continue
-        self._step(src, dst)
-        self._step(dst, src)
+        level, self.queue = self.queue, set()
+        self._process_level(level, relationship)
 
       if len(self.auto_mappings) <= rules.count_limit:
         self._flush(relationship)
@@ -133,15 +77,55 @@ class AutomapperGenerator(object):
             'automapping_limit_exceeded': True
         }
 
-  def _can_map_to(self, obj, parent_relationship):
-    return is_allowed_update(obj.type, obj.id, parent_relationship.context)
+  def _process_level(self, level, relationship):
+    """Create automappings for all entries of one BFS level."""
+    # A single query loads neighborhoods for the entire level, these are
+    # needed both for checking existing edges and for the next steps.
+    self.graph.load(stub for entry in level for stub in entry)
+    steps = []
+    for entry in level:
+      if len(self.auto_mappings) > rules.count_limit:
+        break
+      src, dst = entry
+      created = self._ensure_relationship(src, dst)
+      self.processed.add(entry)
+      if not created:
+        # If the edge already exists it means that auto mappings for it have
+        # already been processed and it is safe to cut here.
+        continue
+      steps.append((src, dst))
+      steps.append((dst, src))
+    self._steps(steps, relationship)
+
+  def _allowed_stubs(self, stubs, parent_relationship):
+    """Get stubs that can be mapped within parent_relationship.
+
+    Permissions are checked with a single call per type for all stubs that
+    have not been checked yet.
+    """
+    context = parent_relationship.context
+    batch_requests = collections.defaultdict(set)
+    for stub in stubs:
+      if (context, stub) not in self.permission_cache:
+        batch_requests[stub.type].add(stub.id)
+    for type_, ids in batch_requests.iteritems():
+      allowed = self._allowed_ids(type_, ids, context)
+      for id_ in ids:
+        self.permission_cache[context, Stub(type_, id_)] = id_ in allowed
+    return {stub for stub in stubs if self.permission_cache[context, stub]}
+
+  @staticmethod
+  def _allowed_ids(resource_type, resource_ids, context):
+    return allowed_update_ids(resource_type, resource_ids, context)
 
   def _flush(self, parent_relationship):
     if len(self.auto_mappings) == 0:
       return
     with self.benchmark("Automapping flush"):
       current_user = get_current_user()
-      now = datetime.now()
+      # DATETIME columns store whole seconds, and logged content must match
+      # the stored rows
+      now = datetime.now().replace(microsecond=0)
       # We are doing an INSERT IGNORE INTO here to mitigate a race condition
       # that happens when multiple simultaneous requests create the same
       # automapping. If a relationship object fails our unique constraint
@@ -150,8 +134,7 @@ class AutomapperGenerator(object):
       inserter = Relationship.__table__.insert().prefix_with("IGNORE")
       original = self.relate(Stub.from_source(parent_relationship),
                              Stub.from_destination(parent_relationship))
-      db.session.execute(inserter.values([{
-          "id": None,
+      rows = [{
           "modified_by_id": current_user.id,
           "created_at": now,
           "updated_at": now,
@@ -160,48 +143,101 @@ class AutomapperGenerator(object):
           "destination_id": dst.id,
           "destination_type": dst.type,
           "context_id": None,
-          "status": None,
           "automapping_id": parent_relationship.id}
           for src, dst in self.auto_mappings
-          if (src, dst) != original]))  # (src, dst) is sorted
+          if (src, dst) != original]  # (src, dst) is sorted
+      if not rows:
+        return
+      result = db.session.execute(inserter.values(rows))
       cache = get_cache(create=True)
-      if cache:
+      if cache and result.rowcount:
         # Add inserted relationships into new objects collection of the cache,
         # so that they will be logged within event and appropriate revisions
         # will be created.
         cache.new.update(
             (relationship, relationship.log_json())
-            for relationship in Relationship.query.filter_by(
-                automapping_id=parent_relationship.id,
-                modified_by_id=current_user.id,
-                created_at=now,
-                updated_at=now,
-            )
+            for relationship in self._inserted_relationships(
+                parent_relationship, rows)
         )
 
+  @staticmethod
+  def _inserted_relationships(parent_relationship, rows):
+    """Build relationship objects for rows that were not ignored on insert.
+
+    Only ids of the inserted rows are fetched, the objects are built from the
+    insert payload and are never added to the session.
+    """
+    rows_by_key = {
+        (row["source_type"], row["source_id"],
+         row["destination_type"], row["destination_id"]): row
+        for row in rows
+    }
+    table = Relationship.__table__
+    inserted = db.session.execute(
+        select([table.c.id, table.c.source_type, table.c.source_id,
+                table.c.destination_type, table.c.destination_id]).where(
+            table.c.automapping_id == parent_relationship.id)
+    )
+    for id_, src_type, src_id, dst_type, dst_id in inserted:
+      row = rows_by_key.get((src_type, src_id, dst_type, dst_id))
+      if row is not None:
+        yield Relationship(id=id_, **row)
+
+  def _steps(self, steps, parent_relationship):
+    """Enqueue entries implied by rules for all (src, dst) steps.
+
+    Entries with an object that the user is not allowed to update are not
+    enqueued.
+    """
+    self.graph.load(src for src, _ in steps)
+    self._load_instances(src for src, dst in steps
+                         if rules[src.type, dst.type].implicit)
+    entries = set()
+    for src, dst in steps:
+      entries.update(self._step(src, dst))
+    allowed = self._allowed_stubs({stub for entry in entries
+                                   for stub in entry}, parent_relationship)
+    self.queue.update(entry for entry in entries
+                      if entry[0] in allowed and entry[1] in allowed)
+
+  def _load_instances(self, stubs):
+    """Load instances needed for implicit rules with one query per type."""
+    batch_requests = collections.defaultdict(set)
+    for stub in stubs:
+      if stub not in self.instance_cache:
+        batch_requests[stub.type].add(stub.id)
+    for type_, ids in batch_requests.iteritems():
+      model = getattr(models.all_models, type_, None)
+      if model is None:
+        continue
+      for instance in model.query.filter(model.id.in_(ids)):
+        self.instance_cache[Stub(type_, instance.id)] = instance
+      for id_ in ids:
+        self.instance_cache.setdefault(Stub(type_, id_), None)
+
   def _step(self, src, dst):
     explicit, implicit = rules[src.type, dst.type]
-    self._step_explicit(src, dst, explicit)
-    self._step_implicit(src, dst, implicit)
+    for entry in self._step_explicit(src, dst, explicit):
+      yield entry
+    for entry in self._step_implicit(src, dst, implicit):
+      yield entry
 
   def _step_explicit(self, src, dst, explicit):
     if len(explicit) != 0:
-      src_related = (o for o in self.related(src)
-                     if o.type in explicit and o != dst)
-      for r in src_related:
+      for r in self.graph.neighbors(src, explicit):
+        if r == dst:
+          continue
         entry = self.relate(r, dst)
         if entry not in self.processed:
-          self.queue.add(entry)
+          yield entry
 
   def _step_implicit(self, src, dst, implicit):
+    if len(implicit) == 0:
+      return
     if not hasattr(models.all_models, src.type):
       logger.warning('Automapping by attr: cannot find model %s', src.type)
       return
     instance = self.instance_cache.get(src)
-    if instance is None:
-      model = getattr(models.all_models, src.type)
-      instance = model.query.filter(model.id == src.id).first()
-      self.instance_cache[src] = instance
     if instance is None:
       logger.warning("Automapping by attr: cannot load model %s: %s",
                      src.type, src.id)
@@ -215,7 +251,7 @@ class AutomapperGenerator(object):
           if value is not None:
             entry = self.relate(Stub(value.type, value.id), dst)
             if entry not in self.processed:
-              self.queue.add(entry)
+              yield entry
           else:
             logger.warning('Automapping by attr: %s is None', attr.name)
       else:
@@ -225,18 +261,11 @@ class AutomapperGenerator(object):
         )
 
   def _ensure_relationship(self, src, dst):
-    if dst in self.cache.get(src, []):
-      return False
-    if src in self.cache.get(dst, []):
+    if self.graph.has_edge(src, dst):
       return False
 
     self.auto_mappings.add((src, dst))
-
-    if src in self.cache:
-      self.cache[src].add(dst)
-    if dst in self.cache:
-      self.cache[dst].add(src)
-
+    self.graph.add_edge(src, dst)
     return True
 
 
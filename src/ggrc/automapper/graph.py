@@ -0,0 +1,146 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""In-memory relationship graph used by the automapper."""
+
+import array
+import bisect
+import collections
+import itertools
+
+import sqlalchemy as sa
+
+from ggrc import db
+from ggrc.models.relationship import Relationship
+
+
+class Stub(collections.namedtuple("Stub", ["type", "id"])):
+
+  @classmethod
+  def from_source(cls, relationship):
+    return Stub(relationship.source_type, relationship.source_id)
+
+  @classmethod
+  def from_destination(cls, relationship):
+    return Stub(relationship.destination_type, relationship.destination_id)
+
+
+class RelationshipGraph(object):
+  """Adjacency lists of a subgraph of the relationships table.
+
+  Object types are interned into small integers and every node is encoded as
+  a single integer `(type_id << ID_BITS) | id`, so a neighborhood is stored
+  as a sorted int array instead of a set of tuples. Neighborhoods are loaded
+  in bulk for a whole set of nodes at once and edges added in memory are kept
+  in a separate overlay until they are flushed.
+
+  Args:
+    types: if given, only neighbors of these types are loaded.
+    session: session used for loading, defaults to db.session.
+    table: relationships table, can be replaced for benchmarks.
+  """
+
+  ID_BITS = 32
+  ID_MASK = (1 << ID_BITS) - 1
+  CHUNK_SIZE = 1000
+
+  def __init__(self, types=None, session=None, table=None):
+    self.types = frozenset(types) if types is not None else None
+    self.session = session
+    self.table = table if table is not None else Relationship.__table__
+    self.query_count = 0
+    self._type_ids = {}
+    self._type_names = []
+    self._neighbors = {}
+    self._added = collections.defaultdict(set)
+
+  def __contains__(self, stub):
+    """Check if the neighborhood of stub is loaded."""
+    return self._encode(stub) in self._neighbors
+
+  def __len__(self):
+    """Number of nodes with a loaded neighborhood."""
+    return len(self._neighbors)
+
+  def _intern(self, type_):
+    type_id = self._type_ids.get(type_)
+    if type_id is None:
+      type_id = self._type_ids[type_] = len(self._type_names)
+      self._type_names.append(type_)
+    return type_id
+
+  def _encode(self, stub):
+    return (self._intern(stub[0]) << self.ID_BITS) | stub[1]
+
+  def _decode(self, key):
+    return Stub(self._type_names[key >> self.ID_BITS], key & self.ID_MASK)
+
+  def _query(self, stubs):
+    """Get all relationships with one of the stubs on either side."""
+    columns = self.table.c
+    pairs = [(stub.type, stub.id) for stub in stubs]
+    selected = [columns.source_type, columns.source_id,
+                columns.destination_type, columns.destination_id]
+    by_source = sa.select(selected).where(
+        sa.tuple_(columns.source_type, columns.source_id).in_(pairs))
+    by_destination = sa.select(selected).where(
+        sa.tuple_(columns.destination_type, columns.destination_id).in_(pairs))
+    if self.types is not None:
+      by_source = by_source.where(columns.destination_type.in_(self.types))
+      by_destination = by_destination.where(
+          columns.source_type.in_(self.types))
+    # Union is here to convince mysql to use two separate indices and merge
+    # the results. Just using `or` results in a full-table scan.
+    session = self.session if self.session is not None else db.session
+    self.query_count += 1
+    return session.execute(sa.union_all(by_source, by_destination))
+
+  def load(self, stubs):
+    """Load neighborhoods of all given stubs that are not loaded yet."""
+    missing = sorted({self._encode(stub) for stub in stubs} -
+                     self._neighbors.viewkeys())
+    for start in range(0, len(missing), self.CHUNK_SIZE):
+      keys = missing[start:start + self.CHUNK_SIZE]
+      neighbors = {key: [] for key in keys}
+      rows = self._query([self._decode(key) for key in keys])
+      for src_type, src_id, dst_type, dst_id in rows:
+        src = self._encode((src_type, src_id))
+        dst = self._encode((dst_type, dst_id))
+        if src in neighbors:
+          neighbors[src].append(dst)
+        if dst in neighbors:
+          neighbors[dst].append(src)
+      for key, values in neighbors.iteritems():
+        self._neighbors[key] = array.array("l", sorted(set(values)))
+
+  def neighbors(self, stub, types=None):
+    """Get neighbors of stub, optionally only the ones of the given types."""
+    key = self._encode(stub)
+    if key not in self._neighbors:
+      self.load([stub])
+    keys = itertools.chain(self._neighbors[key], self._added.get(key, ()))
+    if types is None:
+      return [self._decode(neighbor) for neighbor in keys]
+    type_ids = {self._type_ids[type_] for type_ in types
+                if type_ in self._type_ids}
+    return [self._decode(neighbor) for neighbor in keys
+            if neighbor >> self.ID_BITS in type_ids]
+
+  def has_edge(self, src, dst):
+    """Check if src and dst are connected in the loaded part of the graph."""
+    src_key, dst_key = self._encode(src), self._encode(dst)
+    if dst_key in self._added.get(src_key, ()):
+      return True
+    for key, neighbor in ((src_key, dst_key), (dst_key, src_key)):
+      values = self._neighbors.get(key)
+      if values is not None:
+        index = bisect.bisect_left(values, neighbor)
+        if index < len(values) and values[index] == neighbor:
+          return True
+    return False
+
+  def add_edge(self, src, dst):
+    """Add an edge that is not stored in the database yet."""
+    src_key, dst_key = self._encode(src), self._encode(dst)
+    self._added[src_key].add(dst_key)
+    self._added[dst_key].add(src_key)
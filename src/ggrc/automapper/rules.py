@@ -102,10 +102,15 @@ class RuleSet(object):
     self._freeze()
 
   def _freeze(self):
+    types = set()
     for key in self._rules:
       explicit, implicit = self._rules[key]
       self._rules[key] = RuleSet.Entry(frozenset(explicit),
                                        frozenset(implicit))
+      types.update(key)
+      types.update(explicit)
+    # all types that can take part in an automapping by explicit rules
+    self.types = frozenset(types)
 
   def __getitem__(self, key):
     if key in self._rules:
@@ -6,9 +6,13 @@
 # pylint: disable=no-name-in-module
 # false positive for RelationshipProperty
 
+import collections
+import operator
 from datetime import datetime
 
 from flask import g
+from flask import has_request_context
+from flask import request
 import iso8601
 import sqlalchemy
 from sqlalchemy.ext.associationproxy import AssociationProxy
@@ -45,6 +49,15 @@ def get_json_builder(obj):
   return builder
 
 
+def compile_publishers(models):
+  """Compile attribute publishers with default inclusions for all models."""
+  sqlalchemy.orm.configure_mappers()
+  for model in models:
+    builder = get_json_builder(model)
+    if getattr(builder, '_publish_attrs', []):
+      builder.get_attr_publishers(model, builder.get_inclusions())
+
+
 def publish_base_properties(obj):
   """Return a dict with selfLink and viewLink for obj."""
   ret = {}
@@ -295,146 +308,78 @@ class UpdateAttrHandler(object):
 
 
 """
-Builder strategy:
-  * For each non-present attribute, return an "AttributeBuilder" instance
-    which describes the objects needed to complete the representation.
-  * Maintain a set of requested (type, condition, stub_only?) tuples
-  * stub_only? tuples can be requested en-masse via UNION queries
-  * non-stub_only? tuples can override stub_only? tuples with identical
-    conditions
-  * When all available object representations have been built:
-
-Query types:
-  (type, id) -> explicit link
-  (type, { keyX: valX, ... }) -> an actual query
-    note, keyX row/object values must be included in response to distinguish
-    results from aggregated queries on the same type
-  (type, [id, { keyX: valX, ... }, id2, { keyY: valY }, ...]) ->
-    an already-aggregated list of conditions
-
-Query combination:
-  (type, id) -> aggregate into "id IN (...)"
-  (type, {}) -> aggregate into "...OR keyX = valX OR keyY = valY"
-
-Query construction:
-  pass
-
-Result storing:
-  { type: { id: <result>, (keyX, ...): { (valX, ...): [<result>, ...] } } }
-
-Result dispatch:
-  singles = { (type, id): [<Builder>, ...] }
+Stub resolution:
+  * Publishing returns LazyStubRepresentation placeholders for objects that
+    are represented only by their stubs.
+  * publish_representation finds all placeholders and their locations in a
+    single walk over the representation.
+  * Placeholders are grouped by (type, condition keys) and every group is
+    resolved with "id IN (...)" or "(keyX, keyY) IN ((...), ...)" queries.
+  * Rendered stubs are put directly to the recorded locations and kept in a
+    per-request cache keyed by (type, condition keys, condition values).
 """
 
+# Maximum number of values in the IN clause of a single stub query.
+STUB_QUERY_CHUNK_SIZE = 1000
 
-def build_type_query(type_, result_spec):
-  model = ggrc.models.get_model(type_)
-  mapper = model._sa_class_manager.mapper
-  columns = []
-  columns_indexes = {}
+
+def _get_type_column(mapper):
+  """Get a column with the model name of every row of the mapper."""
   if len(list(mapper.self_and_descendants)) == 1:
-    type_column = sqlalchemy.literal(mapper.class_.__name__)
-  else:
-    # Handle polymorphic types with CASE
-    type_column = sqlalchemy.case(
-        value=mapper.polymorphic_on,
-        whens={
-            val: mapper.class_.__name__
-            for val, mapper in mapper.polymorphic_map.items()
-        })
-  columns.append(type_column)
-  columns_indexes['type'] = 0
-  columns.append(model.id)
-  columns_indexes['id'] = 1
-  columns.append(mapper.c.context_id)
-  columns_indexes['context_id'] = 2
-  columns.append(mapper.c.updated_at)
-  columns_indexes['updated_at'] = 3
-
-  conditions = {}
-  for keys, vals in result_spec.items():
-    for key in keys:
-      if key not in columns_indexes:
-        columns_indexes[key] = len(columns)
-        columns.append(mapper.c[key])
-    conditions.setdefault(keys, []).extend(vals.keys())
-
-  where_clauses = []
-  for keys, vals in conditions.items():
-    if len(keys) == 1:
-      # If the key is singular, use `IN (...)`
-      where_clauses.append(
-          columns[columns_indexes[keys[0]]].in_([v[0] for v in vals]))
-    else:
-      # If multiple keys, build `OR` of multiple `AND` clauses
-      clauses = []
-      cols = [columns[columns_indexes[k]] for k in keys]
-      for val in vals:
-        # Now build OR clause with (key, val) pairs
-        clause = []
-        for i, _ in enumerate(val):
-          clause.append(cols[i] == val[i])
-        clauses.append(sqlalchemy.and_(*clause))
-      where_clauses.append(sqlalchemy.or_(*clauses))
-  where_clause = sqlalchemy.or_(*where_clauses)
-
-  query = db.session.query(*columns).filter(where_clause)
-
-  return columns_indexes, query
-
-
-def build_stub_union_query(queries):
-  results = {}
-  for (type_, conditions) in queries:
-    if isinstance(conditions, (int, long, str, unicode)):
-      # Assume `id` query
-      keys, vals = ('id',), (conditions,)
-      results.setdefault(type_, {}).setdefault(keys, {}).setdefault(vals, [])
-    elif isinstance(conditions, dict):
-      keys, vals = zip(*sorted(conditions.items()))
-      results.setdefault(type_, {}).setdefault(keys, {}).setdefault(vals, [])
-    else:
-      # FIXME: Handle aggregated conditions recursively
-      pass
-
-  column_count = 0
-  type_column_indexes = {}
-  type_queries = {}
-  for (type_, result_spec) in results.items():
-    columns_indexes, query = build_type_query(type_, result_spec)
-    type_column_indexes[type_] = columns_indexes
-    type_queries[type_] = query
-    if len(columns_indexes) > column_count:
-      column_count = len(columns_indexes)
-
-  for (type_, query) in type_queries.items():
-    for _ in range(column_count - len(type_column_indexes[type_])):
-      query = query.add_column(sqlalchemy.literal(None))
-    type_queries[type_] = query
-
-  queries_for_union = type_queries.values()
-  if len(queries_for_union) == 0:
-    query = None
-  elif len(queries_for_union) == 1:
-    query = queries_for_union[0]
-  else:
-    query = db.session.query(
-        sqlalchemy.sql.expression.union(
-            *[q for q in type_queries.values()]).alias('union_query'))
-  return results, type_column_indexes, query
+    return sqlalchemy.literal(mapper.class_.__name__)
+  # Handle polymorphic types with CASE
+  return sqlalchemy.case(
+      value=mapper.polymorphic_on,
+      whens={
+          val: sub_mapper.class_.__name__
+          for val, sub_mapper in mapper.polymorphic_map.items()
+      })
 
 
-def _render_stub_from_match(match, type_columns):
-  type_ = match[type_columns['type']]
-  id_ = match[type_columns['id']]
+def _render_stub(type_, id_, context_id):
   return {
       'type': type_,
       'id': id_,
-      'context_id': match[type_columns['context_id']],
+      'context_id': context_id,
       'href': url_for(type_, id=id_),
   }
 
 
+def query_stubs(type_, condition_key, condition_vals):
+  """Render stubs of objects of a type that match given condition values.
+
+  Args:
+    type_: model name.
+    condition_key: tuple of column names.
+    condition_vals: iterable of value tuples for the condition_key columns.
+
+  Returns:
+    dict with rendered stubs of found objects by their condition values.
+  """
+  model = ggrc.models.get_model(type_)
+  mapper = model._sa_class_manager.mapper
+  key_columns = [mapper.c[key] for key in condition_key]
+  query = db.session.query(
+      _get_type_column(mapper),
+      model.id,
+      mapper.c.context_id,
+      *key_columns
+  )
+  if len(key_columns) == 1:
+    key_clause = key_columns[0]
+    condition_vals = [val[0] for val in condition_vals]
+  else:
+    key_clause = sqlalchemy.tuple_(*key_columns)
+    condition_vals = list(condition_vals)
+
+  stubs = {}
+  for start in range(0, len(condition_vals), STUB_QUERY_CHUNK_SIZE):
+    chunk = condition_vals[start:start + STUB_QUERY_CHUNK_SIZE]
+    for row in query.filter(key_clause.in_(chunk)):
+      stubs[tuple(row[3:])] = _render_stub(row[0], row[1], row[2])
+  return stubs
+
+
 class LazyStubRepresentation(object):
 
   def __init__(self, type_, conditions):
@@ -444,20 +389,9 @@ class LazyStubRepresentation(object):
     self.conditions = conditions
     self.condition_key, self.condition_val = zip(*sorted(conditions.items()))
 
-  def get_matches(self, results):
-    return results\
-        .get(self.type, {})\
-        .get(self.condition_key, {})\
-        .get(self.condition_val, [])
-
-  def render(self, results, type_columns):
-    matches = self.get_matches(results)
-    assert len(matches) <= 1, (results, self.type, self.condition_key,
-                               self.condition_val)
-    if len(matches) == 1:
-      return _render_stub_from_match(matches[0], type_columns[self.type])
-    else:
-      return None
+  @property
+  def cache_key(self):
+    return self.type, self.condition_key, self.condition_val
 
 
 def walk_representation(obj):  # noqa
@@ -483,42 +417,59 @@ def walk_representation(obj):  # noqa
         yield value, index, obj
 
 
-def gather_queries(resource):
-  queries = []
-  for val, key, obj in walk_representation(resource):
-    if isinstance(val, LazyStubRepresentation):
-      queries.append((val.type, val.conditions))
-  return queries
+def gather_stubs(resource):
+  """Get all lazy stubs in the resource with the container and key of each."""
+  return [(val, key, obj)
+          for val, key, obj in walk_representation(resource)
+          if isinstance(val, LazyStubRepresentation)]
 
 
-def reify_representation(resource, results, type_columns):
-  for val, key, obj in walk_representation(resource):
-    if isinstance(val, LazyStubRepresentation):
-      obj[key] = val.render(results, type_columns)
-  return resource
+def _get_stub_cache():
+  """Get the stub cache of the current request.
 
+  Objects can change during requests that modify data, so rendered stubs are
+  only cached for the whole request on GET requests.
+  """
+  if has_request_context() and request.method in ("GET", "HEAD"):
+    if not hasattr(g, "rendered_stubs"):
+      g.rendered_stubs = {}
+    return g.rendered_stubs
+  return {}
 
-def publish_representation(resource):
-  queries = gather_queries(resource)
 
-  if len(queries) == 0:
+def publish_representation(resource):
+  """Replace all lazy stubs in the resource with rendered stubs."""
+  stubs = gather_stubs(resource)
+  if not stubs:
     return resource
-  else:
-    results, type_columns, query = build_stub_union_query(queries)
-    rows = query.all()
-    for row in rows:
-      type_ = row[0]
-      for columns, matches in results[type_].items():
-        vals = tuple(row[type_columns[type_][c]] for c in columns)
-        if vals in matches:
-          matches[vals].append(row)
 
-    return reify_representation(resource, results, type_columns)
+  cache = _get_stub_cache()
+  missing = collections.defaultdict(set)
+  for stub, _, _ in stubs:
+    if stub.cache_key not in cache:
+      missing[stub.type, stub.condition_key].add(stub.condition_val)
+  for (type_, condition_key), condition_vals in missing.iteritems():
+    rendered = query_stubs(type_, condition_key, condition_vals)
+    for condition_val in condition_vals:
+      cache[type_, condition_key, condition_val] = rendered.get(condition_val)
+
+  for stub, key, obj in stubs:
+    rendered = cache[stub.cache_key]
+    # every location gets its own copy of the shared stub
+    obj[key] = dict(rendered) if rendered is not None else None
+  return resource
 
 
 class Builder(AttributeInfo):
   """JSON Dictionary builder for ggrc.models.* objects and their mixins."""
 
+  MAX_COMPILED_PUBLISHERS = 100
+
+  def __init__(self, tgt_class):
+    super(Builder, self).__init__(tgt_class)
+    # (class, inclusions) -> list of (attr_name, publisher) pairs
+    self._compiled_publishers = {}
+
   def generate_link_object_for(
           self, obj, inclusions, include, inclusion_filter):
     """Generate a link object for this object. If there are property paths
@@ -672,23 +623,114 @@ class Builder(AttributeInfo):
 
     return result
 
-  def _publish_attrs_for(
-          self, obj, attrs, json_obj, inclusions=None, inclusion_filter=None):
-    if inclusions is None:
-      inclusions = []
-    for attr in attrs:
-      if hasattr(attr, '__call__'):
-        attr_name = attr.attr_name
-      else:
-        attr_name = attr
-      local_inclusion = ()
-      for inclusion in inclusions:
-        if inclusion[0] == attr_name:
-          local_inclusion = inclusion
-          break
-      json_obj[attr_name] = self.publish_attr(
-          obj, attr_name, local_inclusion[1:], len(local_inclusion) > 0,
-          inclusion_filter)
+  def _compile_relationship_publisher(
+          self, attr_name, class_attr, inclusions, include):
+    """Get a publisher function for a relationship attribute."""
+    prop = class_attr.property
+    if prop.uselist or include or prop.backref:
+      return lambda obj, inclusion_filter: self.publish_relationship(
+          obj, attr_name, class_attr, inclusions, include, inclusion_filter)
+    target_name = list(prop.local_columns)[0].key
+    if prop.mapper.class_.__mapper__.polymorphic_on is not None:
+      def publish_polymorphic_stub(obj, _):
+        attr_value = getattr(obj, target_name)
+        if attr_value is None:
+          return None
+        target_type = getattr(obj, attr_name).__class__.__name__
+        return LazyStubRepresentation(target_type, attr_value)
+      return publish_polymorphic_stub
+    target_type = prop.mapper.class_.__name__
+
+    def publish_stub(obj, _):
+      attr_value = getattr(obj, target_name)
+      if attr_value is None:
+        return None
+      return LazyStubRepresentation(target_type, attr_value)
+    return publish_stub
+
+  def _compile_association_proxy_publisher(
+          self, attr_name, class_attr, inclusions, include):
+    """Get a publisher function for an association proxy attribute."""
+    if getattr(class_attr, 'publish_raw', False):
+      def publish_raw(obj, _):
+        published_attr = getattr(obj, attr_name)
+        if hasattr(published_attr, "copy"):
+          return published_attr.copy()
+        return published_attr
+      return publish_raw
+    return lambda obj, inclusion_filter: self.publish_association_proxy(
+        obj, attr_name, class_attr, inclusions, include, inclusion_filter)
+
+  def _compile_property_publisher(self, attr_name, inclusions, include):
+    """Get a publisher function for a polymorphic object property."""
+    if inclusions and not include:
+      return lambda obj, inclusion_filter: self.publish_link(
+          obj, attr_name, inclusions, include, inclusion_filter)
+    id_attr = '{0}_id'.format(attr_name)
+    type_attr = '{0}_type'.format(attr_name)
+
+    def publish_property_stub(obj, _):
+      if getattr(obj, id_attr):
+        return LazyStubRepresentation(
+            getattr(obj, type_attr), getattr(obj, id_attr))
+      return None
+    return publish_property_stub
+
+  def _compile_attr_publisher(self, cls, attr_name, inclusions, include):
+    """Get a function that publishes a single attribute of ``cls`` objects.
+
+    This is the compiled equivalent of ``publish_attr``: the attribute kind is
+    resolved here once and the returned function only takes the object and
+    the inclusion filter.
+    """
+    class_attr = getattr(cls, attr_name)
+    custom_publish = getattr(cls, "_custom_publish", {})
+    if attr_name in custom_publish:
+      custom_publisher = custom_publish[attr_name]
+      return lambda obj, _: custom_publisher(obj)
+    elif isinstance(class_attr, AssociationProxy):
+      return self._compile_association_proxy_publisher(
+          attr_name, class_attr, inclusions, include)
+    elif isinstance(class_attr, InstrumentedAttribute) and \
+            isinstance(class_attr.property, RelationshipProperty):
+      return self._compile_relationship_publisher(
+          attr_name, class_attr, inclusions, include)
+    elif class_attr.__class__.__name__ == 'property':
+      return self._compile_property_publisher(attr_name, inclusions, include)
+    getter = operator.attrgetter(attr_name)
+    return lambda obj, _: getter(obj)
+
+  def get_attr_publishers(self, cls, inclusions):
+    """Get a list of (attr_name, publisher) pairs for all published attrs.
+
+    Publishers are compiled once per class and set of inclusions and then
+    reused for every published object. Inclusions come from request
+    arguments, so only a limited number of compiled sets is kept.
+    """
+    key = (cls, frozenset(inclusions))
+    publishers = self._compiled_publishers.get(key)
+    if publishers is None:
+      publishers = []
+      for attr in self._publish_attrs:
+        if hasattr(attr, '__call__'):
+          attr_name = attr.attr_name
+        else:
+          attr_name = attr
+        local_inclusion = ()
+        for inclusion in inclusions:
+          if inclusion[0] == attr_name:
+            local_inclusion = inclusion
+            break
+        publishers.append((attr_name, self._compile_attr_publisher(
+            cls, attr_name, local_inclusion[1:], len(local_inclusion) > 0)))
+      if len(self._compiled_publishers) < self.MAX_COMPILED_PUBLISHERS:
+        self._compiled_publishers[key] = publishers
+    return publishers
+
+  def get_inclusions(self, extra_inclusions=()):
+    """Get inclusions for include links of this builder and extra ones."""
+    inclusions = tuple((attr,) for attr in self._include_links)
+    return tuple(set(inclusions).union(set(extra_inclusions)))
 
   def publish_attrs(self, obj, json_obj, extra_inclusions, inclusion_filter):
     """Translate the state represented by ``obj`` into the JSON dictionary
@@ -706,10 +748,10 @@ class Builder(AttributeInfo):
       [('directives'),('cycles')]
       [('directives', ('audit_frequency','organization')),('cycles')]
     """
-    inclusions = tuple((attr,) for attr in self._include_links)
-    inclusions = tuple(set(inclusions).union(set(extra_inclusions)))
-    return self._publish_attrs_for(
-        obj, self._publish_attrs, json_obj, inclusions, inclusion_filter)
+    publishers = self.get_attr_publishers(
+        obj.__class__, self.get_inclusions(extra_inclusions))
+    for attr_name, publish_attr in publishers:
+      json_obj[attr_name] = publish_attr(obj, inclusion_filter)
 
   @classmethod
   def do_update_attrs(cls, obj, json_obj, attrs):
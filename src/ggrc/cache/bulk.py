@@ -0,0 +1,250 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Batched memcache access for collections of cached resources.
+
+BulkCacheClient wraps a memcache client and splits multi-key operations into
+batches whose size adapts to the observed latency. Batches are sent
+concurrently when the client supports asynchronous calls. Payload keys are
+read together with their DeleteOp blocker keys, so adding missing resources
+to the cache later does not need another round trip. An optional in-process
+LruCache is checked before memcache and filled with everything read from or
+added to memcache.
+"""
+
+import collections
+import logging
+import time
+
+from ggrc import settings
+
+logger = logging.getLogger(__name__)
+
+DELETE_OP_PREFIX = "DeleteOp:"
+
+MIN_BATCH_SIZE = 16
+# Batches faster than this grow and slower ones shrink.
+TARGET_BATCH_SECONDS = 0.05
+
+
+def get_blocker_key(key):
+  return DELETE_OP_PREFIX + key
+
+
+def get_resource_type(key):
+  """Get the resource type from a 'collection:{type}:{id}' cache key."""
+  parts = key.split(":")
+  return parts[1] if len(parts) > 2 else key
+
+
+class BatchSizer(object):
+  """Adapt the number of keys per memcache call to the observed latency.
+
+  The batch size is doubled after batches that finished within the target
+  time and halved after slow or failed ones.
+  """
+
+  def __init__(self, initial, maximum, minimum=MIN_BATCH_SIZE,
+               target_seconds=TARGET_BATCH_SECONDS):
+    self.minimum = minimum
+    self.maximum = max(maximum, minimum)
+    self.target_seconds = target_seconds
+    self.size = min(max(initial, minimum), self.maximum)
+
+  def update(self, batch_len, seconds, failed=False):
+    """Resize batches based on the time spent on a batch of given length."""
+    if failed or seconds > self.target_seconds:
+      self.size = max(self.size // 2, self.minimum)
+    elif batch_len >= self.size:
+      self.size = min(self.size * 2, self.maximum)
+
+
+class CacheStats(object):
+  """Hit, miss and latency counters per resource type."""
+
+  def __init__(self):
+    self.hits = collections.Counter()
+    self.local_hits = collections.Counter()
+    self.misses = collections.Counter()
+    self.seconds = collections.Counter()
+    self.calls = collections.Counter()
+
+  def record(self, resource_type, hits=0, misses=0, seconds=0,
+             local_hits=0):
+    self.hits[resource_type] += hits
+    self.local_hits[resource_type] += local_hits
+    self.misses[resource_type] += misses
+    self.seconds[resource_type] += seconds
+    self.calls[resource_type] += 1
+
+  def as_dict(self):
+    """Get stats of all resource types with average latency in ms."""
+    return {
+        resource_type: {
+            "hits": self.hits[resource_type],
+            "local_hits": self.local_hits[resource_type],
+            "misses": self.misses[resource_type],
+            "calls": calls,
+            "avg_ms": self.seconds[resource_type] * 1000.0 / calls,
+        }
+        for resource_type, calls in self.calls.iteritems()
+    }
+
+
+_batch_sizer = None
+stats = CacheStats()
+
+
+def get_batch_sizer():
+  """Get the batch sizer shared by all clients in this process."""
+  global _batch_sizer  # pylint: disable=global-statement
+  if _batch_sizer is None:
+    _batch_sizer = BatchSizer(
+        getattr(settings, "MEMCACHE_BATCH_SIZE", 100),
+        getattr(settings, "MEMCACHE_MAX_BATCH_SIZE", 1000),
+    )
+  return _batch_sizer
+
+
+class BulkCacheClient(object):
+  """Batched and pipelined multi-key operations on a memcache client.
+
+  Attributes:
+    blocked_keys: payload keys whose DeleteOp blockers were found by
+      get_with_blockers.
+    local_cache: LruCache used as the first cache tier or None.
+  """
+
+  def __init__(self, client, sizer=None, concurrent_batches=None,
+               local_cache=None):
+    self.client = client
+    self.local_cache = local_cache
+    self.sizer = sizer or get_batch_sizer()
+    if concurrent_batches is None:
+      concurrent_batches = getattr(settings, "MEMCACHE_CONCURRENT_BATCHES", 4)
+    self.concurrent_batches = max(concurrent_batches, 1)
+    self.blocked_keys = set()
+    self._checked_keys = set()
+
+  def _batches(self, keys, pair_size=1):
+    """Split keys into batches of the current batch size.
+
+    Args:
+      keys: list of keys to split.
+      pair_size: number of memcache keys that are sent for every key.
+    """
+    start = 0
+    while start < len(keys):
+      size = max(self.sizer.size // pair_size, 1)
+      yield keys[start:start + size]
+      start += size
+
+  def _call(self, method, batches, *args):
+    """Call a multi-key method for all batches and return their results.
+
+    Up to concurrent_batches calls are in flight at the same time if the
+    client has an asynchronous version of the method.
+    """
+    async_method = getattr(self.client, method + "_async", None)
+    if async_method is None or self.concurrent_batches == 1:
+      window_size = 1
+    else:
+      window_size = self.concurrent_batches
+    batches = iter(batches)
+    results = []
+    while True:
+      window = [batch for _, batch in zip(range(window_size), batches)]
+      if not window:
+        return results
+      start = time.time()
+      failed = False
+      try:
+        if window_size == 1:
+          window_results = [getattr(self.client, method)(window[0], *args)]
+        else:
+          rpcs = [async_method(batch, *args) for batch in window]
+          window_results = [rpc.get_result() for rpc in rpcs]
+      except Exception:  # pylint: disable=broad-except
+        logger.exception("CACHE: %s failed for %s batches",
+                         method, len(window))
+        failed = True
+        window_results = [None] * len(window)
+      seconds = time.time() - start
+      for batch in window:
+        self.sizer.update(len(batch), seconds, failed)
+      results.extend(zip(window, window_results, [seconds] * len(window)))
+
+  @staticmethod
+  def _record_stats(keys, found, seconds):
+    """Record hits, misses and latency of a lookup per resource type."""
+    keys_by_type = collections.defaultdict(list)
+    for key in keys:
+      keys_by_type[get_resource_type(key)].append(key)
+    for resource_type, type_keys in keys_by_type.iteritems():
+      hits = sum(1 for key in type_keys if key in found)
+      stats.record(resource_type, hits, len(type_keys) - hits, seconds)
+
+  def get_multi(self, keys, record_stats=True):
+    """Get values of all found keys."""
+    found = {}
+    batches = self._batches(list(keys))
+    for batch, result, seconds in self._call("get_multi", batches):
+      found.update(result or {})
+      if record_stats:
+        self._record_stats(batch, found, seconds)
+    return found
+
+  def get_with_blockers(self, keys):
+    """Get payloads and DeleteOp blockers of keys in the same multi-gets.
+
+    Keys with a blocker are stored in blocked_keys and are skipped by later
+    add_multi calls.
+
+    Returns:
+      dict with values of all found payload keys that are not blocked.
+    """
+    found = {}
+    if self.local_cache is not None:
+      found = self.local_cache.get_multi(keys)
+      local_hits = collections.Counter(get_resource_type(key) for key in found)
+      for resource_type, count in local_hits.iteritems():
+        stats.record(resource_type, local_hits=count)
+    keys = [key for key in keys if key not in found]
+    # every batch holds whole (payload key, blocker key) pairs
+    batches = ([key for payload_key in batch
+                for key in (payload_key, get_blocker_key(payload_key))]
+               for batch in self._batches(keys, pair_size=2))
+    for batch, result, seconds in self._call("get_multi", batches):
+      result = result or {}
+      payload_keys = batch[::2]
+      for key in payload_keys:
+        if get_blocker_key(key) in result:
+          self.blocked_keys.add(key)
+        elif key in result:
+          found[key] = result[key]
+      self._record_stats(payload_keys, found, seconds)
+    self._checked_keys.update(keys)
+    if self.local_cache is not None:
+      self.local_cache.set_multi({key: found[key] for key in keys
+                                  if key in found})
+    return found
+
+  def add_multi(self, mapping, expiration_time=0):
+    """Add values of keys that are not blocked by DeleteOp entries.
+
+    Blockers of keys that were not looked up with get_with_blockers are
+    fetched first.
+    """
+    unchecked = [key for key in mapping if key not in self._checked_keys]
+    if unchecked:
+      blockers = self.get_multi([get_blocker_key(key) for key in unchecked],
+                                record_stats=False)
+      self.blocked_keys.update(
+          key for key in unchecked if get_blocker_key(key) in blockers)
+      self._checked_keys.update(unchecked)
+    keys = [key for key in mapping if key not in self.blocked_keys]
+    batches = ({key: mapping[key] for key in batch}
+               for batch in self._batches(keys))
+    self._call("add_multi", batches, expiration_time)
+    if self.local_cache is not None:
+      self.local_cache.set_multi({key: mapping[key] for key in keys})
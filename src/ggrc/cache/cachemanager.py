@@ -33,8 +33,14 @@ class CacheManager:
   def __init__(self):
     pass
 
-  def initialize(self, cache):
-    """Initialize Cache Manager, configure cache mechanism."""
+  def initialize(self, cache, local_cache=None):
+    """Initialize Cache Manager, configure cache mechanism.
+
+    Args:
+      cache: cache object used for all cache operations.
+      local_cache: optional in-process LruCache in front of the cache, whose
+        entries are invalidated by bulk_delete and invalidate_local.
+    """
     self.supported_classes = {}
     for cache_entry in all_cache_entries():
       self.supported_classes[cache_entry.class_name] = cache_entry.model_plural
@@ -45,6 +51,7 @@ class CacheManager:
       self.supported_mappings[mapping_entry.class_name].append(mapping_entry)
 
     self.cache_object = cache
+    self.local_cache = local_cache
 
     self.new = {}
     self.dirty = {}
@@ -187,10 +194,22 @@ class CacheManager:
     Returns:
      Result of cache remove_multi
     """
+    self.invalidate_local(data)
     return self.cache_object.remove_multi(data, lockadd_seconds)
 
+  def invalidate_local(self, keys):
+    """Remove keys from the local cache tier.
+
+    Args:
+      keys: keys to remove
+    """
+    if self.local_cache is not None:
+      self.local_cache.delete_multi(keys)
+
   def clean(self):
     """Cleanup cache manager resources."""
+    if self.local_cache is not None:
+      self.local_cache.clear()
     self.cache_object.clean()
     return True
 
@@ -0,0 +1,124 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""In-process LRU cache with expiring entries, limited by size in bytes.
+
+The cache is used as a first tier in front of memcache. It is local to a
+single instance, so changes made on the same instance invalidate its entries
+right away, while changes made on other instances become visible when the
+entries expire.
+"""
+
+import cPickle
+import threading
+import time
+from collections import OrderedDict
+
+from ggrc import settings
+
+
+class LruCache(object):
+  """Thread safe LRU cache with a TTL and a size limit in bytes.
+
+  Values are stored pickled, so every get returns a fresh copy that callers
+  are free to modify.
+  """
+
+  def __init__(self, max_bytes, ttl):
+    self.max_bytes = max_bytes
+    self.ttl = ttl
+    self.size = 0
+    # key -> (pickled value, expiration timestamp)
+    self._entries = OrderedDict()
+    self._lock = threading.Lock()
+
+  def _pop(self, key):
+    data, _ = self._entries.pop(key)
+    self.size -= len(data)
+
+  def get_multi(self, keys):
+    """Get values of all found keys that have not expired."""
+    now = time.time()
+    found = {}
+    with self._lock:
+      for key in keys:
+        entry = self._entries.get(key)
+        if entry is None:
+          continue
+        self._pop(key)
+        if entry[1] < now:
+          continue
+        # reinsert the entry as the most recently used one
+        self._entries[key] = entry
+        self.size += len(entry[0])
+        found[key] = entry[0]
+    return {key: cPickle.loads(data) for key, data in found.iteritems()}
+
+  def set_multi(self, mapping):
+    """Store values and evict the least recently used ones above the limit."""
+    expires = time.time() + self.ttl
+    pickled = {}
+    for key, value in mapping.iteritems():
+      data = cPickle.dumps(value, cPickle.HIGHEST_PROTOCOL)
+      if len(data) <= self.max_bytes:
+        pickled[key] = data
+    with self._lock:
+      for key, data in pickled.iteritems():
+        if key in self._entries:
+          self._pop(key)
+        self._entries[key] = (data, expires)
+        self.size += len(data)
+      while self.size > self.max_bytes:
+        self._pop(next(iter(self._entries)))
+
+  def delete_multi(self, keys):
+    with self._lock:
+      for key in keys:
+        if key in self._entries:
+          self._pop(key)
+
+  def clear(self):
+    with self._lock:
+      self._entries.clear()
+      self.size = 0
+
+
+class LruDict(OrderedDict):
+  """Dict that keeps only the max_size most recently used items.
+
+  Unlike LruCache it stores values as they are and is not thread safe, so it
+  is meant for caches that live only for a single job.
+  """
+
+  def __init__(self, max_size):
+    self.max_size = max_size
+    super(LruDict, self).__init__()
+
+  def __getitem__(self, key):
+    value = OrderedDict.__getitem__(self, key)
+    # reinsert the item as the most recently used one
+    OrderedDict.__delitem__(self, key)
+    OrderedDict.__setitem__(self, key, value)
+    return value
+
+  def __setitem__(self, key, value):
+    if key in self:
+      OrderedDict.__delitem__(self, key)
+    OrderedDict.__setitem__(self, key, value)
+    while len(self) > self.max_size:
+      self.popitem(last=False)
+
+
+_local_cache = None
+
+
+def get_local_cache():
+  """Get the local cache of this process or None if it is disabled."""
+  global _local_cache  # pylint: disable=global-statement
+  max_bytes = getattr(settings, "MEMCACHE_LOCAL_CACHE_BYTES", 0)
+  if not max_bytes:
+    return None
+  if _local_cache is None:
+    _local_cache = LruCache(
+        max_bytes, getattr(settings, "MEMCACHE_LOCAL_CACHE_TTL", 10))
+  return _local_cache
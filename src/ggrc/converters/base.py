@@ -3,18 +3,19 @@
 
 """Base objects for csv file converters."""
 
+import itertools
 from collections import defaultdict
 
 from ggrc import settings
 from ggrc.utils import benchmark
 from ggrc.utils import structures
-from ggrc.cache.memcache import MemCache
 from ggrc.converters import get_exportables
 from ggrc.converters.base_block import BlockConverter
 from ggrc.converters.snapshot_block import SnapshotBlockConverter
 from ggrc.converters.import_helper import extract_relevant_data
 from ggrc.converters.import_helper import split_array
 from ggrc.fulltext import get_indexer
+from ggrc.services.common import _get_cache_manager
 
 
 class Converter(object):
@@ -59,6 +60,7 @@ class Converter(object):
     self.csv_data = kwargs.get("csv_data", [])
     self.ids_by_type = kwargs.get("ids_by_type", [])
     self.block_converters = []
+    self.block_headers = []
     self.new_objects = defaultdict(structures.CaseInsensitiveDict)
     self.shared_state = {}
     self.response_data = []
@@ -81,16 +83,56 @@ class Converter(object):
     csv_data = []
     for block_converter in self.block_converters:
       csv_header, csv_body = block_converter.to_array()
-      # multi block csv must have first column empty
-      two_empty_lines = [[], []]
-      block_data = csv_header + csv_body + two_empty_lines
-      for line in block_data:
-        line.insert(0, "")
-      block_data[0][0] = "Object type"
-      block_data[1][0] = block_converter.name
-      csv_data.extend(block_data)
+      csv_data.extend(
+          self._block_lines(block_converter.name, csv_header, csv_body))
     return csv_data
 
+  @staticmethod
+  def _block_lines(name, csv_header, csv_body):
+    """Generate lines of a single export block.
+
+    Multi block csv must have the first column empty except for the object
+    type header, and blocks are separated with two empty lines.
+    """
+    lines = itertools.chain(csv_header, csv_body, [[], []])
+    for index, line in enumerate(lines):
+      if index == 0:
+        first_cell = "Object type"
+      elif index == 1:
+        first_cell = name
+      else:
+        first_cell = ""
+      yield [first_cell] + line
+
+  def prepare_stream(self):
+    """Create block converters and block headers for a streaming export.
+
+    Returns:
+      Number of cells in the longest csv line, so that all lines can be
+      padded to the same length as in a non streaming export.
+    """
+    with benchmark("Create block converters"):
+      self.block_converters_from_ids(load_rows=False)
+    with benchmark("Generate block headers"):
+      self.block_headers = [block_converter.generate_csv_header()
+                            for block_converter in self.block_converters]
+    return 1 + max([len(line)
+                    for csv_header in self.block_headers
+                    for line in csv_header] or [0])
+
+  def iter_block_array(self):
+    """Generate csv lines of all export blocks.
+
+    This is the streaming counterpart of to_array. Object rows are loaded
+    and rendered in chunks, so the whole 2D array is never held in memory.
+    The prepare_stream function must be called first.
+    """
+    for block_converter, csv_header in zip(self.block_converters,
+                                           self.block_headers):
+      for line in self._block_lines(block_converter.name, csv_header,
+                                    block_converter.iter_csv_body()):
+        yield line
+
   def import_csv(self):
     self.block_converters_from_csv()
     self.row_converters_from_csv()
@@ -112,10 +154,14 @@ class Converter(object):
     for converter in self.block_converters:
       converter.row_converters_from_csv()
 
-  def block_converters_from_ids(self):
+  def block_converters_from_ids(self, load_rows=True):
     """ fill the block_converters class variable
 
     Generate block converters from a list of tuples with an object name and ids
+
+    Args:
+      load_rows (bool): Create row converters for all block objects. Streaming
+        exports skip this and load rows in chunks instead.
     """
     object_map = {o.__name__: o for o in self.exportable.values()}
     for object_data in self.ids_by_type:
@@ -131,7 +177,8 @@ class Converter(object):
                                          fields=fields, object_ids=object_ids,
                                          class_name=class_name)
         block_converter.check_block_restrictions()
-        block_converter.row_converters_from_ids()
+        if load_rows:
+          block_converter.row_converters_from_ids()
         self.block_converters.append(block_converter)
 
   def block_converters_from_csv(self):
@@ -175,7 +222,7 @@ class Converter(object):
 
   @classmethod
   def drop_cache(cls):
+    """Clear memcache and the local cache tier of this process."""
     if not getattr(settings, 'MEMCACHE_MECHANISM', False):
       return
-    memcache = MemCache()
-    memcache.clean()
+    _get_cache_manager().clean()
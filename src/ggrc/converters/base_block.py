@@ -28,6 +28,7 @@ from ggrc.converters import pre_commit_checks
 from ggrc.converters.base_row import RowConverter
 from ggrc.converters.import_helper import get_column_order
 from ggrc.converters.import_helper import get_object_column_definitions
+from ggrc.models.exceptions import ValidationError
 from ggrc.services.common import get_modified_objects
 from ggrc.services.common import update_index
 from ggrc.services.common import update_memcache_after_commit
@@ -43,6 +44,9 @@ logger = getLogger(__name__)
 
 CACHE_EXPIRY_IMPORT = 600
 
+# Number of objects loaded and rendered at once when streaming an export.
+EXPORT_CHUNK_SIZE = 1000
+
 
 class BlockConverter(object):
   # pylint: disable=too-many-public-methods
@@ -348,6 +352,45 @@ class BlockConverter(object):
     csv_body = self.generate_csv_body()
     return csv_header, csv_body
 
+  def _clear_export_caches(self):
+    """Drop all caches that are built for the current set of row converters."""
+    self._mapping_cache = None
+    self._owners_cache = None
+    self._user_roles_cache = None
+
+  def iter_csv_body(self, chunk_size=EXPORT_CHUNK_SIZE):
+    """Generate object value rows in chunks of objects ordered by id.
+
+    Only a single chunk of objects, row converters and the caches built for
+    them is held in memory at any time, so the peak memory usage does not
+    depend on the number of exported objects.
+
+    Args:
+      chunk_size (int): Number of objects loaded and rendered at once.
+
+    Yields:
+      list of strings for each exported object.
+    """
+    if self.ignore or not self.object_ids:
+      return
+    all_ids = sorted(self.object_ids)
+    try:
+      for start in xrange(0, len(all_ids), chunk_size):
+        self.object_ids = all_ids[start:start + chunk_size]
+        self._clear_export_caches()
+        with benchmark("Export chunk of {} {}".format(
+                len(self.object_ids), self.name)):
+          self.row_converters_from_ids()
+          for row_converter in self.row_converters:
+            row_converter.handle_row_data()
+          for line in self.generate_csv_body():
+            yield line
+        self.row_converters = []
+    finally:
+      self.object_ids = all_ids
+      self.row_converters = []
+      self._clear_export_caches()
+
   def get_header_names(self):
     """ Get all posible user column names for current object """
     header_names = {
@@ -412,7 +455,8 @@ class BlockConverter(object):
       return
     self.row_converters = []
     objects = self.object_class.eager_query().filter(
-        self.object_class.id.in_(self.object_ids)).all()
+        self.object_class.id.in_(self.object_ids)
+    ).order_by(self.object_class.id).all()
     for i, obj in enumerate(objects):
       row = RowConverter(self, self.object_class, obj=obj,
                          headers=self.headers, index=i)
@@ -559,14 +603,14 @@ class BlockConverter(object):
     """Commit all changes in the session and update memcache."""
     try:
       modified_objects = get_modified_objects(db.session)
-      import_event = log_event(db.session, None)
+      import_event = log_event(db.session, None, insert_revisions=True)
       update_memcache_before_commit(
           self, modified_objects, CACHE_EXPIRY_IMPORT)
       db.session.commit()
       update_memcache_after_commit(self)
       update_index(db.session, modified_objects)
       return import_event
-    except exc.SQLAlchemyError as err:
+    except (exc.SQLAlchemyError, ValidationError) as err:
       db.session.rollback()
       logger.exception("Import failed with: %s", err.message)
       self.add_errors(errors.UNKNOWN_ERROR, line=self.offset + 2)
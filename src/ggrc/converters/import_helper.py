@@ -68,6 +68,36 @@ def generate_csv_string(csv_data):
   return body
 
 
+def generate_csv_chunks(csv_lines, line_length, lines_per_chunk=1000):
+  """Turn an iterable of string lists into csv file chunks.
+
+  This is the streaming counterpart of generate_csv_string, and produces the
+  same csv content when all chunks are joined.
+
+  Args:
+    csv_lines: iterable of lists of unicode strings.
+    line_length (int): Length of the longest line. Shorter lines get padded
+      with empty cells.
+    lines_per_chunk (int): Number of csv lines in each yielded chunk.
+
+  Yields:
+    utf-8 encoded strings with csv lines.
+  """
+  output_buffer = StringIO()
+  writer = csv.writer(output_buffer)
+  for index, line in enumerate(csv_lines, 1):
+    line = line + [""] * (line_length - len(line))
+    writer.writerow([val.encode("utf-8") for val in line])
+    if index % lines_per_chunk == 0:
+      yield output_buffer.getvalue()
+      output_buffer.seek(0)
+      output_buffer.truncate()
+  body = output_buffer.getvalue()
+  output_buffer.close()
+  if body:
+    yield body
+
+
 def extract_relevant_data(csv_data):
   """ Split csv data into data and metadata """
   striped_data = [[unicode.strip(c) for c in line]
@@ -123,6 +123,8 @@ class SnapshotBlockConverter(object):
       snapshots = models.Snapshot.eager_query().filter(
           models.Snapshot.id.in_(self.ids)
       ).all()
+      models.Revision.load_full_contents(
+          [snapshot.revision for snapshot in snapshots])
 
       for snapshot in snapshots:  # add special snapshot attribute
         snapshot.content = self._extend_revision_content(snapshot)
@@ -304,6 +306,22 @@ class SnapshotBlockConverter(object):
         for snapshot in self.snapshots
     ] or [[]]
 
+  def generate_csv_header(self):
+    """Get 2D list with the CSV header lines."""
+    return self._header_list
+
+  def iter_csv_body(self):
+    """Generate CSV content lines one snapshot at a time.
+
+    Block headers depend on the content of all snapshots, so the snapshots
+    are loaded up front and only the rendered lines are generated lazily.
+    """
+    if not self.snapshots:
+      yield []
+      return
+    for snapshot in self.snapshots:
+      yield self._content_line_list(snapshot)
+
   def to_array(self):
     """Get 2D list representing the CSV file."""
     return self._header_list, self._body_list
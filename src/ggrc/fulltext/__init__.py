@@ -39,6 +39,9 @@ class Indexer(object):
   def update_record(self, record):
     raise NotImplementedError()
 
+  def update_records(self, type_, keys, records, only_properties=False):
+    raise NotImplementedError()
+
   def delete_record(self, key):
     raise NotImplementedError()
 
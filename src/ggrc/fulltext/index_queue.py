@@ -0,0 +1,121 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Deferred full text index updates.
+
+When FULLTEXT_INDEX_ASYNC is enabled, objects are not reindexed in the
+transaction that changed them. Their (type, id) pairs are stored in the
+fulltext_index_queue table in the same transaction instead, and a background
+job reindexes them in batches where every queued object is reindexed only
+once, no matter how many times it was queued.
+"""
+
+import logging
+from collections import defaultdict
+
+from sqlalchemy import func
+
+from ggrc import db
+from ggrc import settings
+from ggrc.utils import benchmark
+
+logger = logging.getLogger(__name__)
+
+
+class IndexQueueItem(db.Model):
+  """Object waiting for its full text index to be updated."""
+  # pylint: disable=too-few-public-methods
+  __tablename__ = "fulltext_index_queue"
+
+  id = db.Column(db.Integer, primary_key=True)
+  type = db.Column(db.String(64), nullable=False)
+  key = db.Column(db.Integer, nullable=False)
+  created_at = db.Column(db.DateTime, nullable=False)
+
+
+def is_async():
+  """Check if full text index updates should be deferred."""
+  return getattr(settings, "FULLTEXT_INDEX_ASYNC", False)
+
+
+def enqueue(ids_by_type):
+  """Add objects to the index queue in the current transaction.
+
+  Args:
+    ids_by_type: dict with model names as keys and iterables of ids of
+      objects that need to be reindexed as values.
+  """
+  rows = [{"type": type_, "key": key}
+          for type_, keys in ids_by_type.iteritems()
+          for key in keys]
+  if rows:
+    table = IndexQueueItem.__table__
+    db.session.execute(table.insert().values(created_at=func.now()), rows)
+
+
+def _reindex(type_, ids):
+  """Update full text records for the given objects."""
+  from ggrc.fulltext import get_indexer
+  from ggrc.models.inflector import get_model
+  from ggrc.snapshotter.indexer import reindex_snapshots
+  if type_ == "Snapshot":
+    indexer = get_indexer()
+    for snapshot_id in ids:
+      indexer.delete_record(snapshot_id, "Snapshot", commit=False)
+    reindex_snapshots(ids)
+  else:
+    get_model(type_).bulk_record_update_for(ids)
+
+
+def process_queue(batch_size=None):
+  """Reindex all queued objects in batches.
+
+  Every batch reindexes each queued object once and removes the processed
+  queue rows in the same transaction, so rows of a failed batch are kept and
+  retried on the next run.
+
+  Returns:
+    Number of processed queue rows.
+  """
+  if batch_size is None:
+    batch_size = getattr(settings, "FULLTEXT_INDEX_QUEUE_BATCH_SIZE", 1000)
+  processed = 0
+  while True:
+    items = db.session.query(
+        IndexQueueItem.id,
+        IndexQueueItem.type,
+        IndexQueueItem.key,
+    ).order_by(IndexQueueItem.id).limit(batch_size).all()
+    if not items:
+      return processed
+    ids_by_type = defaultdict(set)
+    for item in items:
+      ids_by_type[item.type].add(item.key)
+    with benchmark("Process index queue batch of {}".format(len(items))):
+      for type_, ids in ids_by_type.iteritems():
+        _reindex(type_, list(ids))
+      db.session.query(IndexQueueItem).filter(
+          IndexQueueItem.id.in_([item.id for item in items])
+      ).delete(synchronize_session=False)
+      db.session.commit()
+    processed += len(items)
+    logger.info("Reindexed %s queued objects from %s queue rows",
+                sum(len(ids) for ids in ids_by_type.values()), len(items))
+
+
+def get_index_lag():
+  """Get the size and age of the index queue.
+
+  Returns:
+    dict with the number of queued objects and the number of seconds the
+    oldest of them has been waiting to be indexed.
+  """
+  count, oldest, now = db.session.query(
+      func.count(IndexQueueItem.id),
+      func.min(IndexQueueItem.created_at),
+      func.now(),
+  ).one()
+  return {
+      "pending": count,
+      "seconds": int((now - oldest).total_seconds()) if oldest else 0,
+  }
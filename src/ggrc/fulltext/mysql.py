@@ -22,6 +22,7 @@ from ggrc.models import all_models
 from ggrc.models.inflector import get_model
 from ggrc.utils import query_helpers
 from ggrc.rbac import context_query_filter
+from ggrc.fulltext import index_queue
 from ggrc.fulltext.sql import SqlIndexer
 
 
@@ -232,7 +233,8 @@ Indexer = MysqlIndexer
 def update_indexer(session):  # pylint:disable=unused-argument
   """General function to update index
 
-  for all updated related instance before commit"""
+  for all updated related instance before commit. In async mode the
+  instances are added to the index queue instead."""
   models_ids_to_reindex = defaultdict(set)
   db.session.flush()
   for for_index in getattr(db.session, 'reindex_set', set()):
@@ -242,5 +244,8 @@ def update_indexer(session):  # pylint:disable=unused-argument
     if type_name:
       models_ids_to_reindex[type_name].add(id_value)
   db.session.reindex_set = set()
+  if index_queue.is_async():
+    index_queue.enqueue(models_ids_to_reindex)
+    return
   for model_name, ids in models_ids_to_reindex.iteritems():
     get_model(model_name).bulk_record_update_for(ids)
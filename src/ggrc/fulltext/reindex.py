@@ -0,0 +1,250 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Sharded full text reindex.
+
+A full reindex is split into shards of (model, id range) that are processed
+on a configurable process pool, where every worker uses its own database
+connections. Progress of the finished shards is stored in the parameters of
+the reindex background task, so that a reindex that failed or was killed
+continues with the remaining shards on the next run.
+"""
+
+import collections
+import datetime
+import logging
+import multiprocessing
+
+from ggrc import db
+from ggrc import settings
+from ggrc.fulltext import get_indexer
+from ggrc.fulltext import get_indexed_model_names
+from ggrc.fulltext import mixin
+from ggrc.models import all_models
+from ggrc.models.background_task import BackgroundTask
+from ggrc.models.inflector import get_model
+from ggrc.snapshotter import indexer as snapshot_indexer
+from ggrc.utils import benchmark
+from ggrc.utils import generate_keyset_chunks
+
+logger = logging.getLogger(__name__)
+
+
+# A shard contains all objects of a model with after_id < id <= last_id. None
+# values mean that the range is not bounded on that side, so the shards of a
+# single model always cover all of its objects.
+Shard = collections.namedtuple("Shard", ["model", "after_id", "last_id"])
+
+SNAPSHOT_MODEL = "Snapshot"
+
+
+def _get_shard_model(model_name):
+  if model_name == SNAPSHOT_MODEL:
+    return all_models.Snapshot
+  return get_model(model_name)
+
+
+def _get_shard_boundaries(model, shard_size):
+  """Generate the last id of every full shard for the given model.
+
+  Each boundary is found by seeking past the previous one and skipping
+  shard_size ids on the primary key index, so only a single row is fetched
+  per shard.
+  """
+  query = db.session.query(model.id).order_by(model.id)
+  last_id = None
+  while True:
+    shard_query = query
+    if last_id is not None:
+      shard_query = shard_query.filter(model.id > last_id)
+    row = shard_query.offset(shard_size - 1).limit(1).first()
+    if row is None:
+      return
+    last_id = row.id
+    yield last_id
+
+
+def get_shards(model_names, shard_size):
+  """Get a list of shards that cover all objects of the given models."""
+  shards = []
+  for model_name in sorted(model_names):
+    after_id = None
+    model = _get_shard_model(model_name)
+    for last_id in _get_shard_boundaries(model, shard_size):
+      shards.append(Shard(model_name, after_id, last_id))
+      after_id = last_id
+    shards.append(Shard(model_name, after_id, None))
+  return shards
+
+
+def reindex_shard(shard):
+  """Update full text records for all objects in a single shard."""
+  model = _get_shard_model(shard.model)
+  query = db.session.query(model.id)
+  if shard.after_id is not None:
+    query = query.filter(model.id > shard.after_id)
+  if shard.last_id is not None:
+    query = query.filter(model.id <= shard.last_id)
+  with benchmark("Reindex shard {}".format(shard)):
+    for chunk in generate_keyset_chunks(query, model.id):
+      ids = [row.id for row in chunk]
+      if shard.model == SNAPSHOT_MODEL:
+        snapshot_indexer.reindex_snapshots(ids)
+      else:
+        model.bulk_record_update_for(ids)
+        db.session.commit()
+  return shard
+
+
+def _init_worker():
+  """Prepare a pool worker process for reindexing shards."""
+  from ggrc.app import app
+  app.app_context().push()
+
+
+def _reindex_shard_worker(shard):
+  """Reindex a single shard in a pool worker process."""
+  try:
+    return reindex_shard(shard)
+  finally:
+    db.session.remove()
+
+
+def _reindex_non_indexed(model):
+  """Reindex all objects of a model that does not use the Indexed mixin."""
+  # pylint: disable=protected-access
+  logger.warning(
+      "Try to index model that not inherited from Indexed mixin: %s",
+      model.__name__
+  )
+  indexer = get_indexer()
+  indexer.delete_records_by_type(model.__name__)
+  mapper_class = model._sa_class_manager.mapper.base_mapper.class_
+  query = model.query.options(
+      db.undefer_group(mapper_class.__name__ + '_complete'),
+  )
+  for query_chunk in generate_keyset_chunks(query, model.id):
+    for instance in query_chunk:
+      indexer.create_record(indexer.fts_record_for(instance), False)
+    db.session.commit()
+
+
+def _is_stale(task):
+  """Check if a running task has not stored progress for too long.
+
+  Tasks whose process was killed are never finished and stay Running.
+  """
+  timeout = getattr(settings, "REINDEX_HEARTBEAT_TIMEOUT", 3600)
+  # updated_at is set by the database, so it is compared to database time
+  now = db.session.query(db.func.now()).scalar()
+  return task.updated_at < now - datetime.timedelta(seconds=timeout)
+
+
+def _get_resumable_progress(task):
+  """Get progress of the last reindex task if it failed or was killed.
+
+  Tasks that are still running are not resumed, as their shards are still
+  being processed.
+  """
+  previous = BackgroundTask.query.filter(
+      BackgroundTask.name.startswith("reindex"),
+      BackgroundTask.id < task.id,
+  ).order_by(BackgroundTask.id.desc()).first()
+  if not previous or previous.status == "Success":
+    return None
+  if previous.status == "Running" and not _is_stale(previous):
+    return None
+  parameters = previous.parameters or {}
+  if not parameters.get("shards"):
+    return None
+  logger.info("Resuming reindex from task %s: %s of %s shards done",
+              previous.id, len(parameters["completed"]),
+              len(parameters["shards"]))
+  return parameters
+
+
+def _save_progress(task, shards, completed):
+  """Store shards and the finished shard indexes in the task parameters.
+
+  Storing progress also refreshes updated_at of the task, which tells other
+  reindex runs that the task is still alive.
+  """
+  if task is None:
+    return
+  task.parameters = {
+      "shards": [tuple(shard) for shard in shards],
+      "completed": sorted(completed),
+  }
+  db.session.add(task)
+  db.session.commit()
+
+
+def _run_shards(shards, pending, on_done):
+  """Reindex pending shards and call on_done with the index of each one."""
+  processes = getattr(settings, "REINDEX_PROCESSES", 1)
+  if processes <= 1 or len(pending) <= 1:
+    for index in pending:
+      reindex_shard(shards[index])
+      on_done(index)
+    return
+  index_by_shard = {shards[index]: index for index in pending}
+  # Forked workers must not share connections with the parent process, so
+  # the parent releases and closes all of its connections before the fork and
+  # every process opens new ones when they are needed.
+  db.session.commit()
+  db.engine.dispose()
+  pool = multiprocessing.Pool(processes, _init_worker)
+  try:
+    results = pool.imap_unordered(
+        _reindex_shard_worker, [shards[index] for index in pending])
+    for shard in results:
+      on_done(index_by_shard[shard])
+    pool.close()
+  except:
+    pool.terminate()
+    raise
+  finally:
+    pool.join()
+
+
+def reindex(task=None):
+  """Update the full text search index for all indexed models and snapshots.
+
+  Args:
+    task: BackgroundTask that runs the reindex. When given, progress is
+      stored on the task after every shard and an unfinished previous reindex
+      task is resumed.
+  """
+  indexer = get_indexer()
+  people = db.session.query(all_models.Person.id, all_models.Person.name,
+                            all_models.Person.email)
+  indexer.cache["people_map"] = {p.id: (p.name, p.email) for p in people}
+
+  model_names = {SNAPSHOT_MODEL}
+  for model_name in get_indexed_model_names():
+    model = get_model(model_name)
+    if issubclass(model, mixin.Indexed):
+      model_names.add(model_name)
+    else:
+      _reindex_non_indexed(model)
+
+  progress = _get_resumable_progress(task) if task else None
+  if progress:
+    shards = [Shard(*shard) for shard in progress["shards"]]
+    completed = set(progress["completed"])
+  else:
+    with benchmark("Create reindex shards"):
+      shard_size = getattr(settings, "REINDEX_SHARD_SIZE", 10000)
+      shards = get_shards(model_names, shard_size)
+    completed = set()
+  _save_progress(task, shards, completed)
+
+  def on_done(index):
+    completed.add(index)
+    logger.info("Reindexed shard %s (%s of %s)",
+                shards[index], len(completed), len(shards))
+    _save_progress(task, shards, completed)
+
+  pending = [i for i in range(len(shards)) if i not in completed]
+  _run_shards(shards, pending, on_done)
+  indexer.invalidate_cache()
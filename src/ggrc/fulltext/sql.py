@@ -3,24 +3,60 @@
 
 """SQL routines for full-text indexing."""
 
+import collections
+import logging
+
+from sqlalchemy import and_
+from sqlalchemy import bindparam
+from sqlalchemy.sql import select
+from sqlalchemy.sql.expression import tuple_
+
 from ggrc import db
 from ggrc.fulltext import Indexer
 
+logger = logging.getLogger(__name__)
+
+
+# Columns that identify a single full text row of an object.
+KEY_COLUMNS = ("key", "type", "property", "subproperty")
+# Columns that are compared to decide if an existing row must be updated.
+DATA_COLUMNS = ("context_id", "tags", "content")
+
+
+def _batches(items, size):
+  for start in range(0, len(items), size):
+    yield items[start:start + size]
+
 
 class SqlIndexer(Indexer):
-  def records_generator(self, record):
+
+  # Maximum number of rows written by a single statement in update_records.
+  BATCH_SIZE = 500
+
+  def __init__(self, settings):
+    super(SqlIndexer, self).__init__(settings)
+    # Numbers of inserted, updated, deleted and skipped rows by update_records
+    self.row_counts = collections.Counter()
+
+  @staticmethod
+  def record_values(record):
+    """Generate column values for all full text rows of a record."""
     for prop, value in record.properties.items():
       for subproperty, content in value.items():
         if content is not None:
-          yield self.record_type(
-              key=record.key,
-              type=record.type,
-              context_id=record.context_id,
-              tags=record.tags,
-              property=prop,
-              subproperty=unicode(subproperty),
-              content=unicode(content),
-          )
+          yield {
+              "key": record.key,
+              "type": record.type,
+              "context_id": record.context_id,
+              "tags": record.tags,
+              "property": prop,
+              "subproperty": unicode(subproperty),
+              "content": unicode(content),
+          }
+
+  def records_generator(self, record):
+    for values in self.record_values(record):
+      yield self.record_type(**values)
 
   def create_record(self, record, commit=True):
     for db_record in self.records_generator(record):
@@ -29,15 +65,114 @@ class SqlIndexer(Indexer):
       db.session.commit()
 
   def update_record(self, record, commit=True):
-    # remove the obsolete index entries
-    if record.properties:
-      db.session.query(self.record_type).filter(
-          self.record_type.key == record.key,
-          self.record_type.type == record.type,
-          self.record_type.property.in_(list(record.properties.keys())),
-      ).delete(synchronize_session="fetch")
-    # add new index entries
-    self.create_record(record, commit=commit)
+    # only rows of the indexed properties are replaced
+    self.update_records(record.type, [record.key], [record],
+                        only_properties=True)
+    if commit:
+      db.session.commit()
+
+  def _get_existing_rows(self, type_, keys):
+    """Get data of all stored rows for the given objects by row key."""
+    table = self.record_type.__table__
+    rows = db.session.execute(
+        select([table.c[name] for name in KEY_COLUMNS + DATA_COLUMNS]).where(
+            table.c.type == type_
+        ).where(
+            table.c.key.in_(keys)
+        )
+    )
+    key_len = len(KEY_COLUMNS)
+    return {tuple(row[:key_len]): tuple(row[key_len:]) for row in rows}
+
+  def _delete_rows(self, type_, row_keys):
+    table = self.record_type.__table__
+    key_columns = tuple_(*[table.c[name] for name in KEY_COLUMNS])
+    for batch in _batches(row_keys, self.BATCH_SIZE):
+      # MySQL does not use indexes for row constructor IN lists, so rows are
+      # also filtered by the indexed type and key columns.
+      db.session.execute(table.delete().where(
+          table.c.type == type_
+      ).where(
+          table.c.key.in_({row_key[0] for row_key in batch})
+      ).where(
+          key_columns.in_(batch)
+      ))
+
+  def _update_rows(self, rows):
+    table = self.record_type.__table__
+    statement = table.update().where(and_(*[
+        table.c[name] == bindparam("_" + name) for name in KEY_COLUMNS
+    ])).values({
+        name: bindparam("_" + name) for name in DATA_COLUMNS
+    })
+    for batch in _batches(rows, self.BATCH_SIZE):
+      db.session.execute(statement, [
+          {"_" + name: value for name, value in row.iteritems()}
+          for row in batch
+      ])
+
+  def _insert_rows(self, rows):
+    table = self.record_type.__table__
+    for batch in _batches(rows, self.BATCH_SIZE):
+      db.session.execute(table.insert(), batch)
+
+  def update_records(self, type_, keys, records, only_properties=False):
+    """Write only the changed full text rows of objects of a single type.
+
+    Stored rows of the given objects are compared with rows generated from
+    the records and only the needed DELETE, UPDATE and INSERT statements are
+    issued in batches. Stored rows of objects without a record are deleted.
+
+    Args:
+      type_ (str): type of all records.
+      keys: ids of all objects whose full text rows are replaced.
+      records: full text records of the objects that still exist.
+      only_properties (bool): Replace only rows of properties that are
+        present in the records and keep all other stored rows.
+
+    Returns:
+      Counter with numbers of inserted, updated, deleted and skipped rows.
+    """
+    if not keys:
+      return collections.Counter()
+    # pending full text rows must be visible to the select below
+    db.session.flush()
+    existing = self._get_existing_rows(type_, keys)
+    if only_properties:
+      properties = {(record.key, prop)
+                    for record in records for prop in record.properties}
+      existing = {row_key: data for row_key, data in existing.iteritems()
+                  if (row_key[0], row_key[2]) in properties}
+
+    new_rows = {}
+    for record in records:
+      for values in self.record_values(record):
+        new_rows[tuple(values[name] for name in KEY_COLUMNS)] = values
+
+    to_insert, to_update = [], []
+    skipped = 0
+    for row_key, values in new_rows.iteritems():
+      if row_key not in existing:
+        to_insert.append(values)
+      elif existing[row_key] != tuple(values[name] for name in DATA_COLUMNS):
+        to_update.append(values)
+      else:
+        skipped += 1
+    to_delete = [row_key for row_key in existing if row_key not in new_rows]
+
+    self._delete_rows(type_, to_delete)
+    self._update_rows(to_update)
+    self._insert_rows(to_insert)
+
+    counts = collections.Counter(
+        inserted=len(to_insert),
+        updated=len(to_update),
+        deleted=len(to_delete),
+        skipped=skipped,
+    )
+    self.row_counts.update(counts)
+    logger.debug("Full text rows for %s %s: %s", len(keys), type_, counts)
+    return counts
 
   def delete_record(self, key, type, commit=True):
     db.session.query(self.record_type).filter(
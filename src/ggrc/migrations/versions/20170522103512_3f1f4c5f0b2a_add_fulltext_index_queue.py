@@ -0,0 +1,35 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+Add fulltext index queue
+
+Create Date: 2017-05-22 10:35:12.281744
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '3f1f4c5f0b2a'
+down_revision = '59a7bd61e36a'
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  op.create_table(
+      'fulltext_index_queue',
+      sa.Column('id', sa.Integer(), nullable=False),
+      sa.Column('type', sa.String(length=64), nullable=False),
+      sa.Column('key', sa.Integer(), nullable=False),
+      sa.Column('created_at', sa.DateTime(), nullable=False),
+      sa.PrimaryKeyConstraint('id'),
+  )
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  op.drop_table('fulltext_index_queue')
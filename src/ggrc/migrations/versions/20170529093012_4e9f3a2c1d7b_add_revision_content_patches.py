@@ -0,0 +1,80 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+Add revision content patches
+
+Create Date: 2017-05-29 09:30:12.418263
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+import json
+import zlib
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '4e9f3a2c1d7b'
+down_revision = '3f1f4c5f0b2a'
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  op.add_column(
+      "revisions",
+      sa.Column("checkpoint_id", sa.Integer(), nullable=True),
+  )
+  op.add_column(
+      "revisions",
+      sa.Column("content_patch", mysql.LONGBLOB(), nullable=True),
+  )
+  op.create_index(
+      "ix_revisions_checkpoint_id", "revisions", ["checkpoint_id"])
+  op.alter_column(
+      "revisions",
+      "content",
+      existing_type=mysql.LONGTEXT,
+      nullable=True
+  )
+
+
+def _restore_patched_contents():
+  """Store full content in all revisions stored as patches."""
+  connection = op.get_bind()
+  patched = connection.execute(
+      sa.text("""
+          SELECT r.id, c.content, r.content_patch
+          FROM revisions AS r
+          JOIN revisions AS c ON c.id = r.checkpoint_id
+          WHERE r.checkpoint_id IS NOT NULL
+      """)
+  ).fetchall()
+  for revision_id, base, content_patch in patched:
+    content = json.loads(base)
+    patch = json.loads(zlib.decompress(content_patch))
+    content.update(patch["set"])
+    for key in patch["unset"]:
+      content.pop(key, None)
+    connection.execute(
+        sa.text("UPDATE revisions SET content = :content WHERE id = :id"),
+        content=json.dumps(content),
+        id=revision_id,
+    )
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  _restore_patched_contents()
+  op.alter_column(
+      "revisions",
+      "content",
+      existing_type=mysql.LONGTEXT,
+      nullable=False
+  )
+  op.drop_index("ix_revisions_checkpoint_id", "revisions")
+  op.drop_column("revisions", "content_patch")
+  op.drop_column("revisions", "checkpoint_id")
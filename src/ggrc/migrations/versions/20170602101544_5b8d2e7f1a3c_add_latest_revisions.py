@@ -0,0 +1,40 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+Add latest revisions
+
+Create Date: 2017-06-02 10:15:44.732019
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '5b8d2e7f1a3c'
+down_revision = '4e9f3a2c1d7b'
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  op.create_table(
+      'latest_revisions',
+      sa.Column('resource_type', sa.String(length=250), nullable=False),
+      sa.Column('resource_id', sa.Integer(), nullable=False),
+      sa.Column('revision_id', sa.Integer(), nullable=False),
+      sa.PrimaryKeyConstraint('resource_type', 'resource_id'),
+  )
+  op.execute("""
+      INSERT INTO latest_revisions (resource_type, resource_id, revision_id)
+      SELECT resource_type, resource_id, MAX(id)
+      FROM revisions
+      GROUP BY resource_type, resource_id
+  """)
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  op.drop_table('latest_revisions')
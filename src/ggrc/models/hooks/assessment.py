@@ -19,6 +19,7 @@ from ggrc.models import Assessment
 from ggrc.models import Issue
 from ggrc.models import Person
 from ggrc.models import Relationship
+from ggrc.models import Revision
 from ggrc.models import Snapshot
 from ggrc.services import signals
 
@@ -54,6 +55,8 @@ def init_hook():
     snapshot_ids = [src.get('object', {}).get('id') for src in sources]
     snapshots = Snapshot.eager_query().filter(Snapshot.id.in_(snapshot_ids))
     snapshots = {snapshot.id: snapshot for snapshot in snapshots}
+    Revision.load_full_contents(
+        [snapshot.revision for snapshot in snapshots.itervalues()])
     roles = None
     for obj, src in izip(objects, sources):
       src_obj = src.get("object")
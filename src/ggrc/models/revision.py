@@ -3,7 +3,14 @@
 
 """Defines a Revision model for storing snapshots."""
 
+from sqlalchemy import event
+from sqlalchemy import text
+from sqlalchemy import tuple_
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm.session import Session
+
 from ggrc import db
+from ggrc.models import revision_content
 from ggrc.models.computed_property import computed_property
 from ggrc.models.mixins import Base
 from ggrc.models.types import LongJsonType
@@ -19,7 +26,12 @@ class Revision(Base, db.Model):
   event_id = db.Column(db.Integer, db.ForeignKey('events.id'), nullable=False)
   action = db.Column(db.Enum(u'created', u'modified', u'deleted'),
                      nullable=False)
-  content = db.Column(LongJsonType, nullable=False)
+  # Full content of checkpoints, empty for revisions stored as a patch. See
+  # ggrc.models.revision_content.
+  _content = db.Column("content", LongJsonType, nullable=True)
+  checkpoint_id = db.Column(db.Integer, nullable=True)
+  content_patch = db.Column(db.LargeBinary(length=4294967295), nullable=True)
+  _full_content = None
 
   resource_slug = db.Column(db.String, nullable=True)
   source_type = db.Column(db.String, nullable=True)
@@ -36,6 +48,7 @@ class Revision(Base, db.Model):
         db.Index("fk_revisions_destination",
                  "destination_type", "destination_id"),
         db.Index('ix_revisions_resource_slug', 'resource_slug'),
+        db.Index('ix_revisions_checkpoint_id', 'checkpoint_id'),
     )
 
   _publish_attrs = [
@@ -74,6 +87,56 @@ class Revision(Base, db.Model):
                  "destination_id"]:
       setattr(self, attr, getattr(obj, attr, None))
 
+  @hybrid_property
+  def content(self):
+    """Full content, reconstructed from the checkpoint for patches."""
+    if self.checkpoint_id is None:
+      return self._content
+    if self._full_content is None:
+      self._full_content = revision_content.load_contents([(
+          self.id, None, self.checkpoint_id, self.content_patch,
+      )])[self.id]
+    return self._full_content
+
+  @content.setter
+  def content(self, value):
+    self._content = value
+    self._full_content = None
+    self.checkpoint_id = None
+    self.content_patch = None
+
+  @content.expression
+  def content(cls):
+    # pylint: disable=no-self-argument
+    return cls._content
+
+  @staticmethod
+  def load_full_contents(revisions, chunk_size=1000):
+    """Reconstruct contents of patched revisions with bulk queries.
+
+    Checkpoints of every chunk of revisions are loaded with a single query
+    instead of one query per revision when content is accessed.
+    """
+    # pylint: disable=protected-access
+    patched = [revision for revision in revisions
+               if revision.checkpoint_id is not None and
+               revision._full_content is None]
+    for start in range(0, len(patched), chunk_size):
+      chunk = patched[start:start + chunk_size]
+      contents = revision_content.load_contents([
+          (revision.id, None, revision.checkpoint_id, revision.content_patch)
+          for revision in chunk
+      ])
+      for revision in chunk:
+        revision._full_content = contents[revision.id]
+
+  def set_patch(self, checkpoint_id, content_patch):
+    """Store content as a patch against a checkpoint."""
+    self._full_content = self.content
+    self._content = None
+    self.checkpoint_id = checkpoint_id
+    self.content_patch = content_patch
+
   def _description_mapping(self, link_objects):
     """Compute description for revisions with <-> in display name."""
     display_name = self.content['display_name']
@@ -120,3 +183,106 @@ class Revision(Base, db.Model):
     if self.event.action == "BULK":
       result += ", via bulk action"
     return result
+
+
+class LatestRevision(db.Model):
+  """Id of the latest revision of an object.
+
+  The table is kept up to date wherever revisions are written, so the latest
+  revision of an object is found by primary key instead of a scan of its
+  revision history. Revision objects added to a session are recorded after
+  every flush, revisions inserted without the ORM must be recorded with
+  update_latest_revisions_for_event.
+  """
+  # pylint: disable=too-few-public-methods
+  __tablename__ = "latest_revisions"
+
+  resource_type = db.Column(db.String(250), primary_key=True)
+  resource_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+  revision_id = db.Column(db.Integer, nullable=False)
+
+
+def update_latest_revisions(connection, revision_ids):
+  """Record revisions as the latest ones unless newer ones are recorded.
+
+  Args:
+    connection: connection of the transaction that wrote the revisions.
+    revision_ids: dict with (resource_type, resource_id) keys and revision
+      ids as values.
+  """
+  if not revision_ids:
+    return
+  connection.execute(
+      text("""
+          INSERT INTO latest_revisions (
+              resource_type, resource_id, revision_id
+          )
+          VALUES (:resource_type, :resource_id, :revision_id)
+          ON DUPLICATE KEY UPDATE
+              revision_id = GREATEST(revision_id, VALUES(revision_id))
+      """),
+      [{"resource_type": type_, "resource_id": id_, "revision_id": rev_id}
+       for (type_, id_), rev_id in revision_ids.iteritems()],
+  )
+
+
+def update_latest_revisions_for_event(connection, event_id):
+  """Record the latest revisions of all objects logged in an event."""
+  connection.execute(
+      text("""
+          INSERT INTO latest_revisions (
+              resource_type, resource_id, revision_id
+          )
+          SELECT resource_type, resource_id, MAX(id)
+          FROM revisions
+          WHERE event_id = :event_id
+          GROUP BY resource_type, resource_id
+          ON DUPLICATE KEY UPDATE
+              revision_id = GREATEST(revision_id, VALUES(revision_id))
+      """),
+      {"event_id": event_id},
+  )
+
+
+def get_latest_revision_ids(keys, filters=None):
+  """Get ids of latest revisions of objects.
+
+  Args:
+    keys: set of (resource_type, resource_id) tuples.
+    filters: optional list of Revision predicates. Objects whose latest
+      revision does not match them are left out.
+
+  Returns:
+    dict with (resource_type, resource_id) keys and revision ids as values.
+  """
+  if not keys:
+    return {}
+  query = db.session.query(
+      Revision.id,
+      Revision.resource_type,
+      Revision.resource_id,
+  ).join(
+      LatestRevision, LatestRevision.revision_id == Revision.id,
+  ).filter(
+      tuple_(
+          LatestRevision.resource_type,
+          LatestRevision.resource_id,
+      ).in_(keys)
+  )
+  for _filter in filters or []:
+    query = query.filter(_filter)
+  return {(type_, id_): rev_id for rev_id, type_, id_ in query}
+
+
+def _record_flushed_revisions(session, flush_context):
+  """Record latest revisions among Revision objects inserted by a flush."""
+  # pylint: disable=unused-argument
+  revision_ids = {}
+  for obj in session.new:
+    if isinstance(obj, Revision):
+      key = (obj.resource_type, obj.resource_id)
+      revision_ids[key] = max(obj.id, revision_ids.get(key, 0))
+  update_latest_revisions(session.connection(), revision_ids)
+
+
+event.listen(Session, "after_flush", _record_flushed_revisions)
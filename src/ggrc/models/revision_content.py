@@ -0,0 +1,192 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Delta encoded storage of revision content.
+
+With REVISION_DELTA_STORAGE enabled, only every REVISION_CHECKPOINT_INTERVAL
+revision of an object stores its full content. Such revisions are checkpoints.
+The revisions between them store a zlib compressed patch against the latest
+checkpoint of their object in content_patch and the id of that checkpoint in
+checkpoint_id, and leave the content column empty.
+
+Patches are made against the checkpoint instead of the previous revision, so
+any revision is reconstructed from at most two rows. A patch holds the top
+level keys of log_json that differ from the checkpoint:
+
+    {"set": {"title": "New title"}, "unset": ["description"]}
+
+Rows that store full content are valid in both formats, so revisions written
+before the storage was enabled, or by code that does not encode content, do
+not need to be migrated.
+"""
+
+import zlib
+
+from sqlalchemy import and_
+from sqlalchemy import func
+from sqlalchemy import tuple_
+
+from ggrc import db
+from ggrc import settings
+from ggrc import utils
+from ggrc.utils import json_backends
+
+
+def is_enabled():
+  return getattr(settings, "REVISION_DELTA_STORAGE", False)
+
+
+def make_patch(base, content):
+  """Get the top level differences of content from base."""
+  return {
+      "set": {key: value for key, value in content.iteritems()
+              if key not in base or base[key] != value},
+      "unset": [key for key in base if key not in content],
+  }
+
+
+def apply_patch(base, patch):
+  """Get a copy of base with the patch applied."""
+  content = dict(base)
+  content.update(patch["set"])
+  for key in patch["unset"]:
+    content.pop(key, None)
+  return content
+
+
+def encode_patch(patch):
+  return zlib.compress(utils.as_json(patch))
+
+
+def decode_patch(data):
+  return json_backends.loads(zlib.decompress(data))
+
+
+def _get_latest_checkpoints(keys):
+  """Get latest checkpoints and the number of patches against them.
+
+  Args:
+    keys: set of (resource_type, resource_id) tuples.
+
+  Returns:
+    dict with (resource_type, resource_id) keys and (checkpoint id, content,
+    patch count) values.
+  """
+  from ggrc.models.revision import Revision
+  if not keys:
+    return {}
+  latest_ids = db.session.query(
+      func.max(Revision.id),
+  ).filter(
+      tuple_(Revision.resource_type, Revision.resource_id).in_(keys),
+      Revision.checkpoint_id.is_(None),
+  ).group_by(
+      Revision.resource_type,
+      Revision.resource_id,
+  ).subquery()
+  patches = db.session.query(
+      Revision.checkpoint_id,
+      func.count(Revision.id).label("count"),
+  ).filter(
+      Revision.checkpoint_id.in_(latest_ids),
+  ).group_by(Revision.checkpoint_id).subquery()
+  checkpoints = db.session.query(
+      Revision.id,
+      Revision.resource_type,
+      Revision.resource_id,
+      Revision.content,
+      patches.c.count,
+  ).outerjoin(
+      patches, patches.c.checkpoint_id == Revision.id,
+  ).filter(
+      Revision.id.in_(latest_ids),
+  )
+  return {
+      (type_, id_): (checkpoint_id, content, count or 0)
+      for checkpoint_id, type_, id_, content, count in checkpoints
+  }
+
+
+def encode_contents(entries):
+  """Choose the storage of new revision contents.
+
+  Contents of objects without a checkpoint, contents that need a new
+  checkpoint and contents whose patch would not be smaller than the content
+  itself are stored in full.
+
+  Args:
+    entries: list of (resource_type, resource_id, content) tuples of new
+      revisions.
+
+  Returns:
+    list with a (checkpoint id, encoded patch) tuple for every entry, or
+    (None, None) for entries that should store full content.
+  """
+  if not is_enabled():
+    return [(None, None)] * len(entries)
+  interval = getattr(settings, "REVISION_CHECKPOINT_INTERVAL", 20)
+  checkpoints = _get_latest_checkpoints(
+      {(type_, id_) for type_, id_, _ in entries})
+  encoded = []
+  for type_, id_, content in entries:
+    checkpoint = checkpoints.get((type_, id_))
+    if checkpoint is None or checkpoint[2] + 1 >= interval:
+      encoded.append((None, None))
+      continue
+    checkpoint_id, base, count = checkpoint
+    serialized = utils.as_json(content)
+    # compare stored values, e.g. dates serialized to strings
+    patch = encode_patch(make_patch(base, json_backends.loads(serialized)))
+    if len(patch) >= len(serialized):
+      encoded.append((None, None))
+      continue
+    checkpoints[type_, id_] = (checkpoint_id, base, count + 1)
+    encoded.append((checkpoint_id, patch))
+  return encoded
+
+
+def compact_revisions(revisions):
+  """Store contents of new Revision objects as patches where possible."""
+  if not revisions or not is_enabled():
+    return
+  encoded = encode_contents([
+      (revision.resource_type, revision.resource_id, revision.content)
+      for revision in revisions
+  ])
+  for revision, (checkpoint_id, patch) in zip(revisions, encoded):
+    if checkpoint_id is not None:
+      revision.set_patch(checkpoint_id, patch)
+
+
+def load_contents(rows):
+  """Reconstruct contents of revisions table rows.
+
+  Args:
+    rows: iterable of (id, content, checkpoint_id, content_patch) tuples.
+
+  Returns:
+    dict with revision ids as keys and their full contents as values.
+  """
+  from ggrc.models.revision import Revision
+  contents = {}
+  patched = []
+  for id_, content, checkpoint_id, content_patch in rows:
+    if checkpoint_id is None:
+      contents[id_] = content
+    else:
+      patched.append((id_, checkpoint_id, content_patch))
+  missing = {checkpoint_id for _, checkpoint_id, _ in patched
+             if checkpoint_id not in contents}
+  checkpoints = {}
+  if missing:
+    checkpoints = dict(db.session.query(
+        Revision.id,
+        Revision.content,
+    ).filter(
+        and_(Revision.id.in_(missing), Revision.checkpoint_id.is_(None)),
+    ))
+  checkpoints.update(contents)
+  for id_, checkpoint_id, content_patch in patched:
+    contents[id_] = apply_patch(checkpoints[checkpoint_id],
+                                decode_patch(content_patch))
+  return contents
@@ -8,8 +8,12 @@ Add Json and Compressed type declaration for use in ORM models.
 
 import json
 import pickle
+import zlib
+
 import sqlalchemy.types as types
+from ggrc import settings
 from ggrc import utils
+from ggrc.utils import json_backends
 from ggrc.models import exceptions
 
 
@@ -26,7 +30,7 @@ class LongJsonType(types.TypeDecorator):
 
   def process_result_value(self, value, dialect):
     if value is not None:
-      value = json.loads(value)
+      value = json_backends.loads(value)
     return value
 
   def process_bind_param(self, value, dialect):
@@ -34,7 +38,7 @@ class LongJsonType(types.TypeDecorator):
       pass
     else:
       value = utils.as_json(value)
-      if len(value.encode('utf-8')) > self.MAX_TEXT_LENGTH:
+      if json_backends.byte_length(value) > self.MAX_TEXT_LENGTH:
         raise exceptions.ValidationError("Log record content too long")
     return value
 
@@ -52,7 +56,7 @@ class JsonType(types.TypeDecorator):
 
   def process_result_value(self, value, dialect):
     if value is not None:
-      value = json.loads(value)
+      value = json_backends.loads(value)
     return value
 
   def process_bind_param(self, value, dialect):
@@ -60,27 +64,86 @@ class JsonType(types.TypeDecorator):
       pass
     else:
       value = utils.as_json(value)
-      if len(value.encode('utf-8')) > self.MAX_TEXT_LENGTH:
+      if json_backends.byte_length(value) > self.MAX_TEXT_LENGTH:
         raise exceptions.ValidationError("Log record content too long")
     return value
 
 
+def _get_lz4():
+  """Get the lz4 block module, or None if lz4 is not installed."""
+  try:
+    import lz4.block
+  except ImportError:
+    return None
+  return lz4.block
+
+
 class CompressedType(types.TypeDecorator):
   # pylint: disable=W0223
   """ Custom Compresed data type
 
-  Custom type for storing any python object in our database as serialized text.
+  Custom type for storing any python object in our database as a compressed
+  payload. The first byte of the payload is a header that tells its format:
+
+    JSON_ZLIB - zlib compressed JSON.
+    JSON_LZ4 - lz4 compressed JSON, written with COMPRESSED_TYPE_CODEC set to
+      "lz4" and the lz4 library installed.
+    PICKLE_ZLIB - zlib compressed pickle, for values that JSON can not
+      represent without changes, such as dates, tuples, dicts with keys that
+      are not strings or strings that are not ASCII.
+
+  JSON is only used for values that are equal to their decoded JSON, so the
+  only difference is that ASCII str values are read back as unicode. Rows
+  written before the header was introduced are plain pickles, which never
+  start with any of the header bytes, and are still read as such.
   """
   MAX_BINARY_LENGTH = 16777215
   impl = types.LargeBinary(length=MAX_BINARY_LENGTH)
 
+  JSON_ZLIB = b"\x01"
+  JSON_LZ4 = b"\x02"
+  PICKLE_ZLIB = b"\x03"
+
+  @classmethod
+  def encode(cls, value):
+    """Get the compressed payload of a value."""
+    try:
+      data = json.dumps(value, separators=(",", ":"))
+      lossless = json_backends.loads(data) == value
+    except (TypeError, ValueError, UnicodeDecodeError):
+      lossless = False
+    if not lossless:
+      return cls.PICKLE_ZLIB + zlib.compress(
+          pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+    if getattr(settings, "COMPRESSED_TYPE_CODEC", "zlib") == "lz4":
+      lz4 = _get_lz4()
+      if lz4 is not None:
+        return cls.JSON_LZ4 + lz4.compress(data)
+    return cls.JSON_ZLIB + zlib.compress(data)
+
+  @classmethod
+  def decode(cls, payload):
+    """Get the value of a compressed payload or a legacy pickle."""
+    header, data = payload[:1], payload[1:]
+    if header == cls.JSON_ZLIB:
+      return json_backends.loads(zlib.decompress(data))
+    if header == cls.JSON_LZ4:
+      lz4 = _get_lz4()
+      if lz4 is None:
+        raise exceptions.ValidationError(
+            "lz4 is required to read this compressed value")
+      return json_backends.loads(lz4.decompress(data))
+    if header == cls.PICKLE_ZLIB:
+      return pickle.loads(zlib.decompress(data))
+    return pickle.loads(str(payload))
+
   def process_result_value(self, value, dialect):
     if value is not None:
-      value = pickle.loads(value)
+      value = self.decode(value)
     return value
 
   def process_bind_param(self, value, dialect):
-    value = pickle.dumps(value)
+    value = self.encode(value)
     if len(value) > self.MAX_BINARY_LENGTH:
       raise exceptions.ValidationError("Log record content too long")
     return value
@@ -0,0 +1,138 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Dependencies of cached user permissions.
+
+Permissions of a user are derived from their roles and the context
+implications of role contexts, owned objects, access control list entries and
+relationships of objects the user has access to. Cached permissions of every
+user are stored together with ids of the objects they depend on, grouped by
+object type, so that a change only invalidates permissions of the users that
+depend on the changed objects.
+"""
+
+import collections
+import itertools
+
+from sqlalchemy.sql.expression import tuple_
+
+from ggrc import db
+from ggrc.models.context import Context
+
+
+PERMISSION_CACHE_TIMEOUT = 3600  # 60 minutes
+
+# Changes of these types can affect permissions of all users.
+GLOBAL_TYPES = {"Role", "AccessControlRole"}
+
+# Types with a person_id column that grant permissions to that person.
+PERSON_TYPES = {"UserRole", "ObjectOwner", "AccessControlList"}
+
+_EMPTY = frozenset()
+
+
+def dependencies_key(key):
+  """Memcache key for dependencies of permissions stored under key."""
+  return "{}:dependencies".format(key)
+
+
+def get_dependencies(user_id, permissions, contexts=()):
+  """Get objects that permissions of a user depend on.
+
+  Args:
+    user_id: id of the user.
+    permissions: permissions dict loaded for the user.
+    contexts: context ids of the user roles, including roles that do not
+      grant any permissions by themselves.
+  Returns:
+    dict with sets of object ids by object type.
+  """
+  dependencies = collections.defaultdict(set)
+  dependencies["Person"].add(user_id)
+  dependencies["Context"].update(contexts)
+  for resource_types in permissions.itervalues():
+    if not isinstance(resource_types, dict):
+      continue
+    for resource_type, entry in resource_types.iteritems():
+      dependencies["Context"].update(entry.get("contexts", ()))
+      dependencies[resource_type].update(entry.get("resources", ()))
+  return dict(dependencies)
+
+
+def _get_related_contexts(objects, chunk_size=1000):
+  """Get ids of contexts that belong to any of the (type, id) objects."""
+  objects = list(objects)
+  context_ids = set()
+  for start in range(0, len(objects), chunk_size):
+    query = db.session.query(Context.id).filter(
+        tuple_(Context.related_object_type, Context.related_object_id).in_(
+            objects[start:start + chunk_size]))
+    context_ids.update(context_id for context_id, in query)
+  return context_ids
+
+
+def get_changed_dependencies(modified_objects):
+  """Get objects whose changes can affect cached permissions.
+
+  Objects are described by the content logged for them before the flush, so
+  this works the same for new, modified and deleted objects.
+
+  Args:
+    modified_objects: ggrc.models.cache.Cache with modified objects.
+  Returns:
+    dict with sets of object ids by object type, or None if the changes can
+    affect permissions of all users.
+  """
+  changed = collections.defaultdict(set)
+  endpoints = set()
+  for obj, content in itertools.chain(modified_objects.new.iteritems(),
+                                      modified_objects.dirty.iteritems(),
+                                      modified_objects.deleted.iteritems()):
+    type_ = obj.type
+    if type_ in GLOBAL_TYPES:
+      return None
+    if type_ == "Workflow" and content.get("kind") == "Backlog":
+      return None
+    if type_ in PERSON_TYPES:
+      changed["Person"].add(content.get("person_id"))
+    elif type_ in ("Person", "Context"):
+      changed[type_].add(content.get("id"))
+    elif type_ == "ContextImplication":
+      changed["Context"].add(content.get("source_context_id"))
+      changed["Context"].add(content.get("context_id"))
+    elif type_ == "Relationship":
+      endpoints.add((content.get("source_type"), content.get("source_id")))
+      endpoints.add((content.get("destination_type"),
+                     content.get("destination_id")))
+  for type_, id_ in endpoints:
+    changed[type_].add(id_)
+  if endpoints:
+    # Objects mapped to an object with its own context, such as a program,
+    # give permissions to all users with permissions in that context.
+    changed["Context"].update(_get_related_contexts(endpoints))
+  return dict(changed)
+
+
+def get_affected_keys(cache, keys, changed):
+  """Get keys of cached permissions that depend on any changed object.
+
+  Permissions stored without dependencies are always affected.
+
+  Args:
+    cache: memcache client.
+    keys: keys of cached permissions.
+    changed: dict with sets of object ids by type, as returned by
+      get_changed_dependencies.
+  Returns:
+    set of affected keys.
+  """
+  keys = [key for key in keys if key != "permissions:list"]
+  stored = cache.get_multi([dependencies_key(key) for key in keys])
+  affected = set()
+  for key in keys:
+    dependencies = stored.get(dependencies_key(key))
+    if dependencies is None or any(
+            not dependencies.get(type_, _EMPTY).isdisjoint(ids)
+            for type_, ids in changed.iteritems()):
+      affected.add(key)
+  return affected
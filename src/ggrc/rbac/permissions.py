@@ -62,6 +62,13 @@ def is_allowed_update(resource_type, resource_id, context_id):
   return permissions_for(get_user()).is_allowed_update(
       resource_type, resource_id, context_id)
 
+def allowed_update_ids(resource_type, resource_ids, context_id):
+  """The subset of resource_ids of the specified type that the user is allowed
+  to update in the context.
+  """
+  return permissions_for(get_user()).allowed_update_ids(
+      resource_type, resource_ids, context_id)
+
 def is_allowed_update_for(instance):
   """Whether or not the user is allowed to update this particular resource
   instance.
@@ -17,6 +17,11 @@ Permission = namedtuple(
 
 _contributing_resource_types = {}
 
+# resource id that does not match any resource in the permissions dict
+_NO_RESOURCE = object()
+
+_EMPTY = frozenset()
+
 
 def get_contributing_resource_types(resource_type):
   """Return a list of resource types using the same context space.
@@ -142,7 +147,30 @@ _CONDITIONS_MAP = {
 }
 
 
-class DefaultUserPermissions(UserPermissions):
+def compile_condition(condition):
+  """Bind a permission condition to its terms.
+
+  Returns:
+    Function that takes the instance and the checked action.
+  """
+  func = _CONDITIONS_MAP[str(condition['condition'])]
+  terms = condition.get('terms', {})
+
+  def check(instance, action):
+    return func(instance, _current_action=action, **terms)
+  return check
+
+
+class PermissionIndex(object):
+  """Lookup structure compiled from a permissions dict.
+
+  The permissions dict lists contexts and resources per action and resource
+  type, see ggrc_basic_permissions.load_permissions_for for its structure.
+  The index keeps them in frozensets keyed by (action, resource_type) and
+  binds conditions to their terms, so that no permission check has to scan
+  lists or walk the nested dicts.
+  """
+
   # super user, context_id 0 indicates all contexts
   ADMIN_PERMISSION = Permission(
       '__GGRC_ADMIN__',
@@ -151,114 +179,123 @@ class DefaultUserPermissions(UserPermissions):
       0,
   )
 
-  def _admin_permission_for_context(self, context_id):
-    """Create an admin permission object for the given context"""
-    return Permission(
-        self.ADMIN_PERMISSION.action,
-        self.ADMIN_PERMISSION.resource_type,
-        None,
-        context_id)
-
-  def _permission_match(self, permission, permissions):
-    """Check if the user has the given permission"""
-
-    if None in \
-        permissions\
-            .get(permission.action, {})\
-            .get(permission.resource_type, {})\
-            .get('contexts', []):
-      return True
-    return \
-        permission.resource_id in permissions\
-        .get(permission.action, {})\
-        .get(permission.resource_type, {})\
-        .get('resources', [])\
-        or permission.context_id in \
-        permissions\
-        .get(permission.action, {})\
-        .get(permission.resource_type, {})\
-        .get('contexts', [])\
-        or permission.context_id in \
-        permissions\
-        .get(permission.action, {})\
-        .get(self.ADMIN_PERMISSION.resource_type, {})\
-        .get('contexts', [])
-
-  @staticmethod
-  def _permissions():
-    """Returns request permission from the global scope"""
-    return getattr(g, '_request_permissions', {})
-
-  def _is_allowed(self, permission):
-    permissions = self._permissions()
-    if permission.resource_type != '/admin' \
-       and permission.context_id \
-       and self._is_allowed(permission._replace(context_id=None)):
+  def __init__(self, permissions):
+    self.permissions = permissions
+    self._types = set()
+    self._contexts = {}
+    self._resources = {}
+    self._conditions = {}
+    for action, resource_types in (permissions or {}).iteritems():
+      if not isinstance(resource_types, dict):
+        continue
+      for resource_type, entry in resource_types.iteritems():
+        if not isinstance(entry, dict):
+          continue
+        key = action, resource_type
+        if entry:
+          self._types.add(key)
+        self._contexts[key] = frozenset(entry.get('contexts', ()))
+        self._resources[key] = frozenset(entry.get('resources', ()))
+        self._conditions[key] = {
+            context_id: tuple(compile_condition(condition)
+                              for condition in conditions)
+            for context_id, conditions in entry.get('conditions', {}).items()
+        }
+    self.is_admin = self.match(*self.ADMIN_PERMISSION)
+
+  def contexts(self, action, resource_type):
+    return self._contexts.get((action, resource_type), _EMPTY)
+
+  def resources(self, action, resource_type):
+    return self._resources.get((action, resource_type), _EMPTY)
+
+  def conditions(self, action, resource_type, context_id):
+    return self._conditions.get((action, resource_type), {}).get(
+        context_id, ())
+
+  def match(self, action, resource_type, resource_id, context_id):
+    """Check if the permission is given directly in the permissions dict."""
+    contexts = self._contexts.get((action, resource_type), _EMPTY)
+    return (
+        None in contexts or
+        resource_id in self._resources.get((action, resource_type), _EMPTY) or
+        context_id in contexts or
+        context_id in self._contexts.get(
+            (action, self.ADMIN_PERMISSION.resource_type), _EMPTY)
+    )
+
+  def _match_admin(self, context_id):
+    return self.match(self.ADMIN_PERMISSION.action,
+                      self.ADMIN_PERMISSION.resource_type, None, context_id)
+
+  def is_allowed(self, permission):
+    """Check the permission, including global and admin permissions."""
+    if self.is_admin:
       return True
-    if self._permission_match(permission, permissions):
+    action, resource_type, resource_id, context_id = permission
+    # permissions without a context apply to all contexts
+    global_match = (resource_type != '/admin' and context_id and (
+        self.match(action, resource_type, resource_id, None) or
+        self._match_admin(None)))
+    if global_match:
       return True
-    if self._permission_match(self.ADMIN_PERMISSION, permissions):
-      return True
-    return self._permission_match(
-        self._admin_permission_for_context(permission.context_id),
-        permissions)
-
-  @staticmethod
-  def _check_conditions(instance, action, conditions):
-    """Check if any condition is valid for the instance."""
-    for condition in conditions:
-      func = _CONDITIONS_MAP[str(condition['condition'])]
-      terms = condition.setdefault('terms', {})
-      if func(instance, _current_action=action, **terms):
-        return True
-    return False
-
-  def _is_allowed_for(self, instance, action):
-    permissions = self._permissions()
-    # Check for admin permission
-    if self._permission_match(self.ADMIN_PERMISSION, permissions):
-      conditions = permissions[self.ADMIN_PERMISSION.action]\
-          .get(self.ADMIN_PERMISSION.resource_type)\
-          .get("conditions", {})\
-          .get(None, [])
+    return (self.match(action, resource_type, resource_id, context_id) or
+            self._match_admin(context_id))
+
+  def is_allowed_for(self, instance, action):
+    """Check if the action is allowed on the given instance."""
+    if self.is_admin:
+      conditions = self.conditions(self.ADMIN_PERMISSION.action,
+                                   self.ADMIN_PERMISSION.resource_type, None)
       if not conditions:
         return True
-      return self._check_conditions(instance, action, conditions)
-    if (not permissions.get(action) or
-       not permissions[action].get(instance._inflector.model_singular)):
+      return any(check(instance, action) for check in conditions)
+    resource_type = instance._inflector.model_singular
+    if (action, resource_type) not in self._types:
       return False
-    resources = self._permissions()\
-        .setdefault(action, {})\
-        .setdefault(instance._inflector.model_singular, {})\
-        .setdefault('resources', [])
-    contexts = self._permissions()\
-        .setdefault(action, {})\
-        .setdefault(instance._inflector.model_singular, {})\
-        .setdefault('contexts', [])
+    if instance.id in self.resources(action, resource_type):
+      return True
     # We can't use instance.context_id, because it requires the
     # object <-> context mapping to be created,
     # which isn't the case when creating objects
     context_id = None
     if hasattr(instance, 'context') and hasattr(instance.context, 'id'):
       context_id = instance.context.id
-    if instance.id in resources:
-      return True
-    no_context_conditions = self._permissions()\
-        .setdefault(action, {})\
-        .setdefault(instance._inflector.model_singular, {})\
-        .setdefault('conditions', {})\
-        .setdefault(None, [])
-
-    context_conditions = self._permissions()\
-        .setdefault(action, {})\
-        .setdefault(instance._inflector.model_singular, {})\
-        .setdefault('conditions', {})\
-        .setdefault(context_id, [])
-    conditions = no_context_conditions + context_conditions
+    conditions = (self.conditions(action, resource_type, None) +
+                  self.conditions(action, resource_type, context_id))
+    contexts = self.contexts(action, resource_type)
     # Check any conditions applied per resource
     if (None in contexts or context_id in contexts) and not conditions:
       return True
-    return self._check_conditions(instance, action, conditions)
+    return any(check(instance, action) for check in conditions)
+
+
+class DefaultUserPermissions(UserPermissions):
+  ADMIN_PERMISSION = PermissionIndex.ADMIN_PERMISSION
+
+  @staticmethod
+  def _permissions():
+    """Returns request permission from the global scope"""
+    return getattr(g, '_request_permissions', {})
+
+  def _permission_index(self):
+    """Returns the index of request permissions.
+
+    The index is compiled once per permissions dict and kept in the global
+    scope next to the request permissions.
+    """
+    permissions = self._permissions()
+    index = getattr(g, '_request_permission_index', None)
+    if index is None or index.permissions is not permissions:
+      index = PermissionIndex(permissions)
+      setattr(g, '_request_permission_index', index)
+    return index
+
+  def _is_allowed(self, permission):
+    return self._permission_index().is_allowed(permission)
+
+  def _is_allowed_for(self, instance, action):
+    return self._permission_index().is_allowed_for(instance, action)
 
   def is_allowed_create(self, resource_type, resource_id, context_id):
     """Whether or not the user is allowed to create a resource of the specified
@@ -290,6 +327,26 @@ class DefaultUserPermissions(UserPermissions):
     """Whether or not the user is allowed to update the given instance"""
     return self._is_allowed_for(instance, 'update')
 
+  def allowed_update_ids(self, resource_type, resource_ids, context_id):
+    """The subset of resource_ids of the specified type that the user is
+    allowed to update in the context."""
+    return self._allowed_ids(
+        Permission('update', resource_type, None, context_id), resource_ids)
+
+  def _allowed_ids(self, permission, resource_ids):
+    """Check permission for many resource ids at once.
+
+    Resource ids are only compared with the list of resources for the
+    permission, so all other checks are done just once for a resource id that
+    can not be in that list.
+    """
+    index = self._permission_index()
+    resource_ids = set(resource_ids)
+    if index.is_allowed(permission._replace(resource_id=_NO_RESOURCE)):
+      return resource_ids
+    return resource_ids & index.resources(permission.action,
+                                          permission.resource_type)
+
   def is_allowed_delete(self, resource_type, resource_id, context_id):
     """Whether or not the user is allowed to delete a resource of the
     specified type in the context."""
@@ -303,10 +360,9 @@ class DefaultUserPermissions(UserPermissions):
   def _get_resources_for(self, action, resource_type):
     """Get resources resources (object ids) for a given action and
     resource_type"""
-    permissions = self._permissions()
-
-    if self._permission_match(self.ADMIN_PERMISSION, permissions):
+    if self._permission_index().is_admin:
       return None
+    permissions = self._permissions()
 
     # Get the list of resources for a given resource type and any
     #   superclasses
@@ -324,10 +380,9 @@ class DefaultUserPermissions(UserPermissions):
   def _get_contexts_for(self, action, resource_type):
     # FIXME: (Security) When applicable, we should explicitly assert that no
     #   permissions are expected (e.g. that every user has ADMIN_PERMISSION).
-    permissions = self._permissions()
-
-    if self._permission_match(self.ADMIN_PERMISSION, permissions):
+    if self._permission_index().is_admin:
       return None
+    permissions = self._permissions()
 
     # Get the list of contexts for a given resource type and any
     #   superclasses
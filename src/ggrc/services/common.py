@@ -12,7 +12,8 @@ import itertools
 import json
 import time
 from logging import getLogger
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
+from contextlib import contextmanager
 from exceptions import TypeError
 from wsgiref.handlers import format_date_time
 from urllib import urlencode
@@ -34,10 +35,13 @@ from ggrc.fulltext import get_indexer
 from ggrc.login import get_current_user_id, get_current_user
 from ggrc.models.cache import Cache
 from ggrc.models.event import Event
+from ggrc.models import revision_content
 from ggrc.models.revision import Revision
 from ggrc.models.exceptions import ValidationError, translate_message
 from ggrc.rbac import permissions, context_query_filter
+from ggrc.rbac import dependencies
 from ggrc.services.attribute_query import AttributeQueryBuilder
+from ggrc.services import revision_writer
 from ggrc.services import signals
 from ggrc.models.background_task import BackgroundTask, create_task
 from ggrc import settings
@@ -57,8 +61,9 @@ def get_oauth_credentials():
 
 def _get_cache_manager():
   from ggrc.cache import CacheManager, MemCache
+  from ggrc.cache.lru import get_local_cache
   cache_manager = CacheManager()
-  cache_manager.initialize(MemCache())
+  cache_manager.initialize(MemCache(), get_local_cache())
   return cache_manager
 
 
@@ -188,8 +193,13 @@ def update_memcache_before_commit(context, modified_objects, expiry_time):
     return
 
   context.cache_manager = _get_cache_manager()
+  # Objects that permissions depend on are collected before the commit, while
+  # contexts related to modified relationships can still be queried.
+  context.permission_dependencies = None
 
   if modified_objects is not None:
+    context.permission_dependencies = dependencies.get_changed_dependencies(
+        modified_objects)
     if len(modified_objects.new) > 0:
       memcache_mark_for_deletion(context, modified_objects.new.items())
 
@@ -199,6 +209,10 @@ def update_memcache_before_commit(context, modified_objects, expiry_time):
     if len(modified_objects.deleted) > 0:
       memcache_mark_for_deletion(context, modified_objects.deleted.items())
 
+  # Local entries can't be blocked by DeleteOp entries, so they are removed
+  # before the commit
+  context.cache_manager.invalidate_local(
+      context.cache_manager.marked_for_delete)
   status_entries = {}
   for key in context.cache_manager.marked_for_delete:
     build_cache_status(status_entries, 'DeleteOp:' + key,
@@ -260,7 +274,7 @@ def update_memcache_after_commit(context):
     if delete_result is not True:
       logger.error("CACHE: Failed to remove status entries from cache")
 
-  clear_permission_cache()
+  clear_permission_cache(getattr(context, "permission_dependencies", None))
   cache_manager.clear_cache()
 
 
@@ -309,9 +323,25 @@ def get_modified_objects(session):
     return None
 
 
+def _get_published_revisions(objs):
+  """Get revisions whose content is published with the given objects.
+
+  These are the objects themselves for revisions, and the revision of
+  objects such as snapshots and comments that publish revision content.
+  """
+  revisions = []
+  for obj in objs:
+    if not isinstance(obj, Revision):
+      obj = getattr(obj, "revision", None)
+    if isinstance(obj, Revision):
+      revisions.append(obj)
+  return revisions
+
+
 def update_index(session, cache):
   """Update fulltext index records for cached objects."""
   from ggrc.snapshotter.indexer import reindex_snapshots
+  from ggrc.fulltext import index_queue
   from ggrc.fulltext.mixin import Indexed
   if cache is None:
     return
@@ -324,6 +354,9 @@ def update_index(session, cache):
       indexer.update_record(indexer.fts_record_for(obj), commit=False)
   for obj in cache.deleted:
     indexer.delete_record(obj.id, obj.__class__.__name__, commit=False)
+  if reindex_snapshots_list and index_queue.is_async():
+    index_queue.enqueue({"Snapshot": reindex_snapshots_list})
+    reindex_snapshots_list = []
   session.commit()
   if reindex_snapshots_list:
     for snapshot_id in reindex_snapshots_list:
@@ -331,17 +364,12 @@ def update_index(session, cache):
     reindex_snapshots(reindex_snapshots_list)
 
 
-def _revision_generator(user_id, action, objects):
-  for obj in objects:
-    yield Revision(obj, user_id, action, obj.log_json())
-
-
-def _get_log_revisions(current_user_id, obj=None, force_obj=False):
-  """Generate and return revisions for all cached objects."""
-  revisions = []
+def _get_log_revision_actions(obj=None, force_obj=False):
+  """Get (object, action) pairs of all cached objects that need revisions."""
+  actions = []
   cache = get_cache()
   if not cache:
-    return revisions
+    return actions
   owner_modified_objects = []
   folder_modified_objects = []
   all_edited_objects = itertools.chain(cache.new, cache.dirty, cache.deleted)
@@ -350,33 +378,30 @@ def _get_log_revisions(current_user_id, obj=None, force_obj=False):
       owner_modified_objects.append(o.ownable)
     if o.type == "ObjectFolder" and o.folderable:
       folder_modified_objects.append(o.folderable)
-  revisions.extend(_revision_generator(
-      current_user_id, "created", cache.new
-  ))
-  revisions.extend(_revision_generator(
-      current_user_id, "modified", cache.dirty
-  ))
-  revisions.extend(_revision_generator(
-      current_user_id, "modified", owner_modified_objects
-  ))
-  revisions.extend(_revision_generator(
-      current_user_id, "modified", folder_modified_objects
-  ))
+  actions.extend((o, "created") for o in cache.new)
+  actions.extend((o, "modified") for o in cache.dirty)
+  actions.extend((o, "modified") for o in owner_modified_objects)
+  actions.extend((o, "modified") for o in folder_modified_objects)
   if force_obj and obj is not None and obj not in cache.dirty:
     # If the ``obj`` has been updated, but only its custom attributes have
     # been changed, then this object will not be added into
     # ``cache.dirty set``. So that its revision will not be created.
     # The ``force_obj`` flag solves the issue, but in a bit dirty way.
-    revision = Revision(obj, current_user_id, 'modified', obj.log_json())
-    revisions.append(revision)
-  revisions.extend(_revision_generator(
-      current_user_id, "deleted", cache.deleted
-  ))
-  return revisions
+    actions.append((obj, "modified"))
+  actions.extend((o, "deleted") for o in cache.deleted)
+  return actions
+
+
+def _get_log_revisions(current_user_id, obj=None, force_obj=False):
+  """Generate and return revisions for all cached objects."""
+  return [
+      Revision(o, current_user_id, action, o.log_json())
+      for o, action in _get_log_revision_actions(obj, force_obj)
+  ]
 
 
 def log_event(session, obj=None, current_user_id=None, flush=True,
-              force_obj=False):
+              force_obj=False, insert_revisions=False):
   """Logs an event on object `obj`.
 
   Args:
@@ -385,6 +410,10 @@ def log_event(session, obj=None, current_user_id=None, flush=True,
     current_user_id: ID of the user performing operation
     flush: If set to true, flush the session at the start
     force_obj: Used in case of custom attribute changes to force revision write
+    insert_revisions: If set to true, flush the event and write its
+      revisions with revision_writer instead of adding Revision objects to
+      the session. The revisions are then not available through
+      event.revisions.
   Returns:
     Uncommitted models.Event instance
   """
@@ -393,7 +422,12 @@ def log_event(session, obj=None, current_user_id=None, flush=True,
     session.flush()
   if current_user_id is None:
     current_user_id = get_current_user_id()
-  revisions = _get_log_revisions(current_user_id, obj=obj, force_obj=force_obj)
+  if insert_revisions:
+    revisions = _get_log_revision_actions(obj=obj, force_obj=force_obj)
+  else:
+    revisions = _get_log_revisions(current_user_id, obj=obj,
+                                   force_obj=force_obj)
+    revision_content.compact_revisions(revisions)
   if obj is None:
     resource_id = 0
     resource_type = None
@@ -411,20 +445,66 @@ def log_event(session, obj=None, current_user_id=None, flush=True,
         resource_id=resource_id,
         resource_type=resource_type,
         context_id=context_id)
-    event.revisions = revisions
     session.add(event)
+    if insert_revisions:
+      session.flush([event])
+      revision_writer.write_revisions(
+          session, event.id, current_user_id, revisions)
+    else:
+      event.revisions = revisions
   return event
 
 
-def clear_permission_cache():
+class PhaseTimings(object):
+  """Benchmark phases of a request and keep their total durations."""
+
+  def __init__(self):
+    self.timings = OrderedDict()
+
+  @contextmanager
+  def phase(self, name):
+    """Benchmark a phase and add its duration to the phase total."""
+    start = time.time()
+    try:
+      with benchmark(name):
+        yield
+    finally:
+      self.timings[name] = self.timings.get(name, 0) + time.time() - start
+
+  def as_dict(self):
+    """Get phase durations in milliseconds."""
+    return OrderedDict((name, round(seconds * 1000, 3))
+                       for name, seconds in self.timings.iteritems())
+
+
+def clear_permission_cache(changed=None):
+  """Clear cached user permissions.
+
+  Args:
+    changed: dict with sets of changed object ids by type. Only permissions
+      that depend on these objects are cleared. Permissions of all users are
+      cleared if it is None.
+  """
   if not getattr(settings, 'MEMCACHE_MECHANISM', False):
     return
   cache = _get_cache_manager().cache_object.memcache_client
   cached_keys_set = cache.get('permissions:list') or set()
-  cached_keys_set.add('permissions:list')
-  # We delete all the cached user permissions as well as
-  # the permissions:list value itself
-  cache.delete_multi(cached_keys_set)
+  if changed is None:
+    cached_keys_set.add('permissions:list')
+    # We delete all the cached user permissions as well as
+    # the permissions:list value itself
+    cache.delete_multi(cached_keys_set)
+    return
+  if not changed:
+    return
+  affected = dependencies.get_affected_keys(cache, cached_keys_set, changed)
+  if affected:
+    # Affected keys are removed from permissions:list so that permissions
+    # that are being loaded right now are not stored with stale content.
+    cache.set('permissions:list', cached_keys_set - affected,
+              dependencies.PERMISSION_CACHE_TIMEOUT)
+    cache.delete_multi(list(affected) + [
+        dependencies.dependencies_key(key) for key in affected])
 
 
 class ModelView(View):
@@ -1047,6 +1127,12 @@ class Resource(ModelView):
         with benchmark("Query matches"):
           matches = matches_query.all()
           extras = {}
+    with benchmark("dispatch_request > collection_get > Check etag"):
+      collection_etag = self.collection_etag(matches, extras)
+      if (collection_etag is not None and
+              self.request.headers.get('If-None-Match') == collection_etag):
+        return current_app.make_response((
+            '', 304, [('Etag', collection_etag)]))
     with benchmark("dispatch_request > collection_get > Matched resources"):
       cache_op = None
       if '__stubs_only' in request.args:
@@ -1079,17 +1165,60 @@ class Resource(ModelView):
         collection = self.build_collection_representation(
             objs, extras=extras)
 
-      if 'If-None-Match' in self.request.headers and \
-         self.request.headers['If-None-Match'] == etag(collection):
-        return current_app.make_response((
-            '', 304, [('Etag', etag(collection))]))
+      if collection_etag is None:
+        collection_etag = etag(collection)
+        if self.request.headers.get('If-None-Match') == collection_etag:
+          return current_app.make_response((
+              '', 304, [('Etag', collection_etag)]))
 
       with benchmark("Make response"):
         return self.json_success_response(
-            collection, self.collection_last_modified(), cache_op=cache_op)
+            collection, self.collection_last_modified(), cache_op=cache_op,
+            response_etag=collection_etag)
+
+  def collection_etag(self, matches, extras):
+    """Calculate the etag of a collection from its matched rows.
+
+    The etag is built from the newest updated_at value, the number and ids
+    of the matched rows, the permissions of the current user and the query
+    arguments, so a request with a matching If-None-Match header can be
+    answered before any object is loaded or serialized.
+
+    Returns:
+      The etag string, or None if the matched rows have no updated_at column
+      and the etag has to be calculated from the serialized collection.
+    """
+    if not hasattr(self.model._sa_class_manager.mapper.c, 'updated_at'):
+      return None
+    ids_hash = hashlib.sha1(
+        ",".join(str(match.id) for match in matches)).hexdigest()
+    last_updated_at = max([match.updated_at for match in matches] or [None])
+    return etag((
+        self.model.__name__,
+        last_updated_at,
+        len(matches),
+        ids_hash,
+        json.dumps(extras, sort_keys=True),
+        _get_permissions_hash(),
+        sorted(self.request.args.items(multi=True)),
+    ))
+
+  def _get_bulk_cache_client(self):
+    """Get the bulk memcache client shared by cache reads and writes."""
+    from ggrc.cache.bulk import BulkCacheClient
+    if getattr(self.request, "bulk_cache_client", None) is None:
+      cache_manager = self.request.cache_manager
+      self.request.bulk_cache_client = BulkCacheClient(
+          cache_manager.cache_object.memcache_client,
+          local_cache=cache_manager.local_cache)
+    return self.request.bulk_cache_client
 
   def get_resources_from_cache(self, matches):
-    """Get resources from cache for specified matches"""
+    """Get resources from cache for specified matches
+
+    DeleteOp blockers of all keys are fetched in the same multi-gets, so
+    add_resources_to_cache does not need to look them up again.
+    """
     resources = {}
     # Disable caching for background tasks
     # Setting background task status circumvents our memcache
@@ -1097,46 +1226,24 @@ class Resource(ModelView):
     if self.model.__name__ == 'BackgroundTask':
       return resources
     # Skip right to memcache
-    memcache_client = self.request.cache_manager.cache_object.memcache_client
     key_matches = {}
-    keys = []
     for match in matches:
       key = get_cache_key(None, id=match[0], type=match[1])
       key_matches[key] = match
-      keys.append(key)
-    while len(keys) > 0:
-      slice_keys = keys[:32]
-      keys = keys[32:]
-      result = memcache_client.get_multi(slice_keys)
-      for key in result:
-        if 'selfLink' in result[key]:
-          resources[key_matches[key]] = result[key]
+    result = self._get_bulk_cache_client().get_with_blockers(key_matches)
+    for key, value in result.iteritems():
+      if 'selfLink' in value:
+        resources[key_matches[key]] = value
     return resources
 
   def add_resources_to_cache(self, match_obj_pairs):
     """Add resources to cache if they are not blocked by DeleteOp entries"""
     # Skip right to memcache
-    memcache_client = self.request.cache_manager.cache_object.memcache_client
     key_objs = {}
-    key_blockers = {}
-    keys = []
     for match, obj in match_obj_pairs.items():
       key = get_cache_key(None, id=match[0], type=match[1])
-      delete_op_key = "DeleteOp:{}".format(key)
-      keys.append(key)
       key_objs[key] = obj
-      key_blockers[key] = delete_op_key
-    while len(keys) > 0:
-      slice_keys = keys[:32]
-      keys = keys[32:]
-      blocker_keys = [key_blockers[slice_key] for slice_key in slice_keys]
-      result = memcache_client.get_multi(blocker_keys)
-      # Reduce `slice_keys` to only unblocked keys
-      slice_keys = [
-          slice_key for slice_key in slice_keys
-          if key_blockers[slice_key] not in result]
-      memcache_client.add_multi(
-          {key: key_objs[key] for key in slice_keys})
+    self._get_bulk_cache_client().add_multi(key_objs)
 
   def json_create(self, obj, src):
     ggrc.builder.json.create(obj, src)
@@ -1280,7 +1387,49 @@ class Resource(ModelView):
             obj.id: obj for obj in class_.query.filter(class_.id.in_(ids))
         }
 
-  def collection_post_loop(self, body, res, no_result, running_async):
+  def _generate_objects(self, srcs, body, timings):
+    """Deserialize posted sources into model instances.
+
+    Args:
+      srcs: list of wrapped sources to deserialize.
+      body: list of all posted sources, used for the relationships cache.
+      timings: PhaseTimings that get the time spent on each phase.
+
+    Returns:
+      Tuple of lists with the created objects and their unwrapped sources.
+    """
+    objects = []
+    sources = []
+    for wrapped_src in srcs:
+      src = self._unwrap_collection_post_src(wrapped_src)
+      obj = self._get_model_instance(src, body)
+      with timings.phase("Deserialize object"):
+        self.json_create(obj, src)
+      with timings.phase("Send model POSTed event"):
+        signals.Restful.model_posted.send(
+            obj.__class__, obj=obj, src=src, service=self)
+      with timings.phase("Update custom attribute values"):
+        set_ids_for_new_custom_attributes(obj)
+
+      obj.modified_by = get_current_user()
+      objects.append(obj)
+      sources.append(src)
+    return objects, sources
+
+  @staticmethod
+  def _send_collection_posted(objects, sources):
+    """Send one collection POSTed event for objects of each model."""
+    collections = OrderedDict()
+    for obj, src in itertools.izip(objects, sources):
+      collection = collections.setdefault(obj.__class__, ([], []))
+      collection[0].append(obj)
+      collection[1].append(src)
+    for model, (model_objects, model_sources) in collections.iteritems():
+      signals.Restful.collection_posted.send(
+          model, objects=model_objects, sources=model_sources)
+
+  def collection_post_loop(self, body, res, no_result, running_async,
+                           timings=None):
     """Handle all posted objects.
 
     Args:
@@ -1288,56 +1437,93 @@ class Resource(ModelView):
       res: List that will get responses appended to it.
       no_result: Flag for suppressing results.
       running_async: Flag for async jobs.
+      timings: PhaseTimings that get the time spent on each phase.
     """
+    # pylint: disable=unused-argument
+    if timings is None:
+      timings = PhaseTimings()
 
-    with benchmark("Generate objects"):
-      objects = []
-      sources = []
-      for wrapped_src in body:
-        src = self._unwrap_collection_post_src(wrapped_src)
-        obj = self._get_model_instance(src, body)
-        with benchmark("Deserialize object"):
-          self.json_create(obj, src)
-        with benchmark("Send model POSTed event"):
-          signals.Restful.model_posted.send(
-              obj.__class__, obj=obj, src=src, service=self)
-        with benchmark("Update custom attribute values"):
-          set_ids_for_new_custom_attributes(obj)
-
-        obj.modified_by = get_current_user()
-        objects.append(obj)
-        sources.append(src)
-
-    with benchmark("Check create permissions"):
+    with timings.phase("Generate objects"):
+      objects, sources = self._generate_objects(body, body, timings)
+    with timings.phase("Check create permissions"):
       self._check_post_permissions(objects)
-    with benchmark("Send collection POSTed event"):
-      signals.Restful.collection_posted.send(
-          obj.__class__, objects=objects, sources=sources)
-    with benchmark("Flush posted objects"):
+    with timings.phase("Send collection POSTed event"):
+      self._send_collection_posted(objects, sources)
+    with timings.phase("Flush posted objects"):
       db.session.flush()
-    with benchmark("Validate custom attributes"):
+    self._commit_posted_objects(objects, sources, res, no_result, timings)
+
+  def collection_post_bulk(self, body, res, no_result, timings=None):
+    """Handle posted objects in batches.
+
+    Every batch of COLLECTION_POST_BATCH_SIZE objects is deserialized,
+    checked, announced with collection POSTed events and flushed on its own.
+    All objects are then logged in a single event whose revisions are written
+    with one executemany INSERT, and committed together.
+
+    Args:
+      body: list of dictionaries containing json object representations.
+      res: List that will get responses appended to it.
+      no_result: Flag for suppressing results.
+      timings: PhaseTimings that get the time spent on each phase.
+    """
+    if timings is None:
+      timings = PhaseTimings()
+    batch_size = getattr(settings, "COLLECTION_POST_BATCH_SIZE", 500)
+    objects = []
+    sources = []
+    for start in range(0, len(body), batch_size):
+      batch = body[start:start + batch_size]
+      with timings.phase("Generate objects"):
+        batch_objects, batch_sources = self._generate_objects(
+            batch, body, timings)
+      with timings.phase("Check create permissions"):
+        self._check_post_permissions(batch_objects)
+      with timings.phase("Send collection POSTed event"):
+        self._send_collection_posted(batch_objects, batch_sources)
+      with timings.phase("Flush posted objects"):
+        db.session.flush()
+      objects.extend(batch_objects)
+      sources.extend(batch_sources)
+    self._commit_posted_objects(objects, sources, res, no_result, timings,
+                                insert_revisions=True)
+
+  def _commit_posted_objects(self, objects, sources, res, no_result, timings,
+                             insert_revisions=False):
+    """Log, serialize and commit flushed posted objects.
+
+    Args:
+      objects: list of posted objects.
+      sources: list of posted sources in the same order as objects.
+      res: List that will get responses appended to it.
+      no_result: Flag for suppressing results.
+      timings: PhaseTimings that get the time spent on each phase.
+      insert_revisions: Flag for writing revisions with executemany.
+    """
+    with timings.phase("Validate custom attributes"):
       for obj in objects:
         if hasattr(obj, "validate_custom_attributes"):
           obj.validate_custom_attributes()
-    with benchmark("Get modified objects"):
+    with timings.phase("Get modified objects"):
       modified_objects = get_modified_objects(db.session)
-    with benchmark("Log event for all objects"):
-      event = log_event(db.session, obj, flush=False)
-    with benchmark("Update memcache before commit for collection POST"):
+    with timings.phase("Log event for all objects"):
+      event = log_event(db.session, objects[-1] if objects else None,
+                        flush=False, insert_revisions=insert_revisions)
+    with timings.phase("Update memcache before commit for collection POST"):
       update_memcache_before_commit(
           self.request, modified_objects, CACHE_EXPIRY_COLLECTION)
-    with benchmark("Serialize objects"):
+    with timings.phase("Serialize objects"):
       for obj in objects:
         object_for_json = {} if no_result else self.object_for_json(obj)
         res.append((201, object_for_json))
-    with benchmark("Commit collection"):
+    with timings.phase("Commit collection"):
       db.session.commit()
-    with benchmark("Update index"):
+    with timings.phase("Update index"):
       update_index(db.session, modified_objects)
-    with benchmark("Update memcache after commit for collection POST"):
+    with timings.phase("Update memcache after commit for collection POST"):
       update_memcache_after_commit(self.request)
 
-    with benchmark("Send model POSTed - after commit event"):
+    with timings.phase("Send model POSTed - after commit event"):
       for obj, src in itertools.izip(objects, sources):
         signals.Restful.model_posted_after_commit.send(
             obj.__class__, obj=obj, src=src, service=self, event=event)
@@ -1382,11 +1568,16 @@ class Resource(ModelView):
       if wrap:
         body = [body]
       res = []
+      timings = PhaseTimings()
       with benchmark("collection post > body loop: {}".format(len(body))):
-        with benchmark("Build stub query cache"):
+        with timings.phase("Build stub query cache"):
           self._build_request_stub_cache(body)
         try:
-          self.collection_post_loop(body, res, no_result, running_async)
+          if "X-GGRC-Bulk-Create" in request.headers:
+            self.collection_post_bulk(body, res, no_result, timings)
+          else:
+            self.collection_post_loop(body, res, no_result, running_async,
+                                      timings)
         except (IntegrityError, ValidationError, ValueError) as error:
           res.append(self._make_error_from_exception(error))
           db.session.rollback()
@@ -1415,6 +1606,8 @@ class Resource(ModelView):
                 "X-Flash-Error"] = ' || '.join((error for _, error in errors))
           else:
             status = 200
+        if "X-GGRC-Debug-Timings" in request.headers:
+          headers["X-GGRC-Timings"] = json.dumps(timings.as_dict())
       with benchmark("collection post > make response"):
         result = current_app.make_response(
             (self.as_json(res), status, headers))
@@ -1507,6 +1700,8 @@ class Resource(ModelView):
       query = model.eager_query()
       # We force the query here so that we can benchmark it
       objs = query.filter(model.id.in_(ids.keys())).all()
+    with benchmark("Load revision contents"):
+      Revision.load_full_contents(_get_published_revisions(objs))
     with benchmark("Publish objects"):
       resources = {}
       includes = self.get_properties_to_include(request.args.get('__include'))
@@ -1551,10 +1746,11 @@ class Resource(ModelView):
     return format_date_time(time.mktime(timestamp.utctimetuple()))
 
   def json_success_response(self, response_object, last_modified,
-                            status=200, id=None, cache_op=None):
+                            status=200, id=None, cache_op=None,
+                            response_etag=None):
     headers = [
         ('Last-Modified', self.http_timestamp(last_modified)),
-        ('Etag', etag(response_object)),
+        ('Etag', response_etag or etag(response_object)),
         ('Content-Type', 'application/json'),
     ]
     if id is not None:
@@ -1581,25 +1777,104 @@ class ReadOnlyResource(Resource):
       raise NotImplementedError()
 
 
-def filter_resource(resource, depth=0, user_permissions=None):  # noqa
-  """
-  Returns:
-     The subset of resources which are readable based on user_permissions
+class ReadPermissionFilter(object):
+  """Memoized read permission checks for filtering published resources.
+
+  Allowed contexts and resources of a type are computed only once and
+  instances of resources that are referenced by Revision objects are loaded
+  with a single query per type, so that filtering a whole collection does not
+  repeat the same permission lookups and queries for every object in it.
   """
 
-  if user_permissions is None:
-    user_permissions = permissions.permissions_for(get_current_user())
-
-  if isinstance(resource, (list, tuple)):
-    filtered = []
-    for sub_resource in resource:
-      filtered_sub_resource = filter_resource(
-          sub_resource, depth=depth + 1, user_permissions=user_permissions)
-      if filtered_sub_resource is not None:
-        filtered.append(filtered_sub_resource)
-    return filtered
-  elif isinstance(resource, dict) and 'type' in resource:
-    # First check current level
+  def __init__(self, user_permissions=None):
+    if user_permissions is None:
+      user_permissions = permissions.permissions_for(get_current_user())
+    self.user_permissions = user_permissions
+    self.is_creator = _is_creator()
+    self._read_contexts = {}
+    self._read_resources = {}
+    self._allowed_reads = {}
+    self._allowed_revisions = {}
+
+  def _get_read_contexts(self, resource_type):
+    """Get a set of readable contexts or None if all contexts are readable."""
+    if resource_type not in self._read_contexts:
+      contexts = permissions.read_contexts_for(resource_type)
+      if contexts is not None:
+        contexts = set(contexts)
+      self._read_contexts[resource_type] = contexts
+    return self._read_contexts[resource_type]
+
+  def _get_read_resources(self, resource_type):
+    if resource_type not in self._read_resources:
+      resources = permissions.read_resources_for(resource_type) or []
+      self._read_resources[resource_type] = set(resources)
+    return self._read_resources[resource_type]
+
+  def is_allowed_read(self, resource_type, resource_id, context_id):
+    key = (resource_type, resource_id, context_id)
+    if key not in self._allowed_reads:
+      self._allowed_reads[key] = self.user_permissions.is_allowed_read(
+          resource_type, resource_id, context_id)
+    return self._allowed_reads[key]
+
+  def is_allowed_relationship(self, resource):
+    """Check if a Creator can read both sides of a relationship.
+
+    In order to avoid loading full instances and using is_allowed_read_for,
+    we are making a special test for the Creator here. Creator can only see
+    relationship objects where he has read access on both source and
+    destination. This is defined in Creator.py:220 file, but is_allowed_read
+    can not check conditions without the full instance.
+    """
+    for name in ('source', 'destination'):
+      inst = resource[name]
+      if not inst:
+        # If object was deleted but relationship still exists
+        continue
+      contexts = self._get_read_contexts(inst['type'])
+      if contexts is None:
+        # read_contexts_for returns None if the user has access to all the
+        # objects of this type. If the user doesn't have access to any object
+        # an empty list ([]) will be returned
+        continue
+      if (inst['context_id'] in contexts or
+              inst['id'] in self._get_read_resources(inst['type'])):
+        continue
+      return False
+    return True
+
+  def load_revision_targets(self, resources):
+    """Check read access for all resources of the given revisions.
+
+    Instances are loaded with one query per resource type and only the
+    results of is_allowed_read_for are kept.
+    """
+    ids_by_type = defaultdict(set)
+    for resource in resources:
+      if isinstance(resource, dict) and resource.get('type') == "Revision":
+        key = (resource['resource_type'], resource['resource_id'])
+        if key not in self._allowed_revisions:
+          ids_by_type[key[0]].add(key[1])
+    for resource_type, ids in ids_by_type.iteritems():
+      res_model = getattr(ggrc.models.all_models, resource_type)
+      with benchmark("Load revision targets for {}".format(resource_type)):
+        instances = res_model.query.filter(res_model.id.in_(ids)).all()
+      for instance in instances:
+        self._allowed_revisions[(resource_type, instance.id)] = \
+            self.user_permissions.is_allowed_read_for(instance)
+      for id_ in ids:
+        # Missing instances are never readable
+        self._allowed_revisions.setdefault((resource_type, id_), False)
+
+  def is_allowed_revision(self, resource):
+    key = (resource['resource_type'], resource['resource_id'])
+    if key not in self._allowed_revisions:
+      self.load_revision_targets([resource])
+    return self._allowed_revisions[key]
+
+  def is_allowed_resource(self, resource):
+    """Check read access for a single resource without its sub-resources."""
     context_id = False
     if 'context' in resource:
       if resource['context'] is None:
@@ -1610,56 +1885,63 @@ def filter_resource(resource, depth=0, user_permissions=None):  # noqa
       context_id = resource['context_id']
     assert context_id is not False, "No context found for object"
 
-    # In order to avoid loading full instances and using is_allowed_read_for,
-    # we are making a special test for the Creator here. Creator can only
-    # see relationship objects where he has read access on both source and
-    # destination. This is defined in Creator.py:220 file, but is_allowed_read
-    # can not check conditions without the full instance
-    if resource['type'] == "Relationship" and _is_creator():
+    if resource['type'] == "Relationship" and self.is_creator:
       # Make a check for relationship objects that are a special case
-      can_read = True
-      for name in ('source', 'destination'):
-        inst = resource[name]
-        if not inst:
-          # If object was deleted but relationship still exists
-          continue
-        contexts = permissions.read_contexts_for(inst['type'])
-        if contexts is None:
-          # read_contexts_for returns None if the user has access to all the
-          # objects of this type. If the user doesn't have access to any object
-          # an empty list ([]) will be returned
-          continue
-        resources = permissions.read_resources_for(inst['type']) or []
-        if inst['context_id'] in contexts or inst['id'] in resources:
-          continue
-        can_read = False
-      if not can_read:
-        return None
-    elif resource['type'] == "Revision" and _is_creator():
+      return self.is_allowed_relationship(resource)
+    if resource['type'] == "Revision" and self.is_creator:
       # Make a check for revision objects that are a special case
-      res_model = getattr(ggrc.models.all_models, resource['resource_type'])
-      instance = res_model.query.get(resource['resource_id'])
-      if instance is None or\
-         not user_permissions.is_allowed_read_for(instance):
+      return self.is_allowed_revision(resource)
+    return self.is_allowed_read(resource['type'], resource['id'], context_id)
+
+  def filter(self, resource):
+    """
+    Returns:
+       The subset of resources which are readable based on user_permissions
+    """
+    if isinstance(resource, (list, tuple)):
+      if self.is_creator:
+        self.load_revision_targets(resource)
+      filtered = []
+      for sub_resource in resource:
+        filtered_sub_resource = self.filter(sub_resource)
+        if filtered_sub_resource is not None:
+          filtered.append(filtered_sub_resource)
+      return filtered
+    elif isinstance(resource, dict) and 'type' in resource:
+      # First check current level
+      if not self.is_allowed_resource(resource):
         return None
+      # Then, filter any typed keys
+      for key, value in resource.items():
+        if key == 'context':
+          # Explicitly allow `context` objects to pass through
+          pass
+        else:
+          # Apply filtering to sub-resources
+          if isinstance(value, dict) and 'type' in value:
+            resource[key] = self.filter(value)
+
+      return resource
     else:
-      if not user_permissions.is_allowed_read(resource['type'],
-                                              resource['id'], context_id):
-        return None
-    # Then, filter any typed keys
-    for key, value in resource.items():
-      if key == 'context':
-        # Explicitly allow `context` objects to pass through
-        pass
-      else:
-        # Apply filtering to sub-resources
-        if isinstance(value, dict) and 'type' in value:
-          resource[key] = filter_resource(
-              value, depth=depth + 1, user_permissions=user_permissions)
+      assert False, "Non-object passed to filter_resource"
 
-    return resource
-  else:
-    assert False, "Non-object passed to filter_resource"
+
+def filter_resource(resource, depth=0, user_permissions=None):
+  """
+  Returns:
+     The subset of resources which are readable based on user_permissions
+  """
+  # pylint: disable=unused-argument
+  return ReadPermissionFilter(user_permissions).filter(resource)
+
+
+def _get_permissions_hash():
+  """Get a hash of the current user and the permissions of the request."""
+  request_permissions = getattr(g, '_request_permissions', None)
+  return hashlib.sha1("{}:{}".format(
+      get_current_user_id(),
+      json.dumps(request_permissions, sort_keys=True, default=repr),
+  )).hexdigest()
 
 
 def _is_creator():
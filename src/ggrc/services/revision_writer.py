@@ -0,0 +1,120 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Write revisions of logged objects with Core INSERT statements.
+
+Revision ORM objects are serialized by LongJsonType when the session is
+flushed, where the content length is checked by encoding it once more, and
+they stay in the session identity map until the end of the transaction. The
+writer builds plain rows instead. Content of every object is serialized once,
+even if the object is logged more than once, and rows are inserted in
+executemany batches limited by row count and content size.
+"""
+
+from ggrc import settings
+from ggrc import utils
+from ggrc.utils import json_backends
+from ggrc.models import revision_content
+from ggrc.models.exceptions import ValidationError
+from ggrc.models.revision import Revision
+from ggrc.models.revision import update_latest_revisions_for_event
+from ggrc.models.types import LongJsonType
+
+
+def serialize_content(content):
+  """Serialize revision content and check its length.
+
+  Returns:
+    Tuple with the serialized content and its length in bytes.
+  """
+  value = utils.as_json(content)
+  size = json_backends.byte_length(value)
+  if size > LongJsonType.MAX_TEXT_LENGTH:
+    raise ValidationError("Log record content too long")
+  return value, size
+
+
+def build_rows(user_id, actions):
+  """Build revisions table rows for logged objects.
+
+  Args:
+    user_id: id of the user that modified the objects.
+    actions: iterable of (object, action) pairs in the order in which the
+      revisions should be written.
+
+  Yields:
+    Tuples with a row without event_id and the size of its content.
+  """
+  actions = list(actions)
+  contents = {}
+  for obj, _ in actions:
+    if obj not in contents:
+      contents[obj] = obj.log_json()
+  encoded = revision_content.encode_contents([
+      (obj.__class__.__name__, obj.id, contents[obj]) for obj, _ in actions
+  ])
+  serialized = {}
+  for (obj, action), (checkpoint_id, patch) in zip(actions, encoded):
+    if checkpoint_id is not None:
+      content, size = None, len(patch)
+    else:
+      if obj not in serialized:
+        serialized[obj] = serialize_content(contents[obj])
+      content, size = serialized[obj]
+    yield {
+        "resource_id": obj.id,
+        "resource_type": obj.__class__.__name__,
+        "resource_slug": getattr(obj, "slug", None),
+        "modified_by_id": user_id,
+        "action": action,
+        "content": content,
+        "checkpoint_id": checkpoint_id,
+        "content_patch": patch,
+        "source_type": getattr(obj, "source_type", None),
+        "source_id": getattr(obj, "source_id", None),
+        "destination_type": getattr(obj, "destination_type", None),
+        "destination_id": getattr(obj, "destination_id", None),
+        "context_id": None,
+    }, size
+
+
+def write_revisions(session, event_id, user_id, actions,
+                    batch_size=None, max_batch_bytes=None):
+  """Insert revisions of logged objects for a flushed event.
+
+  Args:
+    session: SQLAlchemy session of the current transaction.
+    event_id: id of the event the revisions belong to.
+    user_id: id of the user that modified the objects.
+    actions: iterable of (object, action) pairs.
+    batch_size: maximum number of rows per INSERT statement.
+    max_batch_bytes: maximum size of content per INSERT statement. A single
+      row with larger content is inserted on its own.
+
+  Returns:
+    Number of inserted revisions.
+  """
+  if batch_size is None:
+    batch_size = getattr(settings, "REVISION_INSERT_BATCH_SIZE", 1000)
+  if max_batch_bytes is None:
+    max_batch_bytes = getattr(settings, "REVISION_INSERT_MAX_BYTES",
+                              2 * 1024 * 1024)
+  inserter = Revision.__table__.insert()
+  count = 0
+  batch = []
+  batch_bytes = 0
+  for row, size in build_rows(user_id, actions):
+    if batch and (len(batch) >= batch_size or
+                  batch_bytes + size > max_batch_bytes):
+      session.execute(inserter, batch)
+      batch = []
+      batch_bytes = 0
+    row["event_id"] = event_id
+    batch.append(row)
+    batch_bytes += size
+    count += 1
+  if batch:
+    session.execute(inserter, batch)
+  if count:
+    update_latest_revisions_for_event(session.connection(), event_id)
+  return count
@@ -8,6 +8,7 @@ from flask import request, current_app
 import ggrc.models.relationship
 
 from ggrc.fulltext import get_indexer
+from ggrc.fulltext import index_queue
 from ggrc.utils import GrcEncoder, url_for, benchmark
 from ggrc import db
 
@@ -89,10 +90,10 @@ def do_counts(terms, types=None, contact_id=None,
   results = [(r[2] if r[2] != "" else r[0], r[1]) for r in results]
   return current_app.make_response((
       json.dumps({
-          'results': {
+          'results': with_index_lag({
               'selfLink': request.url,
               'counts': dict(results)
-          }
+          })
       }, cls=GrcEncoder),
       200,
       [('Content-Type', 'application/json')],
@@ -155,13 +156,20 @@ def do_search(terms, list_for_type, types=None, permission_type='read',
       })
 
 
+def with_index_lag(results):
+  """Add the full text index lag to search results in async index mode."""
+  if index_queue.is_async():
+    results['index_lag'] = index_queue.get_index_lag()
+  return results
+
+
 def make_search_result(entries):
   return current_app.make_response((
       json.dumps({
-          'results': {
+          'results': with_index_lag({
               'selfLink': request.url,
               'entries': entries,
-          }
+          })
       }, cls=GrcEncoder),
       200,
       [('Content-Type', 'application/json')],
@@ -69,6 +69,16 @@ SQLALCHEMY_DATABASE_URI = os.environ.get('GGRC_DATABASE_URI', '')
 SECRET_KEY = os.environ.get('GGRC_SECRET_KEY', 'Replace-with-something-secret')
 
 MEMCACHE_MECHANISM = True
+# Initial and maximum number of keys per memcache multi-key call. The batch
+# size adapts to memcache latency between these values.
+MEMCACHE_BATCH_SIZE = 100
+MEMCACHE_MAX_BATCH_SIZE = 1000
+# Number of memcache batches that are sent at the same time
+MEMCACHE_CONCURRENT_BATCHES = 4
+# Size in bytes and TTL in seconds of the in-process cache in front of
+# memcache. Changes made on other instances are visible after the TTL.
+MEMCACHE_LOCAL_CACHE_BYTES = 32 * 1024 * 1024
+MEMCACHE_LOCAL_CACHE_TTL = 10
 
 # AppEngine Email
 APPENGINE_EMAIL = os.environ.get('APPENGINE_EMAIL', '')
@@ -92,6 +102,48 @@ EMAIL_PENDING = JINJA2.get_template("notifications/view_pending_digest.html")
 USE_APP_ENGINE_ASSETS_SUBDOMAIN = False
 
 BACKGROUND_COLLECTION_POST_SLEEP = 0
+# Number of objects deserialized and flushed together by collection POST
+# requests with the X-GGRC-Bulk-Create header.
+COLLECTION_POST_BATCH_SIZE = 500
+# Maximum number of rows and content bytes per INSERT statement when
+# revisions of bulk operations are written without the ORM.
+REVISION_INSERT_BATCH_SIZE = 1000
+REVISION_INSERT_MAX_BYTES = 2 * 1024 * 1024
+# Store revision content as compressed patches against a full checkpoint
+# that is written on every REVISION_CHECKPOINT_INTERVAL revision of an object.
+REVISION_DELTA_STORAGE = (
+    os.environ.get("GGRC_REVISION_DELTA_STORAGE") == "true")
+REVISION_CHECKPOINT_INTERVAL = 20
+# JSON serializer used for API responses and JSON columns: "auto" picks the
+# fastest installed one, "ujson" or "json" select one explicitly.
+JSON_BACKEND = os.environ.get("GGRC_JSON_BACKEND", "auto")
+# Compression of background task parameters and results: "zlib", or "lz4" if
+# the lz4 library is installed.
+COMPRESSED_TYPE_CODEC = os.environ.get("GGRC_COMPRESSED_TYPE_CODEC", "zlib")
+
+# Store objects that need to be reindexed in the full text index queue and
+# reindex them in a background job instead of in the request transaction.
+FULLTEXT_INDEX_ASYNC = os.environ.get("GGRC_FULLTEXT_INDEX_ASYNC") == "true"
+FULLTEXT_INDEX_QUEUE_BATCH_SIZE = 1000
+# Number of people whose names and emails are kept while reindexing
+# snapshots.
+SNAPSHOT_INDEXER_PEOPLE_CACHE_SIZE = 10000
+# Number of snapshots written by a single bulk insert or update statement.
+SNAPSHOT_UPSERT_CHUNK_SIZE = 1000
+
+# Full text reindex is split into shards of this many objects, which are
+# processed by REINDEX_PROCESSES worker processes.
+REINDEX_SHARD_SIZE = 10000
+REINDEX_PROCESSES = int(os.environ.get("GGRC_REINDEX_PROCESSES", "1"))
+# A running reindex task stores its progress after every shard. A task that
+# has not stored any progress for this many seconds is considered dead and
+# the next reindex resumes its shards.
+REINDEX_HEARTBEAT_TIMEOUT = int(
+    os.environ.get("GGRC_REINDEX_HEARTBEAT_TIMEOUT", "3600"))
+
+# Render exported csv files in chunks of objects and send them as a chunked
+# response instead of building the whole file in memory.
+EXPORT_STREAMING = True
 
 
 LOGGING_HANDLER = {
@@ -12,5 +12,6 @@ SQLALCHEMY_DATABASE_URI = 'mysql+mysqldb://root:root@{}/ggrcdevtest'.format(
 )
 FULLTEXT_INDEXER = 'ggrc.fulltext.mysql.MysqlIndexer'
 LOGIN_MANAGER = 'ggrc.login.noop'
+FULLTEXT_INDEX_ASYNC = False
 # SQLALCHEMY_ECHO = True
 MEMCACHE_MECHANISM = False
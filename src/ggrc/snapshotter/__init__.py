@@ -8,24 +8,28 @@ snapshot object represent a join between parent object (Audit),
 child object (e.g. Control, Regulation, ...) and a particular revision.
 """
 
+from datetime import datetime
 from logging import getLogger
 
 from sqlalchemy.sql.expression import tuple_
-from sqlalchemy.sql.expression import bindparam
 
 from ggrc import db
 from ggrc import models
+from ggrc import settings
 from ggrc.login import get_current_user_id
+from ggrc.models.revision import update_latest_revisions_for_event
 from ggrc.utils import benchmark
 
 from ggrc.snapshotter.datastructures import Attr
 from ggrc.snapshotter.datastructures import Pair
 from ggrc.snapshotter.datastructures import Stub
 from ggrc.snapshotter.datastructures import OperationResponse
+from ggrc.snapshotter.datastructures import SnapshotRow
 from ggrc.snapshotter.helpers import create_relationship_dict
 from ggrc.snapshotter.helpers import create_relationship_revision_dict
 from ggrc.snapshotter.helpers import create_snapshot_dict
 from ggrc.snapshotter.helpers import create_snapshot_revision_dict
+from ggrc.snapshotter.helpers import create_snapshot_upsert
 from ggrc.snapshotter.helpers import get_relationships
 from ggrc.snapshotter.helpers import get_revisions
 from ggrc.snapshotter.helpers import get_snapshots
@@ -148,6 +152,36 @@ class SnapshotGenerator(object):
       self._copy_snapshot_relationships()
     return result
 
+  def _get_existing_snapshots(self, pairs):
+    """Get rows of existing snapshots of pairs from the parents' scope.
+
+    Snapshots are filtered by the indexed parent columns instead of a tuple
+    IN over all pairs.
+
+    Returns:
+      dict with pairs as keys and SnapshotRow values.
+    """
+    existing_snapshots = db.session.query(
+        models.Snapshot.id,
+        models.Snapshot.context_id,
+        models.Snapshot.created_at,
+        models.Snapshot.updated_at,
+        models.Snapshot.parent_type,
+        models.Snapshot.parent_id,
+        models.Snapshot.child_type,
+        models.Snapshot.child_id,
+        models.Snapshot.revision_id,
+        models.Snapshot.modified_by_id,
+    ).filter(tuple_(
+        models.Snapshot.parent_type, models.Snapshot.parent_id
+    ).in_(self.parents))
+    snapshots = {}
+    for esnap in existing_snapshots:
+      pair = Pair.from_4tuple(esnap[4:8])
+      if pair in pairs:
+        snapshots[pair] = SnapshotRow(*esnap)
+    return snapshots
+
   def _update(self, for_update, event, revisions, _filter):
     """Update (or create) parent objects' snapshots and create revisions for
     them.
@@ -164,9 +198,7 @@ class SnapshotGenerator(object):
     with benchmark("Snapshot._update"):
       user_id = get_current_user_id()
       missed_keys = set()
-      snapshot_cache = dict()
-      modified_snapshot_keys = set()
-      data_payload_update = list()
+      modified_snapshots = list()
       revision_payload = list()
       response_data = dict()
 
@@ -180,22 +212,7 @@ class SnapshotGenerator(object):
           for_update = {elem for elem in for_update if _filter(elem)}
 
       with benchmark("Snapshot._update.get existing snapshots"):
-        existing_snapshots = db.session.query(
-            models.Snapshot.id,
-            models.Snapshot.revision_id,
-            models.Snapshot.parent_type,
-            models.Snapshot.parent_id,
-            models.Snapshot.child_type,
-            models.Snapshot.child_id,
-        ).filter(tuple_(
-            models.Snapshot.parent_type, models.Snapshot.parent_id,
-            models.Snapshot.child_type, models.Snapshot.child_id
-        ).in_({pair.to_4tuple() for pair in for_update}))
-
-        for esnap in existing_snapshots:
-          sid, rev_id, pair_tuple = esnap[0], esnap[1], esnap[2:]
-          pair = Pair.from_4tuple(pair_tuple)
-          snapshot_cache[pair] = (sid, rev_id)
+        snapshot_cache = self._get_existing_snapshots(for_update)
 
       with benchmark("Snapshot._update.retrieve latest revisions"):
         revision_id_cache = get_revisions(
@@ -204,22 +221,25 @@ class SnapshotGenerator(object):
             revisions=revisions)
 
       response_data["revisions"] = {
-          "old": {pair: values[1] for pair, values in snapshot_cache.items()},
+          "old": {pair: values.revision_id
+                  for pair, values in snapshot_cache.items()},
           "new": revision_id_cache
       }
 
       with benchmark("Snapshot._update.build snapshot payload"):
+        # snapshots are written with the timestamp that is logged in their
+        # revisions, so they do not need to be read back
+        now = datetime.now().replace(microsecond=0)
         for key in for_update:
           if key in revision_id_cache:
-            sid, rev_id = snapshot_cache[key]
+            snapshot = snapshot_cache[key]
             latest_rev = revision_id_cache[key]
-            if rev_id != latest_rev:
-              modified_snapshot_keys.add(key)
-              data_payload_update += [{
-                  "_id": sid,
-                  "_revision_id": latest_rev,
-                  "_modified_by_id": user_id
-              }]
+            if snapshot.revision_id != latest_rev:
+              modified_snapshots.append(snapshot._replace(
+                  revision_id=latest_rev,
+                  modified_by_id=user_id,
+                  updated_at=now,
+              ))
           else:
             missed_keys.add(key)
 
@@ -228,21 +248,14 @@ class SnapshotGenerator(object):
             "Tried to update snapshots for the following objects but "
             "found no revisions: %s", missed_keys)
 
-      if not modified_snapshot_keys:
+      if not modified_snapshots:
         return OperationResponse("update", True, set(), response_data)
 
       with benchmark("Snapshot._update.write snapshots to database"):
-        update_sql = models.Snapshot.__table__.update().where(
-            models.Snapshot.id == bindparam("_id")).values(
-            revision_id=bindparam("_revision_id"),
-            modified_by_id=bindparam("_modified_by_id"))
-        self._execute(update_sql, data_payload_update)
-
-      with benchmark("Snapshot._update.retrieve inserted snapshots"):
-        snapshots = get_snapshots(modified_snapshot_keys)
+        self._upsert_snapshots([row._asdict() for row in modified_snapshots])
 
       with benchmark("Snapshot._update.create snapshots revision payload"):
-        for snapshot in snapshots:
+        for snapshot in modified_snapshots:
           parent = Stub(snapshot.parent_type, snapshot.parent_id)
           context_id = self.context_cache[parent]
           data = create_snapshot_revision_dict("modified", event_id, snapshot,
@@ -251,6 +264,7 @@ class SnapshotGenerator(object):
 
       with benchmark("Insert Snapshot entries into Revision"):
         self._execute(models.Revision.__table__.insert(), revision_payload)
+        self._update_latest_revisions(event_id)
       return OperationResponse("update", True, for_update, response_data)
 
   def analyze(self):
@@ -329,6 +343,27 @@ class SnapshotGenerator(object):
       engine.execute(operation, data)
       db.session.commit()
 
+  def _update_latest_revisions(self, event_id):
+    """Record latest revisions written by _execute for an event."""
+    if not self.dry_run:
+      update_latest_revisions_for_event(db.session.connection(), event_id)
+      db.session.commit()
+
+  def _upsert_snapshots(self, data):
+    """Insert snapshots or update existing ones in chunked bulk statements.
+
+    Args:
+      data: a list of dictionaries with snapshot column values, see
+        create_snapshot_upsert.
+    """
+    if not data or self.dry_run:
+      return
+    chunk_size = getattr(settings, "SNAPSHOT_UPSERT_CHUNK_SIZE", 1000)
+    engine = db.engine
+    for start in range(0, len(data), chunk_size):
+      engine.execute(*create_snapshot_upsert(data[start:start + chunk_size]))
+    db.session.commit()
+
   def create(self, event, revisions, _filter=None):
     """Create snapshots of parent object's neighborhood per provided rules
     and split in chuncks if there are too many snapshottable objects."""
@@ -379,11 +414,13 @@ class SnapshotGenerator(object):
       response_data["revisions"] = revision_id_cache
 
       with benchmark("Snapshot._create.create payload"):
+        now = datetime.now().replace(microsecond=0)
         for pair in for_create:
           if pair in revision_id_cache:
             revision_id = revision_id_cache[pair]
             context_id = self.context_cache[pair.parent]
             data = create_snapshot_dict(pair, revision_id, user_id, context_id)
+            data.update(created_at=now, updated_at=now)
             data_payload += [data]
           else:
             missed_keys.add(pair)
@@ -394,9 +431,7 @@ class SnapshotGenerator(object):
             "found no revisions: %s", missed_keys)
 
       with benchmark("Snapshot._create.write to database"):
-        self._execute(
-            models.Snapshot.__table__.insert(),
-            data_payload)
+        self._upsert_snapshots(data_payload)
 
       with benchmark("Snapshot._create.retrieve inserted snapshots"):
         snapshots = get_snapshots(for_create)
@@ -439,6 +474,7 @@ class SnapshotGenerator(object):
 
       with benchmark("Snapshot._create.write revisions to database"):
         self._execute(models.Revision.__table__.insert(), revision_payload)
+        self._update_latest_revisions(event_id)
       return OperationResponse("create", True, for_create, response_data)
 
   def _copy_snapshot_relationships(self):
@@ -8,6 +8,20 @@ import collections
 
 Attr = collections.namedtuple('Attr', ['name'])
 
+# Columns of a snapshot row as returned by helpers.get_snapshots
+SnapshotRow = collections.namedtuple("SnapshotRow", [
+    "id",
+    "context_id",
+    "created_at",
+    "updated_at",
+    "parent_type",
+    "parent_id",
+    "child_type",
+    "child_id",
+    "revision_id",
+    "modified_by_id",
+])
+
 
 class Stub(collections.namedtuple("Stub", ["type", "id"])):
   """Simple object representation"""
@@ -6,10 +6,13 @@
 import collections
 from logging import getLogger
 
+from sqlalchemy import func
+from sqlalchemy import text
 from sqlalchemy.sql.expression import tuple_
 
 from ggrc import db
 from ggrc import models
+from ggrc.models.revision import get_latest_revision_ids
 from ggrc.snapshotter.datastructures import Stub
 from ggrc.snapshotter.datastructures import Pair
 from ggrc.utils import benchmark
@@ -17,11 +20,77 @@ from ggrc.utils import benchmark
 logger = getLogger(__name__)  # pylint: disable=invalid-name
 
 
+def _get_specified_revisions(specified, filters):
+  """Get specified revision ids of pairs that exist in child's history."""
+  query = db.session.query(
+      models.Revision.id,
+      models.Revision.resource_type,
+      models.Revision.resource_id,
+  ).filter(models.Revision.id.in_(set(specified.values())))
+  for _filter in filters:
+    query = query.filter(_filter)
+  found = {revid: Stub(restype, resid) for revid, restype, resid in query}
+  revision_id_cache = dict()
+  for key, revid in specified.iteritems():
+    if found.get(revid) == key.child:
+      revision_id_cache[key] = revid
+    else:
+      logger.warning(
+          "Specified revision for object %s but couldn't find the"
+          "revision '%s' in object history", key, revid)
+  return revision_id_cache
+
+
+def _get_latest_revisions(parents_cache, filters):
+  """Get latest revision ids of pairs.
+
+  Latest revisions are looked up in the latest_revisions table. Objects whose
+  latest revision does not match the filters, such as deleted objects, get
+  theirs with a join on the maximum revision id that matches the filters.
+  """
+  revision_id_cache = dict()
+  latest_ids = get_latest_revision_ids(set(parents_cache), filters)
+  for (restype, resid), revid in latest_ids.iteritems():
+    child = Stub(restype, resid)
+    for parent in parents_cache[child]:
+      revision_id_cache[Pair(parent, child)] = revid
+  missing = {child for child in parents_cache
+             if (child.type, child.id) not in latest_ids}
+  if not missing:
+    return revision_id_cache
+  latest = db.session.query(
+      func.max(models.Revision.id).label("id"),
+  ).filter(
+      tuple_(
+          models.Revision.resource_type,
+          models.Revision.resource_id,
+      ).in_(missing)
+  )
+  for _filter in filters:
+    latest = latest.filter(_filter)
+  latest = latest.group_by(
+      models.Revision.resource_type,
+      models.Revision.resource_id,
+  ).subquery()
+  query = db.session.query(
+      models.Revision.id,
+      models.Revision.resource_type,
+      models.Revision.resource_id,
+  ).join(latest, latest.c.id == models.Revision.id)
+  for revid, restype, resid in query:
+    child = Stub(restype, resid)
+    for parent in parents_cache[child]:
+      revision_id_cache[Pair(parent, child)] = revid
+  return revision_id_cache
+
+
 def get_revisions(pairs, revisions, filters=None):
   """Retrieve revision ids for pairs
 
   If revisions dictionary is provided it will validate that the selected
-  revision exists in the objects revision history.
+  revision exists in the objects revision history. Other pairs get the latest
+  revision of their child from the latest_revisions table instead of loading
+  the whole history.
 
   Args:
     pairs: set([(parent_1, child_1), (parent_2, child_2), ...])
@@ -30,44 +99,26 @@ def get_revisions(pairs, revisions, filters=None):
   """
   with benchmark("snapshotter.helpers.get_revisions"):
     revision_id_cache = dict()
+    filters = filters or []
 
     if pairs:
-      with benchmark("get_revisions.create caches"):
-        child_stubs = {pair.child for pair in pairs}
-
-        with benchmark("get_revisions.create child -> parents cache"):
-          parents_cache = collections.defaultdict(set)
-          for parent, child in pairs:
+      with benchmark("get_revisions.create child -> parents cache"):
+        specified = {pair: revisions[pair] for pair in pairs
+                     if pair in revisions}
+        parents_cache = collections.defaultdict(set)
+        for parent, child in pairs:
+          if (parent, child) not in specified:
             parents_cache[child].add(parent)
 
-      with benchmark("get_revisions.retrieve revisions"):
-        query = db.session.query(
-            models.Revision.id,
-            models.Revision.resource_type,
-            models.Revision.resource_id).filter(
-            tuple_(
-                models.Revision.resource_type,
-                models.Revision.resource_id).in_(child_stubs)
-        ).order_by(models.Revision.id.desc())
-        if filters:
-          for _filter in filters:
-            query = query.filter(_filter)
-
-      with benchmark("get_revisions.create revision_id cache"):
-        for revid, restype, resid in query:
-          child = Stub(restype, resid)
-          for parent in parents_cache[child]:
-            key = Pair(parent, child)
-            if key in revisions:
-              if revid == revisions[key]:
-                revision_id_cache[key] = revid
-              else:
-                logger.warning(
-                    "Specified revision for object %s but couldn't find the"
-                    "revision '%s' in object history", key, revisions[key])
-            else:
-              if key not in revision_id_cache:
-                revision_id_cache[key] = revid
+      if specified:
+        with benchmark("get_revisions.validate specified revisions"):
+          revision_id_cache.update(
+              _get_specified_revisions(specified, filters))
+
+      if parents_cache:
+        with benchmark("get_revisions.retrieve latest revisions"):
+          revision_id_cache.update(
+              _get_latest_revisions(parents_cache, filters))
     return revision_id_cache
 
 
@@ -144,6 +195,51 @@ def get_snapshots(objects=None, ids=None):
     return set()
 
 
+SNAPSHOT_UPSERT_COLUMNS = (
+    "parent_type",
+    "parent_id",
+    "child_type",
+    "child_id",
+    "revision_id",
+    "modified_by_id",
+    "context_id",
+    "created_at",
+    "updated_at",
+)
+
+
+def create_snapshot_upsert(data):
+  """Create a statement that inserts or updates snapshots in bulk.
+
+  Snapshots that already exist for a (parent, child) pair get the new
+  revision_id, modified_by_id and updated_at, other columns are kept.
+
+  Args:
+    data: list of dictionaries with SNAPSHOT_UPSERT_COLUMNS keys.
+  Returns:
+    tuple of a text statement and a dictionary of its parameters.
+  """
+  values = []
+  params = {}
+  for i, row in enumerate(data):
+    names = ["{}_{}".format(column, i) for column in SNAPSHOT_UPSERT_COLUMNS]
+    values.append(u"({})".format(u", ".join(u":" + name for name in names)))
+    params.update(zip(names, (row[column]
+                              for column in SNAPSHOT_UPSERT_COLUMNS)))
+  query = u"""
+      INSERT INTO snapshots ({columns})
+      VALUES {values}
+      ON DUPLICATE KEY UPDATE
+          revision_id = VALUES(revision_id),
+          modified_by_id = VALUES(modified_by_id),
+          updated_at = VALUES(updated_at)
+      """.format(
+      columns=u", ".join(SNAPSHOT_UPSERT_COLUMNS),
+      values=u", ".join(values),
+  )
+  return text(query), params
+
+
 def create_json_stub(model_, context_id, object_id):
   from ggrc.models import all_models
   return {  # pylint: disable=protected-access
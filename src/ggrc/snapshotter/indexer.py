@@ -5,16 +5,20 @@
 
 import logging
 from collections import defaultdict
+from contextlib import contextmanager
 
 from sqlalchemy.sql.expression import tuple_
 
 from ggrc import db
 from ggrc import models
+from ggrc import settings
+from ggrc.cache.lru import LruDict
 from ggrc.models import all_models
+from ggrc.models import revision_content
 from ggrc.fulltext.mysql import MysqlRecordProperty as Record
 from ggrc.fulltext import get_indexer
 from ggrc.models.reflection import AttributeInfo
-from ggrc.utils import generate_query_chunks
+from ggrc.utils import generate_keyset_chunks
 
 from ggrc.snapshotter.rules import Types
 from ggrc.snapshotter.datastructures import Pair
@@ -86,7 +90,9 @@ def _get_columns():
   revision_columns = db.session.query(
       models.Revision.id,
       models.Revision.resource_type,
-      models.Revision.content
+      models.Revision.content,
+      models.Revision.checkpoint_id,
+      models.Revision.content_patch,
   )
   return snapshot_columns, revision_columns
 
@@ -115,6 +121,59 @@ def _get_custom_attribute_dict():
   return {cad.id: cad for cad in cads}
 
 
+@contextmanager
+def people_cache():
+  """Keep names and emails of people for the duration of a reindex job.
+
+  The people map of the indexer is replaced with an LruDict of at most
+  SNAPSHOT_INDEXER_PEOPLE_CACHE_SIZE people, that reindex_pairs fills with a
+  single query per batch of snapshots. Nested jobs reuse the outer map and
+  the previous map is restored when the job ends.
+  """
+  indexer = get_indexer()
+  people_map = indexer.cache.get("people_map")
+  if isinstance(people_map, LruDict):
+    yield people_map
+    return
+  indexer.cache["people_map"] = LruDict(
+      getattr(settings, "SNAPSHOT_INDEXER_PEOPLE_CACHE_SIZE", 10000))
+  try:
+    yield indexer.cache["people_map"]
+  finally:
+    indexer.cache["people_map"] = people_map or {}
+
+
+def _get_person_ids(properties):
+  """Get ids of all people in searchable attributes of a revision."""
+  person_ids = set()
+  for prop, val in properties.iteritems():
+    if prop == "assignees" and val:
+      val = [person for person, _ in val]
+    if isinstance(val, dict):
+      val = [val]
+    if isinstance(val, list):
+      person_ids.update(person["id"] for person in val
+                        if isinstance(person, dict) and
+                        person.get("type") == "Person")
+  return person_ids
+
+
+def prefetch_people(people_map, person_ids):
+  """Load names and emails of people missing in people_map in one query."""
+  missing = {id_ for id_ in person_ids if id_ not in people_map}
+  if not missing:
+    return
+  people = db.session.query(
+      models.Person.id,
+      models.Person.name,
+      models.Person.email,
+  ).filter(
+      models.Person.id.in_(missing)
+  )
+  for id_, name, email in people:
+    people_map[id_] = (name, email)
+
+
 def get_searchable_attributes(attributes, cad_dict, content):
   """Get all searchable attributes for a given object that should be indexed
 
@@ -151,11 +210,14 @@ def reindex():
       models.Snapshot.parent_id,
       models.Snapshot.child_type,
       models.Snapshot.child_id,
+      models.Snapshot.id,
   )
-  for query_chunk in generate_query_chunks(columns):
-    pairs = {Pair.from_4tuple(p) for p in query_chunk}
-    reindex_pairs(pairs)
-    db.session.commit()
+  cad_dict = _get_custom_attribute_dict()
+  with people_cache():
+    for query_chunk in generate_keyset_chunks(columns, models.Snapshot.id):
+      pairs = {Pair.from_4tuple(p) for p in query_chunk}
+      reindex_pairs(pairs, cad_dict)
+      db.session.commit()
 
 
 def reindex_snapshots(snapshot_ids):
@@ -167,11 +229,14 @@ def reindex_snapshots(snapshot_ids):
       models.Snapshot.parent_id,
       models.Snapshot.child_type,
       models.Snapshot.child_id,
+      models.Snapshot.id,
   ).filter(models.Snapshot.id.in_(snapshot_ids))
-  for query_chunk in generate_query_chunks(columns):
-    pairs = {Pair.from_4tuple(p) for p in query_chunk}
-    reindex_pairs(pairs)
-    db.session.commit()
+  cad_dict = _get_custom_attribute_dict()
+  with people_cache():
+    for query_chunk in generate_keyset_chunks(columns, models.Snapshot.id):
+      pairs = {Pair.from_4tuple(p) for p in query_chunk}
+      reindex_pairs(pairs, cad_dict)
+      db.session.commit()
 
 
 def delete_records(snapshot_ids):
@@ -187,22 +252,74 @@ def delete_records(snapshot_ids):
   db.session.commit()
 
 
-def insert_records(payload):
-  """Insert records to full text table.
+def _get_record_key(rec):
+  return rec["key"], rec["property"], rec["subproperty"]
+
+
+def _get_existing_records(snapshot_ids):
+  """Get current full text records of snapshots.
+
+  Returns:
+    dict with (key, property, subproperty) keys and (context_id, tags,
+    content) values.
+  """
+  if not snapshot_ids:
+    return {}
+  records = db.session.query(
+      Record.key,
+      Record.property,
+      Record.subproperty,
+      Record.context_id,
+      Record.tags,
+      Record.content,
+  ).filter(
+      Record.type == "Snapshot",
+      Record.key.in_(snapshot_ids),
+  )
+  return {
+      (key, prop, subprop): (context_id, tags, content)
+      for key, prop, subprop, context_id, tags, content in records
+  }
+
+
+def update_records(snapshot_ids, payload):
+  """Write full text records of snapshots that differ from the stored ones.
+
+  Records that are stored and not in the payload are deleted, records that
+  changed are replaced and new records are inserted. Records that did not
+  change, which are most of them when a snapshot gets a new revision with
+  a few modified attributes, are not written at all.
 
   Args:
-    payload: List of dictionaries that represent records entries.
+    snapshot_ids: set of ids of the reindexed snapshots.
+    payload: list of dictionaries with all records of the reindexed
+        snapshots.
   """
-  engine = db.engine
-  engine.execute(Record.__table__.insert(), payload)
+  existing = _get_existing_records(snapshot_ids)
+  to_insert = []
+  for rec in payload:
+    stored = existing.pop(_get_record_key(rec), None)
+    if stored is None:
+      to_insert.append(rec)
+    elif stored != (rec["context_id"], rec["tags"], rec["content"]):
+      existing[_get_record_key(rec)] = stored
+      to_insert.append(rec)
+  if existing:
+    db.session.query(Record).filter(
+        Record.type == "Snapshot",
+        tuple_(Record.key, Record.property, Record.subproperty).in_(
+            existing.keys()),
+    ).delete(synchronize_session=False)
+  if to_insert:
+    db.session.execute(Record.__table__.insert(), to_insert)
   db.session.commit()
 
 
-def get_person_data(rec, person):
+def get_person_data(rec, person, builder=None):
   """Get list of Person properties for fulltext indexing
   """
-  indexer = get_indexer()
-  builder = indexer.get_builder(models.Person)
+  if builder is None:
+    builder = get_indexer().get_builder(models.Person)
   subprops = builder.build_person_subprops(person)
   data = []
   for key, val in subprops.items():
@@ -212,11 +329,11 @@ def get_person_data(rec, person):
   return data
 
 
-def get_person_sort_subprop(rec, people):
+def get_person_sort_subprop(rec, people, builder=None):
   """Get a special subproperty for sorting
   """
-  indexer = get_indexer()
-  builder = indexer.get_builder(models.Person)
+  if builder is None:
+    builder = get_indexer().get_builder(models.Person)
   subprops = builder.build_list_sort_subprop(people)
   data = []
   for key, val in subprops.items():
@@ -226,13 +343,21 @@ def get_person_sort_subprop(rec, people):
   return data
 
 
-def reindex_pairs(pairs):  # noqa  # pylint:disable=too-many-branches
+def reindex_pairs(pairs, cad_dict=None):
   """Reindex selected snapshots.
 
   Args:
     pairs: A list of parent-child pairs that uniquely represent snapshot
     object whose properties should be reindexed.
+    cad_dict: result of _get_custom_attribute_dict, for callers that reindex
+    many chunks of snapshots.
   """
+  with people_cache() as people_map:
+    _reindex_pairs(pairs, cad_dict, people_map)
+
+
+def _reindex_pairs(pairs, cad_dict, people_map):  # noqa  # pylint:disable=R0912
+  """Reindex selected snapshots with people data from people_map."""
 
   # pylint: disable=too-many-locals
   snapshots = dict()
@@ -240,7 +365,8 @@ def reindex_pairs(pairs):  # noqa  # pylint:disable=too-many-branches
   snap_to_sid_cache = dict()
   search_payload = list()
 
-  cad_dict = _get_custom_attribute_dict()
+  if cad_dict is None:
+    cad_dict = _get_custom_attribute_dict()
 
   snapshot_columns, revision_columns = _get_columns()
 
@@ -263,9 +389,19 @@ def reindex_pairs(pairs):  # noqa  # pylint:disable=too-many-branches
     revision_query = revision_columns.filter(
         models.Revision.id.in_(revision_ids)
     )
-    for _id, _type, content in revision_query:
+    revision_types = {}
+    revision_rows = []
+    for _id, _type, content, checkpoint_id, content_patch in revision_query:
+      revision_types[_id] = _type
+      revision_rows.append((_id, content, checkpoint_id, content_patch))
+    contents = revision_content.load_contents(revision_rows)
+    person_ids = set()
+    for _id, _type in revision_types.iteritems():
       revisions[_id] = get_searchable_attributes(
-          CLASS_PROPERTIES[_type], cad_dict, content)
+          CLASS_PROPERTIES[_type], cad_dict, contents[_id])
+      person_ids.update(_get_person_ids(revisions[_id]))
+    prefetch_people(people_map, person_ids)
+    builder = get_indexer().get_builder(models.Person)
 
     snapshot_ids = set()
     for pair in snapshots:
@@ -304,13 +440,13 @@ def reindex_pairs(pairs):  # noqa  # pylint:disable=too-many-branches
             rec["content"] = val["title"]
             search_payload += [rec]
           elif isinstance(val, dict) and val.get("type") == "Person":
-            search_payload += get_person_data(rec, val)
-            search_payload += get_person_sort_subprop(rec, [val])
+            search_payload += get_person_data(rec, val, builder)
+            search_payload += get_person_sort_subprop(rec, [val], builder)
           elif isinstance(val, list) and all([p.get("type") == "Person"
                                               for p in val]):
             for person in val:
-              search_payload += get_person_data(rec, person)
-            search_payload += get_person_sort_subprop(rec, val)
+              search_payload += get_person_data(rec, person, builder)
+            search_payload += get_person_sort_subprop(rec, val, builder)
           elif isinstance(val, (bool, int, long)):
             rec["content"] = unicode(val)
             search_payload += [rec]
@@ -321,5 +457,4 @@ def reindex_pairs(pairs):  # noqa  # pylint:disable=too-many-branches
                            rec["type"], rec["key"], rec["property"],
                            rec["subproperty"], rec["content"])
 
-    delete_records(snapshot_ids)
-    insert_records(search_payload)
+    update_records(snapshot_ids, search_payload)
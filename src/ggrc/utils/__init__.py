@@ -10,6 +10,7 @@ import sqlalchemy
 from flask import request
 from ggrc.settings import CUSTOM_URL_ROOT
 from ggrc.utils import benchmarks
+from ggrc.utils import json_backends
 
 
 DATE_FORMAT_ISO = "%Y-%m-%d"
@@ -27,22 +28,14 @@ class GrcEncoder(json.JSONEncoder):
   """
 
   def default(self, obj):
-    if isinstance(obj, datetime.datetime):
-      if not obj.time():
-        return obj.date().isoformat()
-      return obj.isoformat()
-    elif isinstance(obj, datetime.date):
-      return obj.isoformat()
-    elif isinstance(obj, datetime.timedelta):
-      return (datetime.datetime.min + obj).time().isoformat()
-    elif isinstance(obj, set):
-      return list(obj)
-    else:
+    try:
+      return json_backends.encode_default(obj)
+    except TypeError:
       return super(GrcEncoder, self).default(obj)
 
 
 def as_json(obj, **kwargs):
-  return json.dumps(obj, cls=GrcEncoder, **kwargs)
+  return json_backends.dumps(obj, **kwargs)
 
 
 def service_for(obj):
@@ -248,12 +241,41 @@ def iso_to_us_date(date_string):
 
 
 def generate_query_chunks(query, chunk_size=1000):
-  """Make a generator splitting `query` into chunks of size `chunk_size`."""
+  """Make a generator splitting `query` into chunks of size `chunk_size`.
+
+  This uses OFFSET pagination which gets slower with every chunk on large
+  tables. Use `generate_keyset_chunks` for queries whose rows contain ids.
+  """
   count = query.count()
   for offset in range(0, count, chunk_size):
     yield query.order_by("id").limit(chunk_size).offset(offset)
 
 
+def generate_keyset_chunks(query, id_column, chunk_size=1000):
+  """Make a generator splitting `query` into chunks ordered by `id_column`.
+
+  Each chunk is fetched with `WHERE id > last_id ORDER BY id LIMIT n`, so
+  every chunk costs a single index range scan no matter how far into the
+  table it is and no up-front count query is needed.
+
+  Args:
+    query: sqlalchemy query with rows that have an `id` attribute containing
+      the value of `id_column`.
+    id_column: unique column used for ordering and seeking.
+    chunk_size (int): maximum number of rows in a single chunk.
+
+  Yields:
+    lists with at most `chunk_size` rows.
+  """
+  query = query.order_by(None).order_by(id_column)
+  chunk = query.limit(chunk_size).all()
+  while chunk:
+    yield chunk
+    if len(chunk) < chunk_size:
+      return
+    chunk = query.filter(id_column > chunk[-1].id).limit(chunk_size).all()
+
+
 def create_stub(object_, context_id=None):
   """Create stub from model attribute
 
@@ -0,0 +1,129 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Pluggable JSON serializer backends.
+
+as_json, LongJsonType and JsonType encode and decode JSON through the backend
+selected by the JSON_BACKEND setting:
+
+  auto - the fastest installed backend.
+  ujson - the ujson C library for decoding.
+  json - the standard library json module.
+
+All backends encode with the C encoder of the standard library and
+encode_default, which produces the same ASCII only output as GrcEncoder.
+Decoding, which happens for every revision read, uses the fastest installed
+library. Backends that are not installed fall back to the standard library.
+"""
+
+import datetime
+import json
+import logging
+import re
+
+from ggrc import settings
+
+logger = logging.getLogger(__name__)
+
+
+def encode_default(obj):
+  """Get a JSON compatible value of a type that JSON does not support.
+
+  Raises:
+    TypeError if the object is not supported.
+  """
+  if isinstance(obj, datetime.datetime):
+    if not obj.time():
+      return obj.date().isoformat()
+    return obj.isoformat()
+  elif isinstance(obj, datetime.date):
+    return obj.isoformat()
+  elif isinstance(obj, datetime.timedelta):
+    return (datetime.datetime.min + obj).time().isoformat()
+  elif isinstance(obj, set):
+    return list(obj)
+  raise TypeError("{!r} is not JSON serializable".format(obj))
+
+
+def byte_length(value):
+  """Get the length of a JSON string in bytes when encoded as UTF-8."""
+  # ASCII only str values have the same length in bytes
+  if isinstance(value, unicode):
+    return len(value.encode("utf-8"))
+  return len(value)
+
+
+class StdlibBackend(object):
+  """Standard library json module."""
+
+  name = "json"
+
+  @staticmethod
+  def dumps(obj, **kwargs):
+    kwargs.setdefault("default", encode_default)
+    return json.dumps(obj, **kwargs)
+
+  @staticmethod
+  def loads(value):
+    return json.loads(value)
+
+
+class UjsonBackend(StdlibBackend):
+  """ujson C library for decoding.
+
+  Documents are still encoded by the standard library. ujson has no hook for
+  dates and sets, which every logged object contains, and converting them
+  before encoding costs more than ujson saves.
+  """
+
+  name = "ujson"
+
+  # ujson silently drops lone surrogate escapes, so documents with any
+  # surrogate escapes are decoded by the standard library.
+  SURROGATE_ESCAPE = re.compile(r"\\u[dD][89a-fA-F]")
+
+  def __init__(self):
+    import ujson
+    self.ujson = ujson
+
+  def loads(self, value):
+    if self.SURROGATE_ESCAPE.search(value):
+      return super(UjsonBackend, self).loads(value)
+    try:
+      return self.ujson.loads(value)
+    except ValueError:
+      # integers that do not fit into 64 bits, or invalid JSON that the
+      # standard library reports with its usual error message
+      return super(UjsonBackend, self).loads(value)
+
+
+BACKENDS = (UjsonBackend, StdlibBackend)
+
+_backend = None
+
+
+def get_backend():
+  """Get the backend selected by the JSON_BACKEND setting."""
+  global _backend  # pylint: disable=global-statement
+  if _backend is None:
+    name = getattr(settings, "JSON_BACKEND", "auto")
+    for backend_class in BACKENDS:
+      if name not in ("auto", backend_class.name):
+        continue
+      try:
+        _backend = backend_class()
+      except ImportError:
+        logger.info("JSON backend %s is not installed", backend_class.name)
+        continue
+      break
+    else:
+      _backend = StdlibBackend()
+  return _backend
+
+
+def dumps(obj, **kwargs):
+  return get_backend().dumps(obj, **kwargs)
+
+
+def loads(value):
+  return get_backend().loads(value)
@@ -11,8 +11,12 @@ from sqlalchemy import literal
 
 from ggrc import db
 from ggrc.utils import benchmark
+from ggrc.utils import generate_keyset_chunks
 from ggrc.login import get_current_user_id
 from ggrc.models import all_models
+from ggrc.models import revision_content
+from ggrc.models.revision import LatestRevision
+from ggrc.models.revision import update_latest_revisions_for_event
 from ggrc.snapshotter.rules import Types
 
 logger = getLogger(__name__)  # pylint: disable=invalid-name
@@ -28,20 +32,14 @@ def _get_revisions_by_type(type_):
     dict with object_id as key and revision_id of the latest revision as value.
   """
 
-  revisions = db.session.execute(
-      """
-      SELECT * FROM (
-          SELECT id, resource_id
-          FROM revisions
-          WHERE resource_type = :type
-          ORDER BY resource_id, id DESC
-      ) AS revs
-      GROUP BY resource_id
-      """,
-      [{"type": type_}]
+  revisions = db.session.query(
+      LatestRevision.resource_id,
+      LatestRevision.revision_id,
+  ).filter(
+      LatestRevision.resource_type == type_,
   )
 
-  return {row.resource_id: row.id for row in revisions}
+  return dict(revisions)
 
 
 def _fix_type_revisions(event, type_, obj_rev_map):
@@ -57,12 +55,7 @@ def _fix_type_revisions(event, type_, obj_rev_map):
                    "skipped", type_)
     return
 
-  chunk = 1000
-  all_objects = model.eager_query().order_by(model.id)
-  all_objects_count = model.query.count()
-
-  for i in range(all_objects_count // chunk + 1):
-    objects_chunk = all_objects.limit(chunk).offset(i * chunk)
+  for objects_chunk in generate_keyset_chunks(model.eager_query(), model.id):
     chunk_with_revisions = [
         obj for obj in objects_chunk if obj.id in obj_rev_map]
     chunk_without_revisions = [
@@ -84,6 +77,7 @@ def _fix_type_revisions(event, type_, obj_rev_map):
       # Every revision present in obj_rev_map has no object in the DB
       revisions_table, event, list(obj_rev_map.values()))
 
+  update_latest_revisions_for_event(db.session.connection(), event.id)
   db.session.commit()
 
 
@@ -97,7 +91,8 @@ def _update_existing_revisions(objects, revisions_table, obj_rev_map):
     db.session.execute(
         revisions_table.update()
         .where(revisions_table.c.id == rev_id)
-        .values(content=obj.log_json())
+        .values(content=obj.log_json(), checkpoint_id=None,
+                content_patch=None)
     )
 
 
@@ -175,17 +170,20 @@ def set_resource_slugs():
     rows = db.session.execute(select([
         revisions_table.c.id,
         revisions_table.c.content,
+        revisions_table.c.checkpoint_id,
+        revisions_table.c.content_patch,
     ]).where(
         revisions_table.c.resource_type.in_(Types.all)
     ).where(
         revisions_table.c.resource_slug.is_(None)
-    ))
-    for row in rows:
-      if row.content.get("slug"):
+    )).fetchall()
+    contents = revision_content.load_contents(rows)
+    for revision_id, content in contents.iteritems():
+      if content.get("slug"):
         db.session.execute(
             revisions_table.update()
-            .where(revisions_table.c.id == row.id)
-            .values(resource_slug=row.content.get("slug"))
+            .where(revisions_table.c.id == revision_id)
+            .values(resource_slug=content.get("slug"))
         )
     db.session.commit()
 
@@ -18,26 +18,24 @@ from werkzeug.exceptions import Forbidden
 from ggrc import models
 from ggrc import settings
 from ggrc.app import app
-from ggrc.app import db
 from ggrc.builder.json import publish
 from ggrc.builder.json import publish_representation
 from ggrc.converters import get_importables, get_exportables
 from ggrc.extensions import get_extension_modules
-from ggrc.fulltext import get_indexer, get_indexed_model_names, mixin
+from ggrc.fulltext import index_queue
+from ggrc.fulltext import reindex as fulltext_reindex
 from ggrc.login import get_current_user
 from ggrc.login import login_required
 from ggrc.models import all_models
 from ggrc.models.background_task import create_task
 from ggrc.models.background_task import make_task_response
 from ggrc.models.background_task import queued_task
-from ggrc.models.inflector import get_model
 from ggrc.models.reflection import AttributeInfo
 from ggrc.rbac import permissions
 from ggrc.services.common import as_json
 from ggrc.services.common import inclusion_filter
 from ggrc.services import query as services_query
 from ggrc.snapshotter import rules
-from ggrc.snapshotter.indexer import reindex as reindex_snapshots
 from ggrc.views import converters
 from ggrc.views import cron
 from ggrc.views import filters
@@ -46,7 +44,6 @@ from ggrc.views import notifications
 from ggrc.views.common import RedirectedPolymorphView
 from ggrc.views.registry import object_view
 from ggrc.utils import benchmark
-from ggrc.utils import generate_query_chunks
 from ggrc.utils import revisions
 
 logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
@@ -63,47 +60,23 @@ def refresh_revisions(_):
 
 @app.route("/_background_tasks/reindex", methods=["POST"])
 @queued_task
-def reindex(_):
+def reindex(task):
   """Web hook to update the full text search index."""
-  do_reindex()
+  do_reindex(task)
   return app.make_response(("success", 200, [("Content-Type", "text/html")]))
 
 
-def do_reindex():
-  """Update the full text search index."""
+# Needs to be secured as we are removing @login_required
+@app.route("/_background_tasks/process_index_queue", methods=["GET", "POST"])
+def process_index_queue():
+  """Web hook to reindex objects from the deferred full text index queue."""
+  index_queue.process_queue()
+  return app.make_response(("success", 200, [("Content-Type", "text/html")]))
 
-  indexer = get_indexer()
-  indexed_models = get_indexed_model_names()
-
-  people = db.session.query(all_models.Person.id, all_models.Person.name,
-                            all_models.Person.email)
-  indexer.cache["people_map"] = {p.id: (p.name, p.email) for p in people}
-  for model in sorted(indexed_models):
-    # pylint: disable=protected-access
-    logger.info("Updating index for: %s", model)
-    with benchmark("Create records for %s" % model):
-      model = get_model(model)
-      mapper_class = model._sa_class_manager.mapper.base_mapper.class_
-      if issubclass(model, mixin.Indexed):
-        for query_chunk in generate_query_chunks(db.session.query(model.id)):
-          model.bulk_record_update_for([i.id for i in query_chunk])
-          db.session.commit()
-      else:
-        logger.warning(
-            "Try to index model that not inherited from Indexed mixin: %s",
-            model.__name__
-        )
-        indexer.delete_records_by_type(model.__name__)
-        query = model.query.options(
-            db.undefer_group(mapper_class.__name__ + '_complete'),
-        )
-        for query_chunk in generate_query_chunks(query):
-          for instance in query_chunk:
-            indexer.create_record(indexer.fts_record_for(instance), False)
-          db.session.commit()
-
-  reindex_snapshots()
-  indexer.invalidate_cache()
+
+def do_reindex(task=None):
+  """Update the full text search index."""
+  fulltext_reindex.reindex(task)
 
 
 def get_permissions_json():
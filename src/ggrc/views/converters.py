@@ -13,10 +13,13 @@ from flask import current_app
 from flask import request
 from flask import json
 from flask import render_template
+from flask import stream_with_context
 from werkzeug.exceptions import BadRequest
 
+from ggrc import settings
 from ggrc.app import app
 from ggrc.converters.base import Converter
+from ggrc.converters.import_helper import generate_csv_chunks
 from ggrc.converters.import_helper import generate_csv_string
 from ggrc.converters.import_helper import read_csv_file
 from ggrc.converters.query_helper import BadQueryException
@@ -52,25 +55,58 @@ def parse_export_request():
   return request.json
 
 
+def get_export_headers(converter):
+  """Get response headers for the exported csv file."""
+  object_names = "_".join(converter.get_object_names())
+  filename = "{}.csv".format(object_names)
+  return [
+      ("Content-Type", "text/csv"),
+      ("Content-Disposition",
+       "attachment; filename='{}'".format(filename)),
+  ]
+
+
+def log_export_errors(csv_chunks):
+  """Log errors that happen after the streamed response has been started."""
+  try:
+    for chunk in csv_chunks:
+      yield chunk
+  except:  # pylint: disable=bare-except
+    logger.exception("Export failed while streaming the response")
+    raise
+
+
+def make_streaming_export_response(converter):
+  """Make a chunked response that renders the csv file while it is sent.
+
+  Block headers are generated before the response is started so that invalid
+  export requests still fail with a proper error response.
+  """
+  with benchmark("Generate CSV headers"):
+    line_length = converter.prepare_stream()
+  csv_chunks = generate_csv_chunks(converter.iter_block_array(), line_length)
+  return current_app.response_class(
+      stream_with_context(log_export_errors(csv_chunks)),
+      status=200,
+      headers=get_export_headers(converter),
+  )
+
+
 def handle_export_request():
   try:
     with benchmark("handle export request"):
       data = parse_export_request()
       query_helper = QueryHelper(data)
       ids_by_type = query_helper.get_ids()
+    converter = Converter(ids_by_type=ids_by_type)
+    if getattr(settings, "EXPORT_STREAMING", False):
+      return make_streaming_export_response(converter)
     with benchmark("Generate CSV array"):
-      converter = Converter(ids_by_type=ids_by_type)
       csv_data = converter.to_array()
     with benchmark("Generate CSV string"):
       csv_string = generate_csv_string(csv_data)
     with benchmark("Make response."):
-      object_names = "_".join(converter.get_object_names())
-      filename = "{}.csv".format(object_names)
-      headers = [
-          ("Content-Type", "text/csv"),
-          ("Content-Disposition",
-           "attachment; filename='{}'".format(filename)),
-      ]
+      headers = get_export_headers(converter)
       return current_app.make_response((csv_string, 200, headers))
   except BadQueryException as exception:
     raise BadRequest(exception.message)
@@ -23,8 +23,11 @@ from ggrc.models import all_models
 from ggrc.models.audit import Audit
 from ggrc.models.program import Program
 from ggrc.models.object_owner import ObjectOwner
+from ggrc.rbac import dependencies
 from ggrc.rbac import permissions as rbac_permissions
+from ggrc.rbac.dependencies import PERMISSION_CACHE_TIMEOUT
 from ggrc.rbac.permissions_provider import DefaultUserPermissions
+from ggrc.rbac.permissions_provider import PermissionIndex
 from ggrc.services.common import _get_cache_manager
 from ggrc.services import signals
 from ggrc.services.registry import service
@@ -48,8 +51,6 @@ blueprint = Blueprint(
     static_url_path='/static/ggrc_basic_permissions',
 )
 
-PERMISSION_CACHE_TIMEOUT = 3600  # 60 minutes
-
 
 def get_public_config(_):
   """Expose additional permissions-dependent config to client.
@@ -282,10 +283,14 @@ class BasicUserPermissions(DefaultUserPermissions):
     self.user = user
     with benchmark('BasicUserPermissions > load permissions for user'):
       self.permissions = load_permissions_for(user)
+    self.permission_index = PermissionIndex(self.permissions)
 
   def _permissions(self):
     return self.permissions
 
+  def _permission_index(self):
+    return self.permission_index
+
 
 class UserPermissions(DefaultUserPermissions):
   """User permissions cached in the global session object"""
@@ -738,14 +743,17 @@ def load_backlog_workflows(permissions):
             .append(wf_context_id)
 
 
-def store_results_into_memcache(permissions, cache, key):
-  """Load personal context for user
+def store_results_into_memcache(permissions, cache, key,
+                                permission_dependencies=None):
+  """Store loaded permissions and their dependencies into memcache
 
   Args:
       permissions (dict): dict where the permissions will be stored
       cache (cache_manager): Cache manager that should be used for storing
                              permissions
       key (string): key of under which permissions should be stored
+      permission_dependencies (dict): objects the permissions depend on,
+                                      see ggrc.rbac.dependencies
   Returns:
       None
   """
@@ -757,7 +765,10 @@ def store_results_into_memcache(permissions, cache, key):
     # We only add the permissions to the cache if the
     # key still exists in the permissions:list after
     # the query has executed.
-    cache.set(key, permissions, PERMISSION_CACHE_TIMEOUT)
+    values = {key: permissions}
+    if permission_dependencies is not None:
+      values[dependencies.dependencies_key(key)] = permission_dependencies
+    cache.set_multi(values, PERMISSION_CACHE_TIMEOUT)
 
 
 def load_permissions_for(user):
@@ -822,7 +833,9 @@ def load_permissions_for(user):
     load_backlog_workflows(permissions)
 
   with benchmark("load_permissions > store results into memcache"):
-    store_results_into_memcache(permissions, cache, key)
+    store_results_into_memcache(
+        permissions, cache, key, dependencies.get_dependencies(
+            user.id, permissions, source_contexts_to_rolenames))
 
   return permissions
 
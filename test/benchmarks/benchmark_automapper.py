@@ -0,0 +1,142 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Measure automapping on a synthetic relationships graph.
+
+Usage (from the test directory, with GGRC_SETTINGS_MODULE set):
+
+    python -m benchmarks.benchmark_automapper [edge_count] [mapped_count]
+
+An optional third argument can be a database URI, to run the benchmark on
+MySQL instead of the default in-memory sqlite database.
+
+The graph consists of regulations with sections, objectives and controls
+that are mapped to each other. A new program is mapped to `mapped_count`
+regulations and automappings are generated for all of these mappings, once
+with neighborhoods loaded object by object and once in bulk. Permission
+checks and the final insert are skipped, so only graph loading and rule
+evaluation are measured.
+"""
+
+import itertools
+import sys
+import time
+
+import sqlalchemy as sa
+from sqlalchemy import orm
+from sqlalchemy.ext.declarative import declarative_base
+
+from ggrc.app import app
+from ggrc.automapper import AutomapperGenerator
+from ggrc.automapper.graph import RelationshipGraph
+from ggrc.automapper.rules import rules
+
+
+BASE = declarative_base()
+
+SECTIONS = 10
+OBJECTIVES = 5
+CONTROLS = 10
+
+
+class Edge(BASE):  # pylint: disable=too-few-public-methods
+  """Synthetic relationships table with the columns used for automapping."""
+  __tablename__ = "benchmark_automapper"
+  id = sa.Column(sa.Integer, primary_key=True)
+  source_type = sa.Column(sa.String(250), nullable=False)
+  source_id = sa.Column(sa.Integer, nullable=False)
+  destination_type = sa.Column(sa.String(250), nullable=False)
+  destination_id = sa.Column(sa.Integer, nullable=False)
+  __table_args__ = (
+      sa.Index("ix_benchmark_automapper_source", "source_type", "source_id"),
+      sa.Index("ix_benchmark_automapper_destination",
+               "destination_type", "destination_id"),
+  )
+
+
+class NewRelationship(object):  # pylint: disable=too-few-public-methods
+  """Relationship for which automappings are generated."""
+
+  def __init__(self, source, destination):
+    self.source_type, self.source_id = source
+    self.destination_type, self.destination_id = destination
+    self.context = None
+
+
+class Automapper(AutomapperGenerator):
+  """Automapper that neither checks permissions nor writes the result."""
+
+  @staticmethod
+  def _allowed_ids(resource_type, resource_ids, context):
+    return set(resource_ids)
+
+  def _flush(self, parent_relationship):
+    pass
+
+
+def generate_edges():
+  """Generate edges of an endless sequence of regulations."""
+  section = objective = control = 0
+  for regulation in itertools.count(1):
+    for _ in range(SECTIONS):
+      section += 1
+      yield ("Section", section), ("Regulation", regulation)
+      for _ in range(OBJECTIVES):
+        objective += 1
+        yield ("Section", section), ("Objective", objective)
+        yield ("Regulation", regulation), ("Objective", objective)
+        for _ in range(CONTROLS):
+          control += 1
+          yield ("Objective", objective), ("Control", control)
+          yield ("Regulation", regulation), ("Control", control)
+
+
+def setup_table(uri, edge_count):
+  """Create and fill the synthetic table and return a session for it."""
+  engine = sa.create_engine(uri)
+  BASE.metadata.drop_all(engine)
+  BASE.metadata.create_all(engine)
+  batch = []
+  for src, dst in itertools.islice(generate_edges(), edge_count):
+    batch.append({
+        "source_type": src[0],
+        "source_id": src[1],
+        "destination_type": dst[0],
+        "destination_id": dst[1],
+    })
+    if len(batch) == 10000:
+      engine.execute(Edge.__table__.insert(), batch)
+      batch = []
+  if batch:
+    engine.execute(Edge.__table__.insert(), batch)
+  return orm.sessionmaker(bind=engine)()
+
+
+def run(name, session, mapped_count, chunk_size):
+  """Generate automappings and print the time and number of queries."""
+  graph = RelationshipGraph(types=rules.types, session=session,
+                            table=Edge.__table__)
+  graph.CHUNK_SIZE = chunk_size
+  automapper = Automapper(use_benchmark=False, graph=graph)
+  start = time.time()
+  created = 0
+  for regulation in range(1, mapped_count + 1):
+    automapper.generate_automappings(
+        NewRelationship(("Program", 1), ("Regulation", regulation)))
+    created += len(automapper.auto_mappings)
+  print "{:<8} {:>8} mappings {:>8} nodes {:>8} queries {:>10.3f} s".format(
+      name, created, len(graph), graph.query_count, time.time() - start)
+
+
+def main(edge_count=100000, mapped_count=2, uri="sqlite://"):
+  session = setup_table(uri, edge_count)
+  print "{} edges".format(session.query(Edge).count())
+  with app.app_context():
+    run("single", session, mapped_count, 1)
+    run("bulk", session, mapped_count, RelationshipGraph.CHUNK_SIZE)
+  BASE.metadata.drop_all(session.bind)
+
+
+if __name__ == "__main__":
+  ARGS = sys.argv[1:]
+  main(*[int(arg) for arg in ARGS[:2]] + ARGS[2:3])
@@ -0,0 +1,131 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Compare JSON serializer backends on revision shaped documents.
+
+Usage (from the test directory, with the same GGRC_SETTINGS_MODULE as the
+integration tests):
+
+    python -m benchmarks.benchmark_json_backends [document_count]
+
+Documents mimic log_json of a Control with custom attributes, people stubs
+and dates. Every installed backend encodes them as log_event does, checks the
+byte length as LongJsonType does and decodes them as revision reads do.
+"""
+
+import datetime
+import json
+import sys
+import time
+
+from ggrc.utils import GrcEncoder
+from ggrc.utils import json_backends
+
+
+def person_stub(id_):
+  return {
+      "type": u"Person",
+      "id": id_,
+      "context_id": None,
+      "href": u"/api/people/{}".format(id_),
+  }
+
+
+def make_document(i):
+  """Create a log_json shaped document of a Control."""
+  now = datetime.datetime(2017, 5, 1, 12, 0, i % 60)
+  return {
+      "id": i,
+      "type": u"Control",
+      "slug": u"CONTROL-{}".format(i),
+      "title": u"Control {} \u0161".format(i),
+      "description": u"<p>{}</p>".format(u"Description text. " * 40),
+      "notes": u"Notes " * 20,
+      "test_plan": u"Test plan " * 20,
+      "display_name": u"Control {}".format(i),
+      "created_at": now,
+      "updated_at": now,
+      "start_date": now.date(),
+      "end_date": None,
+      "status": u"Draft",
+      "os_state": u"Unreviewed",
+      "context_id": None,
+      "modified_by_id": i % 50,
+      "modified_by": person_stub(i % 50),
+      "principal_assessor": person_stub(i % 7),
+      "secondary_assessor": person_stub(i % 11),
+      "owners": [person_stub(j) for j in range(3)],
+      "contact": person_stub(i % 13),
+      "key_control": True,
+      "active": True,
+      "url": u"https://example.com/controls/{}".format(i),
+      "reference_url": None,
+      "categories": [{"id": j, "type": u"ControlCategory"} for j in range(3)],
+      "assertions": [{"id": j, "type": u"ControlAssertion"} for j in range(2)],
+      "custom_attribute_values": [{
+          "id": i * 10 + j,
+          "custom_attribute_id": j,
+          "attributable_id": i,
+          "attributable_type": u"Control",
+          "attribute_value": u"Value {}".format(j),
+          "attribute_object": None,
+          "created_at": now,
+          "updated_at": now,
+          "modified_by": person_stub(i % 50),
+      } for j in range(10)],
+      "custom_attribute_definitions": [{
+          "id": j,
+          "title": u"Attribute {}".format(j),
+          "attribute_type": u"Text",
+          "definition_type": u"control",
+          "mandatory": False,
+          "multi_choice_options": None,
+          "helptext": u"",
+          "placeholder": None,
+      } for j in range(10)],
+  }
+
+
+def run(backend, documents):
+  """Measure encoding with the length check and decoding."""
+  start = time.time()
+  encoded = []
+  for document in documents:
+    value = backend.dumps(document)
+    json_backends.byte_length(value)
+    encoded.append(value)
+  dumps_seconds = time.time() - start
+  start = time.time()
+  decoded = [backend.loads(item) for item in encoded]
+  loads_seconds = time.time() - start
+  print "{:<6} dumps {:>8.3f} s  loads {:>8.3f} s  {:>10} bytes".format(
+      backend.name, dumps_seconds, loads_seconds,
+      sum(len(item) for item in encoded))
+  return decoded
+
+
+def run_previous(documents):
+  """Measure encoding and the length check as they were done before."""
+  start = time.time()
+  for document in documents:
+    value = json.dumps(document, cls=GrcEncoder)
+    len(value.encode("utf-8"))
+  print "{:<6} dumps {:>8.3f} s".format("before", time.time() - start)
+
+
+def main(count=10000):
+  documents = [make_document(i) for i in range(count)]
+  run_previous(documents)
+  results = []
+  for backend_class in json_backends.BACKENDS:
+    try:
+      backend = backend_class()
+    except ImportError:
+      print "{:<6} not installed".format(backend_class.name)
+      continue
+    results.append(run(backend, documents))
+  assert all(result == results[0] for result in results)
+
+
+if __name__ == "__main__":
+  main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,88 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Compare reflective and compiled attribute publishing in builder.json.
+
+Usage (from the test directory, with the same GGRC_SETTINGS_MODULE and
+database as the integration tests):
+
+    python -m benchmarks.benchmark_json_publish [object_count]
+
+Objects are created in memory and never flushed, so only the publishing of
+their attributes is measured.
+"""
+
+import sys
+import time
+
+from ggrc import db
+from ggrc.app import app
+from ggrc.builder import json
+from ggrc.models import all_models
+
+
+MODELS = (
+    all_models.Control,
+    all_models.Market,
+    all_models.Program,
+    all_models.OrgGroup,
+    all_models.Regulation,
+)
+
+
+def make_objects(count):
+  """Create transient objects of all benchmarked models."""
+  return [
+      MODELS[i % len(MODELS)](
+          id=i + 1, title="Object {}".format(i), slug="OBJECT-{}".format(i),
+          description="Description of object {}".format(i), context_id=None)
+      for i in range(count)
+  ]
+
+
+def publish_reflective(obj):
+  """Publish attributes with per-attribute reflection as before."""
+  builder = json.get_json_builder(obj)
+  inclusions = builder.get_inclusions()
+  json_obj = {}
+  for attr in builder._publish_attrs:  # pylint: disable=protected-access
+    attr_name = getattr(attr, "attr_name", attr)
+    local_inclusion = ()
+    for inclusion in inclusions:
+      if inclusion[0] == attr_name:
+        local_inclusion = inclusion
+        break
+    json_obj[attr_name] = builder.publish_attr(
+        obj, attr_name, local_inclusion[1:], len(local_inclusion) > 0, None)
+  return json_obj
+
+
+def publish_compiled(obj):
+  builder = json.get_json_builder(obj)
+  json_obj = {}
+  builder.publish_attrs(obj, json_obj, (), None)
+  return json_obj
+
+
+def run(name, publisher, objects):
+  start = time.time()
+  results = [publisher(obj) for obj in objects]
+  print "{:<12} {:>8} objects {:>10.3f} s".format(
+      name, len(results), time.time() - start)
+  return results
+
+
+def main(count=10000):
+  with app.test_request_context():
+    with db.session.no_autoflush:
+      objects = make_objects(count)
+      json.compile_publishers(MODELS)
+      reflective = run("reflective", publish_reflective, objects)
+      compiled = run("compiled", publish_compiled, objects)
+      # stubs are compared by identity, so only compare published attrs
+      assert [sorted(r) for r in reflective] == [sorted(c) for c in compiled]
+      db.session.rollback()
+
+
+if __name__ == "__main__":
+  main(*[int(arg) for arg in sys.argv[1:]])
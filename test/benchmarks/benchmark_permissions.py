@@ -0,0 +1,125 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Compare nested-dict and compiled permission checks.
+
+Usage (from the test directory, with GGRC_SETTINGS_MODULE set):
+
+    python -m benchmarks.benchmark_permissions [check_count] [context_count]
+
+A synthetic permissions dict with `context_count` contexts and ten times as
+many resources per action and resource type is checked with random
+is_allowed_* calls, once by walking the dict as before and once with the
+compiled permission index.
+"""
+
+import random
+import sys
+import time
+
+from ggrc.app import app
+from ggrc.rbac.permissions_provider import DefaultUserPermissions
+from ggrc.rbac.permissions_provider import PermissionIndex
+from ggrc.rbac.permissions_provider import Permission
+
+
+ACTIONS = ("create", "read", "update", "delete")
+RESOURCE_TYPES = ("Program", "Audit", "Regulation", "Policy", "Standard",
+                  "Contract", "Section", "Clause", "Objective", "Control",
+                  "System", "Process", "Product", "Market", "Facility")
+
+
+def make_permissions(context_count):
+  """Create a permissions dict in the format of load_permissions_for."""
+  rand = random.Random(0)
+  permissions = {}
+  for action in ACTIONS:
+    for resource_type in RESOURCE_TYPES:
+      permissions.setdefault(action, {})[resource_type] = {
+          "contexts": rand.sample(range(1, 2 * context_count), context_count),
+          "resources": rand.sample(range(1, 20 * context_count),
+                                   10 * context_count),
+          "conditions": {},
+      }
+  return permissions
+
+
+class CompiledPermissions(DefaultUserPermissions):
+  """User permissions defined by a static permissions dict."""
+
+  def __init__(self, permissions):
+    self.permissions = permissions
+    self.permission_index = PermissionIndex(permissions)
+
+  def _permissions(self):
+    return self.permissions
+
+  def _permission_index(self):
+    return self.permission_index
+
+
+class NestedDictPermissions(CompiledPermissions):
+  """Permission checks that walk the permissions dict as before."""
+
+  def _permission_match(self, permission, permissions):
+    if None in permissions.get(permission.action, {})\
+            .get(permission.resource_type, {}).get('contexts', []):
+      return True
+    return (
+        permission.resource_id in permissions.get(permission.action, {})
+        .get(permission.resource_type, {}).get('resources', []) or
+        permission.context_id in permissions.get(permission.action, {})
+        .get(permission.resource_type, {}).get('contexts', []) or
+        permission.context_id in permissions.get(permission.action, {})
+        .get(self.ADMIN_PERMISSION.resource_type, {}).get('contexts', [])
+    )
+
+  def _is_allowed(self, permission):
+    permissions = self._permissions()
+    if permission.resource_type != '/admin' \
+       and permission.context_id \
+       and self._is_allowed(permission._replace(context_id=None)):
+      return True
+    if self._permission_match(permission, permissions):
+      return True
+    if self._permission_match(self.ADMIN_PERMISSION, permissions):
+      return True
+    return self._permission_match(
+        self.ADMIN_PERMISSION._replace(context_id=permission.context_id),
+        permissions)
+
+
+def make_checks(check_count, context_count):
+  """Create random permissions to check."""
+  rand = random.Random(1)
+  return [
+      Permission(rand.choice(ACTIONS), rand.choice(RESOURCE_TYPES),
+                 rand.randint(1, 20 * context_count),
+                 rand.randint(1, 2 * context_count))
+      for _ in range(check_count)
+  ]
+
+
+def run(name, user_permissions, checks):
+  """Run all checks and print the time per check."""
+  start = time.time()
+  allowed = sum(1 for check in checks if user_permissions._is_allowed(check))
+  duration = time.time() - start
+  print "{:<12} {:>8} allowed {:>10.3f} us/check".format(
+      name, allowed, duration / len(checks) * 1000000)
+
+
+def main(check_count=100000, context_count=100):
+  permissions = make_permissions(context_count)
+  checks = make_checks(check_count, context_count)
+  with app.app_context():
+    run("nested dict", NestedDictPermissions(permissions), checks)
+    start = time.time()
+    compiled = CompiledPermissions(permissions)
+    print "{:<12} {:>10.3f} ms".format(
+        "compile", (time.time() - start) * 1000)
+    run("compiled", compiled, checks)
+
+
+if __name__ == "__main__":
+  main(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,65 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Compare OFFSET and keyset query chunking on a synthetic table.
+
+Usage (from the test directory, with GGRC_SETTINGS_MODULE set):
+
+    python -m benchmarks.benchmark_query_chunks [row_count] [chunk_size]
+
+An optional third argument can be a database URI, to run the benchmark on
+MySQL instead of the default in-memory sqlite database.
+"""
+
+import sys
+import time
+
+import sqlalchemy as sa
+from sqlalchemy import orm
+from sqlalchemy.ext.declarative import declarative_base
+
+from ggrc import utils
+
+
+BASE = declarative_base()
+
+
+class Item(BASE):  # pylint: disable=too-few-public-methods
+  """Synthetic table with a primary key and some payload."""
+  __tablename__ = "benchmark_query_chunks"
+  id = sa.Column(sa.Integer, primary_key=True)
+  payload = sa.Column(sa.String(100))
+
+
+def setup_table(uri, row_count):
+  """Create and fill the synthetic table and return a session for it."""
+  engine = sa.create_engine(uri)
+  BASE.metadata.drop_all(engine)
+  BASE.metadata.create_all(engine)
+  batch = 10000
+  for start in range(0, row_count, batch):
+    engine.execute(Item.__table__.insert(), [
+        {"id": i + 1, "payload": "payload {}".format(i)}
+        for i in range(start, min(start + batch, row_count))
+    ])
+  return orm.sessionmaker(bind=engine)()
+
+
+def run(name, chunks):
+  """Consume all chunks and print the time and number of rows."""
+  start = time.time()
+  rows = sum(len(list(chunk)) for chunk in chunks)
+  print "{:<8} {:>10} rows {:>10.3f} s".format(name, rows, time.time() - start)
+
+
+def main(row_count=200000, chunk_size=1000, uri="sqlite://"):
+  session = setup_table(uri, row_count)
+  query = session.query(Item.id, Item.payload)
+  run("offset", utils.generate_query_chunks(query, chunk_size))
+  run("keyset", utils.generate_keyset_chunks(query, Item.id, chunk_size))
+  BASE.metadata.drop_all(session.bind)
+
+
+if __name__ == "__main__":
+  ARGS = sys.argv[1:]
+  main(*[int(arg) for arg in ARGS[:2]] + ARGS[2:3])
@@ -2,11 +2,14 @@
 # Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
 
 import itertools
+import json
 
 import ggrc
 from ggrc import models
+from ggrc import utils
 from integration.ggrc import TestCase
 from integration.ggrc import generator
+from integration.ggrc.models import factories
 
 
 counter = 0
@@ -263,6 +266,52 @@ class TestAutomappings(TestCase):
         implied=[(objective, control1), (objective, control2)]
     )
 
+  def test_automapping_revisions(self):
+    """Only inserted automappings are logged, with their stored content."""
+    program = self.create_object(models.Program, {
+        'title': make_name('Program')
+    })
+    regulation = self.create_object(models.Regulation, {
+        'title': make_name('Regulation')
+    })
+    objectives = [self.create_object(models.Objective, {
+        'title': make_name('Objective')
+    }) for _ in range(3)]
+    for objective in objectives:
+      self.create_mapping(regulation, objective)
+    existing = factories.RelationshipFactory(source=program,
+                                             destination=objectives[0])
+    existing_id = existing.id
+    last_revision_id = ggrc.db.session.query(
+        ggrc.db.func.max(models.Revision.id)).scalar()
+
+    parent = self.create_mapping(program, regulation)
+
+    automappings = models.Relationship.query.filter_by(
+        automapping_id=parent.id).all()
+    self.assertEqual(
+        {relate((program.type, program.id), ("Objective", objective.id))
+         for objective in objectives[1:]},
+        {relate((rel.source_type, rel.source_id),
+                (rel.destination_type, rel.destination_id))
+         for rel in automappings},
+    )
+    revisions = models.Revision.query.filter(
+        models.Revision.id > last_revision_id,
+        models.Revision.resource_type == "Relationship",
+        models.Revision.resource_id.in_(
+            [existing_id] + [rel.id for rel in automappings]),
+    ).all()
+    self.assertEqual(
+        sorted(rel.id for rel in automappings),
+        sorted(revision.resource_id for revision in revisions),
+    )
+    stored = {rel.id: json.loads(utils.as_json(rel.log_json()))
+              for rel in automappings}
+    for revision in revisions:
+      self.assertEqual("created", revision.action)
+      self.assertEqual(stored[revision.resource_id], revision.content)
+
   def test_automapping_permissions_check(self):
     _, creator = self.gen.generate_person(user_role="Creator")
     _, admin = self.gen.generate_person(user_role="Administrator")
@@ -2,6 +2,7 @@
 # Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
 
 from mock import MagicMock
+from mock import patch
 
 import ggrc.builder
 import ggrc.models
@@ -104,3 +105,21 @@ class TestBuilder(TestCase):
     self.assertDictContainsSubset(
         {'prop_b': 'prop_b', 'mixin': 'mixin_b'},
         json_obj)
+
+  def test_compiled_publishers(self):
+    """Attribute publishers are compiled once per class and inclusions."""
+    self.mock_service('MockCompiled')
+    models = [
+        self.mock_model('MockCompiled', foo=i, bar=-i, id=i,
+                        _publish_attrs=['foo', 'bar'])
+        for i in range(3)
+    ]
+    for model in models[1:]:
+      model.__class__ = models[0].__class__
+    builder = ggrc.builder.json.get_json_builder(models[0])
+    with patch.object(builder, "_compile_attr_publisher",
+                      wraps=builder._compile_attr_publisher) as compile_attr:
+      json_objs = [publish(model) for model in models]
+    self.assertEqual(2, compile_attr.call_count)
+    self.assertEqual([(i, -i) for i in range(3)],
+                     [(obj['foo'], obj['bar']) for obj in json_objs])
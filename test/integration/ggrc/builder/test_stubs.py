@@ -0,0 +1,65 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for stub resolution in publish_representation."""
+
+from mock import patch
+
+from ggrc.builder import json
+from integration.ggrc import TestCase
+from integration.ggrc.models import factories
+
+
+class TestPublishRepresentation(TestCase):
+  """Tests for rendering lazy stubs of published objects."""
+
+  def setUp(self):
+    super(TestPublishRepresentation, self).setUp()
+    self.programs = [factories.ProgramFactory() for _ in range(3)]
+
+  def test_stubs_rendered_in_place(self):
+    """Stubs of all types are rendered with one query per type."""
+    resource = [{
+        "program": json.LazyStubRepresentation("Program", program.id),
+        "contexts": [json.LazyStubRepresentation("Context",
+                                                 program.context_id)],
+    } for program in self.programs]
+    resource.append({"program": json.LazyStubRepresentation("Program", 0)})
+
+    with patch.object(json, "query_stubs", wraps=json.query_stubs) as query:
+      json.publish_representation(resource)
+    self.assertEqual(2, query.call_count)
+
+    for program, item in zip(self.programs, resource):
+      self.assertEqual({
+          "type": "Program",
+          "id": program.id,
+          "context_id": program.context_id,
+          "href": "/api/programs/{}".format(program.id),
+      }, item["program"])
+      self.assertEqual(program.context_id, item["contexts"][0]["id"])
+    self.assertIsNone(resource[-1]["program"])
+
+  def test_composite_conditions(self):
+    """Stubs with multiple condition keys are matched on all of them."""
+    program = self.programs[0]
+    resource = {
+        "match": json.LazyStubRepresentation(
+            "Program", {"id": program.id, "slug": program.slug}),
+        "no_match": json.LazyStubRepresentation(
+            "Program", {"id": program.id, "slug": "other"}),
+    }
+    json.publish_representation(resource)
+    self.assertEqual(program.id, resource["match"]["id"])
+    self.assertIsNone(resource["no_match"])
+
+  def test_request_stub_cache(self):
+    """Stubs rendered once in a request are not queried again."""
+    program = self.programs[0]
+    json.publish_representation(
+        {"program": json.LazyStubRepresentation("Program", program.id)})
+    resource = {"program": json.LazyStubRepresentation("Program", program.id)}
+    with patch.object(json, "query_stubs") as query:
+      json.publish_representation(resource)
+    self.assertFalse(query.called)
+    self.assertEqual(program.id, resource["program"]["id"])
@@ -4,9 +4,12 @@
 """Tests for snapshot export."""
 
 
+import mock
+
 from ggrc import models
 from ggrc.utils import QueryCounter
 from integration.ggrc import TestCase
+from integration.ggrc.api_helper import Api
 from integration.ggrc.models import factories
 
 
@@ -347,3 +350,47 @@ class TestExportSnapshots(TestCase):
       multiple_query_count = counter.get
 
     self.assertEqual(multiple_query_count, single_query_count)
+
+  @mock.patch("ggrc.settings.REVISION_DELTA_STORAGE", True, create=True)
+  def test_export_delta_query_count(self):
+    """Test that checkpoints of patched revisions are loaded in bulk."""
+    self.import_file("control_snapshot_data_multiple.csv")
+    api = Api()
+    control_ids = [control.id for control in models.Control.query]
+    for control_id in control_ids:
+      control = models.Control.query.get(control_id)
+      api.modify_object(control, {"title": control.title + " v2"})
+
+    controls = models.Control.query.all()
+    with factories.single_commit():
+      audit = factories.AuditFactory()
+      snapshots = self._create_snapshots(audit, controls)
+    self.assertTrue(all(snapshot.revision.checkpoint_id is not None
+                        for snapshot in snapshots))
+
+    def export_count(code=None):
+      """Export control snapshots and get the number of queries."""
+      expression = {
+          "left": "child_type",
+          "op": {"name": "="},
+          "right": "Control",
+      }
+      if code:
+        expression = {
+            "left": expression,
+            "op": {"name": "AND"},
+            "right": {"left": "Code", "op": {"name": "="}, "right": code},
+        }
+      with QueryCounter() as counter:
+        parsed_data = self.export_parsed_csv([{
+            "object_name": "Snapshot",
+            "filters": {"expression": expression},
+        }])["Control Snapshot"]
+        self.assertTrue(all(line["Title"].endswith(" v2")
+                            for line in parsed_data))
+        return len(parsed_data), counter.get
+
+    single_count, single_query_count = export_count("Control 1")
+    multiple_count, multiple_query_count = export_count()
+    self.assertEqual((single_count, multiple_count), (1, len(controls)))
+    self.assertEqual(multiple_query_count, single_query_count)
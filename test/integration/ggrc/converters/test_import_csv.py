@@ -4,10 +4,13 @@
 
 from collections import OrderedDict
 
+import mock
+
 from ggrc import models
 from ggrc.converters import errors
 from integration.ggrc import TestCase
 from integration.ggrc import generator
+from ggrc.models.types import LongJsonType
 from integration.ggrc.models import factories
 
 
@@ -228,3 +231,19 @@ class TestBasicCsvImport(TestCase):
     audit = models.Audit.query.first()
     program = models.Program.query.first()
     self.assertNotEqual(audit.context_id, program.context_id)
+
+  def test_import_oversized_revision(self):
+    """Test import of an object with too long revision content."""
+    with mock.patch.object(LongJsonType, "MAX_TEXT_LENGTH", 100):
+      response = self.import_data(OrderedDict([
+          ("object_type", "Market"),
+          ("code", "market-1"),
+          ("title", "Title"),
+          ("Admin", "user@example.com"),
+      ]))
+    self._check_csv_response(response, {
+        "Market": {
+            "block_errors": {errors.UNKNOWN_ERROR.format(line=2)},
+        },
+    })
+    self.assertEqual(models.Market.query.count(), 0)
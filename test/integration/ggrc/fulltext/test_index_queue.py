@@ -0,0 +1,54 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for deferred full text index updates."""
+
+import mock
+
+from ggrc import db
+from ggrc import settings
+from ggrc.fulltext import index_queue
+from ggrc.fulltext import mysql
+from ggrc.models import all_models
+from integration.ggrc import TestCase
+from integration.ggrc.models import factories
+
+
+class TestIndexQueue(TestCase):
+  """Tests for the full text index queue."""
+
+  @staticmethod
+  def _indexed_title(control_id):
+    record = mysql.MysqlRecordProperty
+    return db.session.query(record.content).filter(
+        record.type == "Control",
+        record.key == control_id,
+        record.property == "title",
+    ).scalar()
+
+  def test_deferred_indexing(self):
+    """Changes are indexed once when the queue is processed."""
+    control_id = factories.ControlFactory(title="old title").id
+
+    with mock.patch.object(settings, "FULLTEXT_INDEX_ASYNC", True):
+      for title in ["new title", "newest title"]:
+        control = all_models.Control.query.get(control_id)
+        control.title = title
+        db.session.commit()
+
+    self.assertEqual(self._indexed_title(control_id), "old title")
+    self.assertEqual(index_queue.get_index_lag()["pending"], 2)
+
+    self.assertEqual(index_queue.process_queue(), 2)
+
+    self.assertEqual(self._indexed_title(control_id), "newest title")
+    self.assertEqual(index_queue.get_index_lag(),
+                     {"pending": 0, "seconds": 0})
+
+  def test_sync_indexing(self):
+    """Changes are indexed in the same transaction by default."""
+    control = factories.ControlFactory(title="old title")
+    control.title = "new title"
+    db.session.commit()
+    self.assertEqual(self._indexed_title(control.id), "new title")
+    self.assertEqual(index_queue.get_index_lag()["pending"], 0)
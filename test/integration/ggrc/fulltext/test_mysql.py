@@ -7,7 +7,9 @@ import sqlalchemy.exc
 
 from ggrc import db
 from ggrc import views
+from ggrc.fulltext import get_indexer
 from ggrc.fulltext import mysql
+from ggrc.fulltext.recordbuilder import Record
 from integration.ggrc import TestCase
 from integration.ggrc.models import factories
 
@@ -73,3 +75,70 @@ class TestCAD(TestCase):
           property=u"\u5555" * 240 + u"2",
       ))
       db.session.commit()
+
+
+class TestRecordUpdates(TestCase):
+  """Tests for writing only changed full text rows."""
+
+  def _stored_rows(self):
+    record_type = mysql.MysqlRecordProperty
+    return {
+        (row.property, row.subproperty): row.content
+        for row in record_type.query.filter(record_type.type == "my_type")
+    }
+
+  def test_update_records(self):
+    """Only changed full text rows are written."""
+    indexer = get_indexer()
+    record = Record(1, "my_type", None, {
+        "title": {"": "title"},
+        "notes": {"": "notes"},
+        "owners": {"1-name": "name", "1-email": "email"},
+    })
+    counts = indexer.update_records("my_type", [1], [record])
+    self.assertEqual(counts["inserted"], 4)
+
+    record.properties = {
+        "title": {"": "new title"},
+        "notes": {"": "notes"},
+        "owners": {"1-name": "name", "2-email": "email"},
+    }
+    counts = indexer.update_records("my_type", [1], [record])
+    db.session.commit()
+    self.assertEqual(
+        (counts["inserted"], counts["updated"], counts["deleted"],
+         counts["skipped"]),
+        (1, 1, 1, 2),
+    )
+    self.assertEqual(self._stored_rows(), {
+        ("title", ""): "new title",
+        ("notes", ""): "notes",
+        ("owners", "1-name"): "name",
+        ("owners", "2-email"): "email",
+    })
+
+  def test_update_record_properties(self):
+    """Update of a single record keeps rows of other properties."""
+    indexer = get_indexer()
+    indexer.update_records("my_type", [1], [Record(1, "my_type", None, {
+        "title": {"": "title"},
+        "notes": {"": "notes"},
+    })])
+    indexer.update_record(Record(1, "my_type", None, {
+        "title": {"": "new title"},
+    }))
+    self.assertEqual(self._stored_rows(), {
+        ("title", ""): "new title",
+        ("notes", ""): "notes",
+    })
+
+  def test_delete_missing_records(self):
+    """Rows of objects without a record are deleted."""
+    indexer = get_indexer()
+    indexer.update_records("my_type", [1], [Record(1, "my_type", None, {
+        "title": {"": "title"},
+    })])
+    counts = indexer.update_records("my_type", [1], [])
+    db.session.commit()
+    self.assertEqual(counts["deleted"], 1)
+    self.assertEqual(self._stored_rows(), {})
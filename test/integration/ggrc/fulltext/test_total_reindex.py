@@ -3,9 +3,13 @@
 
 """Test for total reindex procedure"""
 
-from ggrc import fulltext
+import datetime
 
+from ggrc import db
+from ggrc import fulltext
 from ggrc import views
+from ggrc.fulltext import reindex
+from ggrc.models import all_models
 from integration.ggrc import TestCase
 from integration.ggrc.models import factories as ggrc_factories
 from integration.ggrc_workflows.models import factories as wf_factories
@@ -54,3 +58,59 @@ class TestTotalTeindex(TestCase):
     count = indexer.record_type.query.count()
     views.do_reindex()
     self.assertEqual(count, indexer.record_type.query.count())
+
+  def _prepare_previous_task(self, status, updated_at=None):
+    """Remove Control and Market records and add a previous reindex task.
+
+    The previous task has completed the Market shards only.
+    """
+    with ggrc_factories.single_commit():
+      for _ in range(3):
+        ggrc_factories.ControlFactory()
+        ggrc_factories.MarketFactory()
+    record = fulltext.get_indexer().record_type
+    record.query.filter(record.type.in_(["Control", "Market"])).delete(
+        synchronize_session=False)
+    shards = reindex.get_shards({"Control", "Market"}, 2)
+    completed = [i for i, shard in enumerate(shards)
+                 if shard.model == "Market"]
+    db.session.add(all_models.BackgroundTask(
+        name="reindex1",
+        status=status,
+        parameters={"shards": shards, "completed": completed},
+        updated_at=updated_at,
+    ))
+    task = all_models.BackgroundTask(name="reindex2", status="Running")
+    db.session.add(task)
+    db.session.commit()
+    return task, record, shards
+
+  def test_resume_reindex(self):
+    """Test that reindex continues with unfinished shards of the last task."""
+    task, record, shards = self._prepare_previous_task("Failure")
+
+    views.do_reindex(task)
+
+    self.assertEqual(record.query.filter_by(type="Market").count(), 0)
+    self.assertNotEqual(record.query.filter_by(type="Control").count(), 0)
+    self.assertEqual(task.parameters["completed"], range(len(shards)))
+
+  def test_resume_killed_reindex(self):
+    """Test that a reindex that stopped storing progress is resumed."""
+    task, record, shards = self._prepare_previous_task(
+        "Running", datetime.datetime(2017, 1, 1))
+
+    views.do_reindex(task)
+
+    self.assertEqual(record.query.filter_by(type="Market").count(), 0)
+    self.assertNotEqual(record.query.filter_by(type="Control").count(), 0)
+    self.assertEqual(task.parameters["completed"], range(len(shards)))
+
+  def test_running_reindex_not_resumed(self):
+    """Test that shards of a reindex that is still running are not taken."""
+    task, record, _ = self._prepare_previous_task("Running")
+
+    views.do_reindex(task)
+
+    self.assertNotEqual(record.query.filter_by(type="Market").count(), 0)
+    self.assertNotEqual(record.query.filter_by(type="Control").count(), 0)
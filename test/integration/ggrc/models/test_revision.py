@@ -3,8 +3,15 @@
 
 """ Tests for ggrc.models.Revision """
 
+import mock
+
 import ggrc.models
 import integration.ggrc.generator
+from ggrc import db
+from ggrc.models import revision
+from ggrc.models import revision_content
+from ggrc.services.common import log_event
+from ggrc.utils import QueryCounter
 from integration.ggrc import TestCase
 
 from integration.ggrc.models import factories
@@ -125,3 +132,112 @@ class TestRevisions(TestCase):
     self.assertIsNotNone(revision)
     self.assertEqual(revision.content["title"], process.title)
     self.assertEqual(revision.content["description"], process.description)
+
+  @mock.patch("ggrc.settings.REVISION_DELTA_STORAGE", True, create=True)
+  @mock.patch("ggrc.settings.REVISION_CHECKPOINT_INTERVAL", 3, create=True)
+  def test_delta_storage(self):
+    """Test revisions stored as patches against checkpoints."""
+    cls = ggrc.models.DataAsset
+    name = cls._inflector.table_singular  # pylint: disable=protected-access
+    _, obj = self.gen.generate(cls, name, {name: {
+        "title": "delta v0",
+        "description": "d" * 1000,
+        "context": None,
+    }})
+    for i in range(1, 5):
+      _, obj = self.gen.modify(obj, name, {name: {
+          "slug": obj.slug,
+          "title": "delta v{}".format(i),
+          "description": "d" * 1000,
+          "context": None,
+      }})
+    db.session.expunge_all()
+
+    revisions = sorted(_get_revisions(obj), key=lambda r: r.id)
+    self.assertEqual(
+        ["delta v{}".format(i) for i in range(5)],
+        [r.content["title"] for r in revisions],
+    )
+    self.assertEqual(["d" * 1000] * 5,
+                     [r.content["description"] for r in revisions])
+    checkpoints = [r.id for r in revisions if r.checkpoint_id is None]
+    self.assertEqual([revisions[0].id, revisions[3].id], checkpoints)
+    self.assertEqual(
+        [checkpoints[0], checkpoints[0], checkpoints[1]],
+        [r.checkpoint_id for r in revisions if r.checkpoint_id is not None],
+    )
+    # pylint: disable=protected-access
+    self.assertIsNone(revisions[1]._content)
+
+    contents = revision_content.load_contents(
+        db.session.query(
+            ggrc.models.Revision.id,
+            ggrc.models.Revision.content,
+            ggrc.models.Revision.checkpoint_id,
+            ggrc.models.Revision.content_patch,
+        ).filter(ggrc.models.Revision.id.in_([r.id for r in revisions]))
+    )
+    self.assertEqual({r.id: r.content for r in revisions}, contents)
+
+  @mock.patch("ggrc.settings.REVISION_DELTA_STORAGE", True, create=True)
+  def test_delta_collection_query_count(self):
+    """Test that patched revisions in a collection do not add queries."""
+    cls = ggrc.models.DataAsset
+    name = cls._inflector.table_singular  # pylint: disable=protected-access
+
+    def get_revisions(modifications):
+      """Modify a new object and get its revisions through the API."""
+      _, obj = self.gen.generate(cls, name, {name: {
+          "title": "delta {} v0".format(modifications),
+          "context": None,
+      }})
+      for i in range(1, modifications + 1):
+        _, obj = self.gen.modify(obj, name, {name: {
+            "slug": obj.slug,
+            "title": "delta {} v{}".format(modifications, i),
+            "context": None,
+        }})
+      db.session.expunge_all()
+      with QueryCounter() as counter:
+        response = self.gen.api.get_query(
+            ggrc.models.Revision,
+            "resource_type={}&resource_id={}".format(cls.__name__, obj.id))
+        self.assert200(response)
+        revisions = response.json["revisions_collection"]["revisions"]
+        self.assertEqual(
+            sorted("delta {} v{}".format(modifications, i)
+                   for i in range(modifications + 1)),
+            sorted(rev["content"]["title"] for rev in revisions),
+        )
+        return counter.get
+
+    self.assertEqual(get_revisions(1), get_revisions(5))
+
+  def test_latest_revisions(self):
+    """Test latest revisions are recorded for ORM and bulk writes."""
+    cls = ggrc.models.DataAsset
+    name = cls._inflector.table_singular  # pylint: disable=protected-access
+    _, obj = self.gen.generate(cls, name, {name: {
+        "title": "latest v1",
+        "context": None,
+    }})
+    _, obj = self.gen.modify(obj, name, {name: {
+        "slug": obj.slug,
+        "title": "latest v2",
+        "context": None,
+    }})
+    key = ("DataAsset", obj.id)
+    latest_id = max(r.id for r in _get_revisions(obj))
+    self.assertEqual({key: latest_id},
+                     revision.get_latest_revision_ids({key}))
+
+    obj = cls.query.get(obj.id)
+    obj.title = "latest v3"
+    event = log_event(db.session, None, insert_revisions=True)
+    db.session.commit()
+    latest = max(_get_revisions(obj), key=lambda r: r.id)
+    self.assertEqual(event.id, latest.event_id)
+    self.assertEqual({key: latest.id},
+                     revision.get_latest_revision_ids({key}))
+    self.assertEqual({}, revision.get_latest_revision_ids(
+        {key}, [ggrc.models.Revision.action == "created"]))
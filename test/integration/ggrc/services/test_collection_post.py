@@ -5,6 +5,8 @@
 
 import json
 
+import mock
+
 from ggrc import db
 from ggrc import models
 from integration.ggrc.services import TestCase
@@ -211,3 +213,42 @@ class TestCollectionPost(TestCase):
     relationships = models.Relationship.eager_query().all()
     self.assertEqual(len(relationships), 3)  # This should be 2
     rel1 = relationships[0]
+
+  def test_bulk_create(self):
+    """Test batched collection post with revisions and phase timings."""
+    db.session.add(models.Policy(id=144, title="hello"))
+    db.session.add(models.Policy(id=233, title="world"))
+    db.session.add(models.Policy(id=377, title="bye"))
+    db.session.commit()
+
+    self.client.get("/login")
+    data = json.dumps([{
+        "relationship": {
+            "source": {"id": 144, "type": "Policy"},
+            "destination": {"id": destination_id, "type": "Policy"},
+            "context": None,
+        },
+    } for destination_id in (233, 377)])
+    with mock.patch("ggrc.settings.COLLECTION_POST_BATCH_SIZE", 1,
+                    create=True):
+      response = self.client.post(
+          "/api/relationships",
+          content_type='application/json',
+          data=data,
+          headers=self.headers(("X-GGRC-Bulk-Create", "true"),
+                               ("X-GGRC-Debug-Timings", "true")),
+      )
+
+    self.assert200(response)
+    self.assertEqual([201, 201], [status for status, _ in response.json])
+    timings = json.loads(response.headers["X-GGRC-Timings"])
+    self.assertIn("Flush posted objects", timings)
+    relationships = models.Relationship.query.all()
+    self.assertEqual(2, len(relationships))
+    revisions = models.Revision.query.filter_by(
+        resource_type="Relationship").all()
+    self.assertEqual(
+        {(rel.id, "created") for rel in relationships},
+        {(rev.resource_id, rev.action) for rev in revisions})
+    self.assertEqual(1, len({rev.event_id for rev in revisions}))
+    self.assertEqual(144, revisions[0].content["source_id"])
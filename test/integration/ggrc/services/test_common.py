@@ -5,6 +5,7 @@ import json
 import time
 from urlparse import urlparse
 from wsgiref.handlers import format_date_time
+import mock
 from sqlalchemy import and_
 
 from integration.ggrc.services import TestCase
@@ -12,6 +13,7 @@ from integration.ggrc.api_helper import Api
 from integration.ggrc.generator import ObjectGenerator
 from ggrc.models import all_models
 from ggrc import db
+from ggrc.services.common import Resource
 
 
 COLLECTION_ALLOWED = ["HEAD", "GET", "POST", "OPTIONS"]
@@ -281,6 +283,31 @@ class TestServices(TestCase):
     self.assertStatus(response, 304)
     self.assertIn("Etag", response.headers)
 
+  def test_collection_get_if_none_match(self):
+    """Unchanged collections are not serialized for a conditional GET."""
+    self.mock_model(foo="baz")
+    response = self.client.get(self.mock_url(), headers=self.headers())
+    self.assert200(response)
+    collection_etag = response.headers["Etag"]
+
+    with mock.patch.object(Resource, "build_collection_representation") as \
+            build_collection:
+      response = self.client.get(
+          self.mock_url(),
+          headers=self.headers(("If-None-Match", collection_etag)),
+      )
+    self.assertStatus(response, 304)
+    self.assertEqual(collection_etag, response.headers["Etag"])
+    self.assertFalse(build_collection.called)
+
+    self.mock_model(foo="bar")
+    response = self.client.get(
+        self.mock_url(),
+        headers=self.headers(("If-None-Match", collection_etag)),
+    )
+    self.assert200(response)
+    self.assertNotEqual(collection_etag, response.headers["Etag"])
+
 
 class TestFilteringByRequest(TestCase):
   """Test filter query by request"""
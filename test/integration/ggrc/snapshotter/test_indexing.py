@@ -3,13 +3,16 @@
 
 """Test for indexing of snapshotted objects"""
 
+import mock
 from sqlalchemy.sql.expression import tuple_
 
 from ggrc import db
 from ggrc import models
 from ggrc.views import do_reindex
+from ggrc.fulltext import get_indexer
 from ggrc.fulltext.mysql import MysqlRecordProperty as Record
 from ggrc.snapshotter.indexer import delete_records
+from ggrc.snapshotter.indexer import reindex_snapshots
 
 from integration.ggrc.snapshotter import SnapshotterBaseTestCase
 from integration.ggrc.models import factories
@@ -339,3 +342,82 @@ class TestSnapshotIndexing(SnapshotterBaseTestCase):
     records = get_records(audit, snapshots)
 
     self.assertEqual(records.count(), 57)
+
+  def test_incremental_reindex(self):
+    """Test that reindex writes only records that changed"""
+    self._import_file("snapshotter_create.csv")
+
+    program = db.session.query(models.Program).filter(
+        models.Program.slug == "Prog-13211"
+    ).one()
+
+    self.create_audit(program)
+
+    snapshots = db.session.query(models.Snapshot).all()
+    snapshot_ids = {s.id for s in snapshots}
+
+    def get_snapshot_records():
+      return {
+          (r.key, r.property, r.subproperty): (r.context_id, r.tags, r.content)
+          for r in db.session.query(Record).filter(
+              Record.type == "Snapshot", Record.key.in_(snapshot_ids))
+      }
+
+    expected = get_snapshot_records()
+    snapshot_id = snapshots[0].id
+    db.session.query(Record).filter(
+        Record.type == "Snapshot",
+        Record.key == snapshot_id,
+        Record.property == "title",
+    ).update({"content": "outdated title"}, synchronize_session=False)
+    db.session.query(Record).filter(
+        Record.type == "Snapshot",
+        Record.key == snapshot_id,
+        Record.property == "child",
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    db.engine.execute(Record.__table__.insert(), {
+        "key": snapshot_id,
+        "type": "Snapshot",
+        "context_id": None,
+        "tags": "",
+        "property": "removed property",
+        "subproperty": "",
+        "content": "stale",
+    })
+
+    with mock.patch.object(db.session, "execute",
+                           wraps=db.session.execute) as execute:
+      reindex_snapshots(snapshot_ids)
+
+    self.assertEqual(expected, get_snapshot_records())
+    (_, inserted), _ = execute.call_args
+    self.assertEqual([(snapshot_id, "child"), (snapshot_id, "title")],
+                     sorted((r["key"], r["property"]) for r in inserted))
+
+  def test_reindex_people_prefetch(self):
+    """Test that reindex loads people without a query per person"""
+    self._import_file("snapshotter_create.csv")
+
+    program = db.session.query(models.Program).filter(
+        models.Program.slug == "Prog-13211"
+    ).one()
+
+    self.create_audit(program)
+
+    snapshot_ids = {s.id for s in db.session.query(models.Snapshot)}
+    delete_records(snapshot_ids)
+    get_indexer().cache["people_map"] = {}
+
+    with mock.patch.object(db.session, "query",
+                           wraps=db.session.query) as query:
+      reindex_snapshots(snapshot_ids)
+
+    self.assertNotIn(mock.call(models.Person), query.call_args_list)
+    self.assertEqual({}, get_indexer().cache["people_map"])
+    people = db.session.query(Record).filter(
+        Record.type == "Snapshot",
+        Record.key.in_(snapshot_ids),
+        Record.subproperty.like("%-email"),
+    )
+    self.assertGreater(people.count(), 0)
@@ -5,11 +5,13 @@
 
 import collections
 
+import mock
 import sqlalchemy as sa
 
 from ggrc import db
 import ggrc.models as models
 from ggrc.snapshotter.rules import Types
+from ggrc.utils.json_backends import encode_default
 
 from integration.ggrc.models import factories
 from integration.ggrc.snapshotter import SnapshotterBaseTestCase
@@ -205,6 +207,49 @@ class TestSnapshoting(SnapshotterBaseTestCase):
         control_snapshot.revision_id,
     )
 
+  def test_snapshot_update_revision_content(self):
+    """Test snapshot revisions of an update match the updated snapshots"""
+    program = self.create_object(models.Program, {
+        "title": "Test Program Snapshot 1"
+    })
+    control = self.create_object(models.Control, {
+        "title": "Test Control Snapshot 1"
+    })
+    self.create_mapping(program, control)
+    self.create_audit(program)
+    audit = db.session.query(models.Audit).filter(
+        models.Audit.title.like("%Snapshotable audit%")).one()
+
+    control = self.refresh_object(control)
+    self.api.modify_object(control, {
+        "title": "Test Control Snapshot 1 EDIT 1"
+    })
+    audit = self.refresh_object(audit)
+    with mock.patch("ggrc.snapshotter.get_snapshots") as get_snapshots:
+      self.api.modify_object(audit, {
+          "snapshots": {
+              "operation": "upsert"
+          }
+      })
+    get_snapshots.assert_not_called()
+
+    snapshot = db.session.query(models.Snapshot).filter(
+        models.Snapshot.child_type == "Control",
+        models.Snapshot.child_id == control.id,
+    ).one()
+    self.assertEqual(snapshot.revision.content["title"],
+                     "Test Control Snapshot 1 EDIT 1")
+    revision = db.session.query(models.Revision).filter(
+        models.Revision.resource_type == "Snapshot",
+        models.Revision.resource_id == snapshot.id,
+    ).order_by(models.Revision.id.desc()).first()
+    self.assertEqual(revision.action, "modified")
+    self.assertEqual(revision.content["revision_id"], snapshot.revision_id)
+    self.assertEqual(revision.content["created_at"],
+                     encode_default(snapshot.created_at))
+    self.assertEqual(revision.content["updated_at"],
+                     encode_default(snapshot.updated_at))
+
   def test_update_to_specific_version(self):
     """Test global update and selecting a specific revision for one object"""
     program = self.create_object(models.Program, {
@@ -0,0 +1,83 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for the in-memory automapper relationship graph."""
+
+import unittest
+
+import sqlalchemy as sa
+from sqlalchemy import orm
+
+from ggrc.automapper.graph import RelationshipGraph
+from ggrc.automapper.graph import Stub
+
+
+class TestRelationshipGraph(unittest.TestCase):
+  """Tests for RelationshipGraph."""
+
+  def setUp(self):
+    metadata = sa.MetaData()
+    self.table = sa.Table(
+        "relationships", metadata,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("source_type", sa.String(250)),
+        sa.Column("source_id", sa.Integer),
+        sa.Column("destination_type", sa.String(250)),
+        sa.Column("destination_id", sa.Integer),
+    )
+    engine = sa.create_engine("sqlite://")
+    metadata.create_all(engine)
+    engine.execute(self.table.insert(), [
+        {"source_type": src[0], "source_id": src[1],
+         "destination_type": dst[0], "destination_id": dst[1]}
+        for src, dst in [
+            (("Program", 1), ("Regulation", 1)),
+            (("Section", 1), ("Regulation", 1)),
+            (("Regulation", 1), ("Person", 1)),
+            (("Section", 1), ("Objective", 2)),
+        ]
+    ])
+    self.session = orm.sessionmaker(bind=engine)()
+
+  def graph(self, types=None):
+    return RelationshipGraph(types=types, session=self.session,
+                             table=self.table)
+
+  def test_load(self):
+    """Neighborhoods of all stubs are loaded with a single query."""
+    graph = self.graph()
+    graph.load([Stub("Regulation", 1), Stub("Section", 1)])
+    self.assertEqual(1, graph.query_count)
+    self.assertIn(Stub("Section", 1), graph)
+    self.assertNotIn(Stub("Program", 1), graph)
+    self.assertEqual(
+        {Stub("Program", 1), Stub("Section", 1), Stub("Person", 1)},
+        set(graph.neighbors(Stub("Regulation", 1))),
+    )
+    self.assertEqual(
+        [Stub("Objective", 2)],
+        graph.neighbors(Stub("Section", 1), {"Objective"}),
+    )
+    graph.load([Stub("Regulation", 1)])
+    self.assertEqual(1, graph.query_count)
+
+  def test_types(self):
+    """Neighbors of other types are not loaded."""
+    graph = self.graph(types={"Program", "Regulation", "Section"})
+    self.assertEqual(
+        {Stub("Program", 1), Stub("Section", 1)},
+        set(graph.neighbors(Stub("Regulation", 1))),
+    )
+
+  def test_edges(self):
+    """Edges are found in loaded neighborhoods and in added edges."""
+    graph = self.graph()
+    program, section = Stub("Program", 1), Stub("Section", 1)
+    self.assertFalse(graph.has_edge(program, Stub("Regulation", 1)))
+    graph.load([program])
+    self.assertTrue(graph.has_edge(program, Stub("Regulation", 1)))
+    self.assertTrue(graph.has_edge(Stub("Regulation", 1), program))
+    self.assertFalse(graph.has_edge(program, section))
+    graph.add_edge(program, section)
+    self.assertTrue(graph.has_edge(section, program))
+    self.assertIn(section, graph.neighbors(program))
@@ -0,0 +1,114 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for batched memcache access."""
+
+import unittest
+
+from ggrc.cache import bulk
+from ggrc.cache import lru
+
+
+class FakeMemcacheClient(object):
+  """Dict based memcache client that records all multi-key calls."""
+
+  def __init__(self, data=None):
+    self.data = dict(data or {})
+    self.calls = []
+
+  def get_multi(self, keys):
+    self.calls.append(("get_multi", list(keys)))
+    return {key: self.data[key] for key in keys if key in self.data}
+
+  def add_multi(self, mapping, expiration_time=0):
+    # pylint: disable=unused-argument
+    self.calls.append(("add_multi", sorted(mapping)))
+    for key, value in mapping.items():
+      self.data.setdefault(key, value)
+    return []
+
+
+class TestBatchSizer(unittest.TestCase):
+  """Tests for adaptive batch sizes."""
+
+  def test_resize(self):
+    """Fast full batches grow and slow batches shrink."""
+    sizer = bulk.BatchSizer(32, 128, minimum=16, target_seconds=1)
+    sizer.update(32, 0.1)
+    self.assertEqual(64, sizer.size)
+    sizer.update(10, 0.1)
+    self.assertEqual(64, sizer.size)
+    sizer.update(64, 0.1)
+    sizer.update(128, 0.1)
+    self.assertEqual(128, sizer.size)
+    sizer.update(128, 2)
+    self.assertEqual(64, sizer.size)
+    for _ in range(5):
+      sizer.update(0, 0, failed=True)
+    self.assertEqual(16, sizer.size)
+
+
+class TestBulkCacheClient(unittest.TestCase):
+  """Tests for BulkCacheClient."""
+
+  def setUp(self):
+    self.keys = ["collection:controls:{}".format(i) for i in range(10)]
+    self.client = FakeMemcacheClient({
+        self.keys[0]: {"id": 0},
+        self.keys[1]: {"id": 1},
+        bulk.get_blocker_key(self.keys[1]): "InProgress",
+        bulk.get_blocker_key(self.keys[2]): "InProgress",
+    })
+    sizer = bulk.BatchSizer(4, 4, minimum=4)
+    self.bulk_client = bulk.BulkCacheClient(self.client, sizer)
+
+  def test_get_with_blockers(self):
+    """Payloads and blockers are read in the same batched multi-gets."""
+    found = self.bulk_client.get_with_blockers(self.keys)
+    self.assertEqual({self.keys[0]: {"id": 0}}, found)
+    self.assertEqual({self.keys[1], self.keys[2]},
+                     self.bulk_client.blocked_keys)
+    self.assertEqual(5, len(self.client.calls))
+    for _, batch in self.client.calls:
+      self.assertEqual(4, len(batch))
+      self.assertEqual(bulk.get_blocker_key(batch[0]), batch[1])
+
+  def test_add_after_lookup(self):
+    """Adding looked up keys skips blocked keys without another lookup."""
+    self.bulk_client.get_with_blockers(self.keys)
+    del self.client.calls[:]
+    self.bulk_client.add_multi({key: {} for key in self.keys[1:6]})
+    self.assertEqual(
+        [("add_multi", self.keys[3:6])],
+        self.client.calls)
+
+  def test_add_without_lookup(self):
+    """Blockers of keys that were not looked up are checked before adding."""
+    self.bulk_client.add_multi({key: {} for key in self.keys[1:3]})
+    self.assertEqual(["get_multi"], [call[0] for call in self.client.calls])
+    self.assertNotIn(self.keys[2], self.client.data)
+
+  def test_stats(self):
+    """Hits and misses are counted per resource type."""
+    bulk.stats = bulk.CacheStats()
+    self.bulk_client.get_with_blockers(self.keys)
+    stats = bulk.stats.as_dict()
+    self.assertEqual(1, stats["controls"]["hits"])
+    self.assertEqual(9, stats["controls"]["misses"])
+
+  def test_local_cache(self):
+    """Values read from memcache are served by the local cache later."""
+    local_cache = lru.LruCache(1024 * 1024, 60)
+    self.bulk_client.local_cache = local_cache
+    self.bulk_client.get_with_blockers(self.keys[:2])
+    self.bulk_client.add_multi({self.keys[3]: {"id": 3}})
+    self.assertEqual({self.keys[0]: {"id": 0}, self.keys[3]: {"id": 3}},
+                     local_cache.get_multi(self.keys))
+
+    del self.client.calls[:]
+    found = bulk.BulkCacheClient(
+        self.client, local_cache=local_cache
+    ).get_with_blockers([self.keys[0], self.keys[3]])
+    self.assertEqual({self.keys[0]: {"id": 0}, self.keys[3]: {"id": 3}},
+                     found)
+    self.assertEqual([], self.client.calls)
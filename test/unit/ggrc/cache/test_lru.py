@@ -0,0 +1,78 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for the in-process LRU cache."""
+
+import unittest
+
+import mock
+
+from ggrc.cache.lru import LruCache
+from ggrc.cache.lru import LruDict
+from ggrc.converters.base import Converter
+
+
+class TestLruCache(unittest.TestCase):
+  """Tests for LruCache."""
+
+  def test_copies(self):
+    """Every get returns a new copy of the stored value."""
+    cache = LruCache(1024, 60)
+    cache.set_multi({"a": {"b": [1]}})
+    cache.get_multi(["a"])["a"]["b"].append(2)
+    self.assertEqual({"a": {"b": [1]}}, cache.get_multi(["a", "c"]))
+
+  def test_evict_by_size(self):
+    """Least recently used entries are evicted above the size limit."""
+    value = "x" * 100
+    cache = LruCache(350, 60)
+    for key in "abc":
+      cache.set_multi({key: value})
+    cache.get_multi(["a"])
+    cache.set_multi({"d": value})
+    self.assertEqual(["a", "c", "d"], sorted(cache.get_multi("abcd")))
+    self.assertLessEqual(cache.size, 350)
+
+  def test_ttl(self):
+    """Expired entries are not returned."""
+    cache = LruCache(1024, 10)
+    with mock.patch("ggrc.cache.lru.time.time", return_value=100):
+      cache.set_multi({"a": 1})
+    with mock.patch("ggrc.cache.lru.time.time", return_value=105):
+      self.assertEqual({"a": 1}, cache.get_multi(["a"]))
+    with mock.patch("ggrc.cache.lru.time.time", return_value=111):
+      self.assertEqual({}, cache.get_multi(["a"]))
+    self.assertEqual(0, cache.size)
+
+  def test_delete(self):
+    cache = LruCache(1024, 60)
+    cache.set_multi({"a": 1, "b": 2})
+    cache.delete_multi(["a", "c"])
+    self.assertEqual({"b": 2}, cache.get_multi(["a", "b"]))
+
+  def test_import_clears_local_cache(self):
+    """Dropping the cache after an import clears the local cache too."""
+    cache = LruCache(1024, 60)
+    cache.set_multi({"a": 1})
+    with mock.patch("ggrc.settings.MEMCACHE_MECHANISM", True, create=True):
+      with mock.patch("ggrc.cache.lru.get_local_cache", return_value=cache):
+        with mock.patch("ggrc.cache.MemCache") as memcache:
+          Converter.drop_cache()
+    self.assertEqual({}, cache.get_multi(["a"]))
+    memcache.return_value.clean.assert_called_once_with()
+
+
+class TestLruDict(unittest.TestCase):
+  """Tests for LruDict."""
+
+  def test_evict_by_count(self):
+    """Least recently used items are evicted above the size limit."""
+    cache = LruDict(3)
+    for key in "abc":
+      cache[key] = key.upper()
+    self.assertEqual("A", cache["a"])
+    cache["d"] = "D"
+    cache["c"] = "C"
+    self.assertEqual(["a", "c", "d"], sorted(cache))
+    self.assertNotIn("b", cache)
+    self.assertEqual(["a", "d", "c"], list(cache))
@@ -113,6 +113,30 @@ class TestSplitArry(unittest.TestCase):
     self.assertEqual(offests[2], 9)
 
 
+class TestGenerateCsvChunks(unittest.TestCase):
+  """Test streaming csv generation."""
+
+  def test_same_as_csv_string(self):
+    """Test that joined csv chunks match the full csv string."""
+    test_data = [
+        [u"Object type", u"Code", u"Title"],
+        [u"Control", u"CONTROL-1", u"\u010c\u017e, with \"quotes\""],
+        [u"", u"CONTROL-2"],
+        [],
+        [],
+    ]
+    expected = import_helper.generate_csv_string(copy.deepcopy(test_data))
+    for lines_per_chunk in (1, 2, 10):
+      chunks = list(import_helper.generate_csv_chunks(
+          test_data, 3, lines_per_chunk=lines_per_chunk))
+      self.assertEqual("".join(chunks), expected)
+      self.assertEqual(len(chunks), -(-len(test_data) // lines_per_chunk))
+
+  def test_empty_data(self):
+    """Test that no chunks are generated for empty data."""
+    self.assertEqual(list(import_helper.generate_csv_chunks([], 0)), [])
+
+
 class TestColumnOrder(unittest.TestCase):
 
   """Tests for colum order function.
@@ -0,0 +1,79 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for custom ORM data types."""
+
+import datetime
+import pickle
+import unittest
+
+import mock
+
+from ggrc.models import exceptions
+from ggrc.models.types import CompressedType
+
+
+class TestCompressedType(unittest.TestCase):
+  """Tests for the versioned compressed payloads of CompressedType."""
+
+  def setUp(self):
+    self.type_ = CompressedType()
+
+  def round_trip(self, value):
+    payload = self.type_.process_bind_param(value, None)
+    return payload, self.type_.process_result_value(payload, None)
+
+  def test_json_zlib(self):
+    """JSON values are stored as compressed JSON."""
+    value = {
+        "content": "x" * 10000,
+        "status_code": 200,
+        "headers": [["Content-Type", "application/json"]],
+    }
+    payload, result = self.round_trip(value)
+    self.assertEqual(CompressedType.JSON_ZLIB, payload[:1])
+    self.assertLess(len(payload), len(pickle.dumps(value)) / 10)
+    self.assertEqual(value, result)
+
+  def test_pickle_fallback(self):
+    """Values that JSON can not represent are stored as compressed pickles."""
+    for value in ({"date": datetime.date(2017, 5, 1)}, "\xff\xfe",
+                  "\xc5\xa1", (1, 2), {"headers": [("a", "b")]},
+                  {1: "a", "b": 2}):
+      payload, result = self.round_trip(value)
+      self.assertEqual(CompressedType.PICKLE_ZLIB, payload[:1])
+      self.assertEqual(value, result)
+      self.assertEqual(type(value), type(result))
+
+  def test_legacy_pickle(self):
+    """Rows written as plain pickles are still readable."""
+    value = {"content": "body", "headers": [("a", "b")], "status_code": 200}
+    for protocol in (0, pickle.HIGHEST_PROTOCOL):
+      self.assertEqual(value, self.type_.process_result_value(
+          pickle.dumps(value, protocol), None))
+    self.assertIsNone(self.type_.process_result_value(None, None))
+
+  def test_lz4(self):
+    """lz4 is used when selected and installed, zlib otherwise."""
+    lz4 = mock.Mock()
+    lz4.compress.side_effect = lambda data: data[::-1]
+    lz4.decompress.side_effect = lambda data: data[::-1]
+    with mock.patch("ggrc.settings.COMPRESSED_TYPE_CODEC", "lz4", create=True):
+      with mock.patch("ggrc.models.types._get_lz4", return_value=lz4):
+        payload, result = self.round_trip({"a": 1})
+      self.assertEqual(CompressedType.JSON_LZ4, payload[:1])
+      self.assertEqual({"a": 1}, result)
+      with mock.patch("ggrc.models.types._get_lz4", return_value=None):
+        payload, result = self.round_trip({"a": 1})
+        self.assertEqual(CompressedType.JSON_ZLIB, payload[:1])
+        with self.assertRaises(exceptions.ValidationError):
+          self.type_.process_result_value(
+              CompressedType.JSON_LZ4 + "data", None)
+
+  def test_length_limit(self):
+    """The limit applies to the compressed payload."""
+    with mock.patch.object(CompressedType, "MAX_BINARY_LENGTH", 100):
+      self.round_trip("a" * 1000)
+      with self.assertRaises(exceptions.ValidationError):
+        self.type_.process_bind_param(
+            [str(i) for i in range(1000)], None)
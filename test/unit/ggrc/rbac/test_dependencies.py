@@ -0,0 +1,136 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for dependencies of cached user permissions."""
+
+import collections
+import unittest
+
+import mock
+
+from ggrc.rbac import dependencies
+
+
+class FakeObject(collections.namedtuple("FakeObject", ["type", "id"])):
+  """Modified object with a type and an id."""
+
+
+def modified(new=(), dirty=(), deleted=()):
+  """Create a modified objects cache from (type, content) pairs."""
+  result = mock.Mock()
+  for name, objects in (("new", new), ("dirty", dirty), ("deleted", deleted)):
+    setattr(result, name, {
+        FakeObject(type_, index): content
+        for index, (type_, content) in enumerate(objects)
+    })
+  return result
+
+
+class FakeCache(object):
+  """Memcache client with get_multi only."""
+
+  def __init__(self, values):
+    self.values = values
+
+  def get_multi(self, keys):
+    return {key: self.values[key] for key in keys if key in self.values}
+
+
+class TestGetDependencies(unittest.TestCase):
+  """Tests for collecting dependencies of loaded permissions."""
+
+  def test_dependencies(self):
+    """Person, contexts and resources are collected."""
+    permissions = {
+        "read": {
+            "Program": {"contexts": [1, 2], "resources": [10]},
+            "Audit": {"resources": [20, 21]},
+        },
+        "update": {"Program": {"contexts": [3]}},
+        "__GGRC_ADMIN__": {"__GGRC_ALL__": {"contexts": [0]}},
+        "not_a_dict": [],
+    }
+    self.assertEqual(
+        dependencies.get_dependencies(5, permissions, [7]),
+        {
+            "Person": {5},
+            "Context": {0, 1, 2, 3, 7},
+            "Program": {10},
+            "Audit": {20, 21},
+            "__GGRC_ALL__": set(),
+        })
+
+
+class TestGetChangedDependencies(unittest.TestCase):
+  """Tests for collecting changed objects that permissions depend on."""
+
+  def test_global_types(self):
+    """Changes of roles affect all users."""
+    self.assertIsNone(dependencies.get_changed_dependencies(
+        modified(dirty=[("Role", {"id": 1})])))
+    self.assertIsNone(dependencies.get_changed_dependencies(
+        modified(new=[("Workflow", {"id": 1, "kind": "Backlog"})])))
+
+  def test_unrelated_types(self):
+    """Changes of objects without permission effects are ignored."""
+    self.assertEqual(dependencies.get_changed_dependencies(modified(
+        new=[("Control", {"id": 1}), ("Workflow", {"id": 2, "kind": None})],
+    )), {})
+
+  def test_person_types(self):
+    """Role assignments affect the assigned person."""
+    self.assertEqual(dependencies.get_changed_dependencies(modified(
+        new=[("UserRole", {"person_id": 1, "context_id": 9})],
+        dirty=[("AccessControlList", {"person_id": 2})],
+        deleted=[("ObjectOwner", {"person_id": 3}), ("Person", {"id": 4})],
+    )), {"Person": {1, 2, 3, 4}})
+
+  def test_context_implications(self):
+    """Context implications affect both contexts."""
+    self.assertEqual(dependencies.get_changed_dependencies(modified(
+        new=[("ContextImplication", {"source_context_id": 1,
+                                     "context_id": 2})],
+        deleted=[("Context", {"id": 3})],
+    )), {"Context": {1, 2, 3}})
+
+  @mock.patch("ggrc.rbac.dependencies._get_related_contexts")
+  def test_relationships(self, related_contexts):
+    """Relationships affect both endpoints and their contexts."""
+    related_contexts.return_value = {7}
+    self.assertEqual(dependencies.get_changed_dependencies(modified(
+        new=[("Relationship", {"source_type": "Program", "source_id": 1,
+                               "destination_type": "Control",
+                               "destination_id": 2})],
+    )), {"Program": {1}, "Control": {2}, "Context": {7}})
+    related_contexts.assert_called_once_with(
+        {("Program", 1), ("Control", 2)})
+
+
+class TestGetAffectedKeys(unittest.TestCase):
+  """Tests for finding cached permissions affected by a change."""
+
+  def test_affected_keys(self):
+    """Only keys that depend on changed objects are affected."""
+    cache = FakeCache({
+        "permissions:1:dependencies": {"Person": {1}, "Context": {5}},
+        "permissions:2:dependencies": {"Person": {2}, "Program": {8}},
+    })
+    keys = {"permissions:1", "permissions:2", "permissions:list"}
+    self.assertEqual(
+        dependencies.get_affected_keys(cache, keys, {"Context": {5}}),
+        {"permissions:1"})
+    self.assertEqual(
+        dependencies.get_affected_keys(cache, keys, {"Program": {8},
+                                                     "Person": {1}}),
+        {"permissions:1", "permissions:2"})
+    self.assertEqual(
+        dependencies.get_affected_keys(cache, keys, {"Control": {5}}),
+        set())
+
+  def test_missing_dependencies(self):
+    """Permissions without stored dependencies are always affected."""
+    cache = FakeCache({})
+    self.assertEqual(
+        dependencies.get_affected_keys(cache, {"permissions:3"},
+                                       {"Control": {1}}),
+        {"permissions:3"})
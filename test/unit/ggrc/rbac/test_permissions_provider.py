@@ -0,0 +1,112 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for the default user permissions and the permission index."""
+
+import unittest
+
+import mock
+
+from ggrc.rbac.permissions_provider import DefaultUserPermissions
+from ggrc.rbac.permissions_provider import Permission
+from ggrc.rbac.permissions_provider import PermissionIndex
+
+
+class StaticPermissions(DefaultUserPermissions):
+  """User permissions defined by a static permissions dict."""
+
+  def __init__(self, permissions):
+    self.permissions = permissions
+    self.permission_index = PermissionIndex(permissions)
+
+  def _permissions(self):
+    return self.permissions
+
+  def _permission_index(self):
+    return self.permission_index
+
+
+class TestAllowedUpdateIds(unittest.TestCase):
+  """Tests for bulk update permission checks."""
+
+  PERMISSIONS = [
+      {},
+      {"update": {"Control": {"resources": [1, 3], "contexts": [5]}}},
+      {"update": {"Control": {"contexts": [None]}}},
+      {"update": {"__GGRC_ALL__": {"contexts": [5]}}},
+      {"__GGRC_ADMIN__": {"__GGRC_ALL__": {"contexts": [0]}}},
+      {"__GGRC_ADMIN__": {"__GGRC_ALL__": {"contexts": [5]}}},
+  ]
+
+  def test_matches_single_checks(self):
+    """Bulk check gives the same result as checks one by one."""
+    ids = [1, 2, 3, 4]
+    for permissions in self.PERMISSIONS:
+      user_permissions = StaticPermissions(permissions)
+      for context_id in (None, 5, 6):
+        expected = {
+            id_ for id_ in ids
+            if user_permissions.is_allowed_update("Control", id_, context_id)
+        }
+        self.assertEqual(
+            expected,
+            user_permissions.allowed_update_ids("Control", ids, context_id),
+            (permissions, context_id),
+        )
+
+  def test_resources(self):
+    """Only listed resources are allowed without context permissions."""
+    user_permissions = StaticPermissions(self.PERMISSIONS[1])
+    self.assertEqual({1, 3}, user_permissions.allowed_update_ids(
+        "Control", [1, 2, 3, 4], 6))
+    self.assertEqual({1, 2, 3, 4}, user_permissions.allowed_update_ids(
+        "Control", [1, 2, 3, 4], 5))
+
+
+class Instance(object):  # pylint: disable=too-few-public-methods
+  """Object with the attributes used by permission checks."""
+
+  def __init__(self, id_, context_id=None, **kwargs):
+    self.id = id_
+    self.type = "Control"
+    self._inflector = mock.Mock(model_singular="Control")
+    self.context = mock.Mock(id=context_id) if context_id else None
+    self.__dict__.update(kwargs)
+
+
+class TestPermissionIndex(unittest.TestCase):
+  """Tests for checks on the compiled permissions."""
+
+  def test_admin(self):
+    """Admin permission allows everything."""
+    index = PermissionIndex({"__GGRC_ADMIN__": {"__GGRC_ALL__": {
+        "contexts": [0],
+    }}})
+    self.assertTrue(index.is_admin)
+    self.assertTrue(index.is_allowed(Permission("delete", "Control", 1, 5)))
+    self.assertTrue(index.is_allowed_for(Instance(1), "delete"))
+
+  def test_global_context(self):
+    """Permissions without a context apply to all contexts."""
+    index = PermissionIndex({"read": {"Control": {"contexts": [None]}}})
+    self.assertFalse(index.is_admin)
+    self.assertTrue(index.is_allowed(Permission("read", "Control", 1, 5)))
+    self.assertFalse(index.is_allowed(Permission("update", "Control", 1, 5)))
+
+  def test_conditions(self):
+    """Conditions are checked for the instance and the context."""
+    index = PermissionIndex({"update": {"Control": {
+        "contexts": [5],
+        "resources": [1],
+        "conditions": {5: [{
+            "condition": "is",
+            "terms": {"property_name": "title", "value": "allowed"},
+        }]},
+    }}})
+    self.assertTrue(index.is_allowed_for(Instance(1), "update"))
+    self.assertTrue(index.is_allowed_for(
+        Instance(2, 5, title="allowed"), "update"))
+    self.assertFalse(index.is_allowed_for(
+        Instance(2, 5, title="other"), "update"))
+    self.assertFalse(index.is_allowed_for(
+        Instance(2, 5, title="allowed"), "delete"))
@@ -173,3 +173,62 @@ class TestGetRevisionsList(TestCase):
       self.assertEqual(
           expected_results,
           [r.action for r in self.get_log_revisions(dirty[0])])
+
+
+class TestReadPermissionFilter(TestCase):
+  """Tests for memoized read permission checks of published resources."""
+
+  @staticmethod
+  def relationship(id_, source_id, destination_id):
+    return {
+        "type": "Relationship",
+        "id": id_,
+        "context": None,
+        "source": {"type": "Control", "id": source_id, "context_id": 1},
+        "destination": {"type": "Market", "id": destination_id,
+                        "context_id": 2},
+    }
+
+  @staticmethod
+  def revision(id_, resource_id):
+    return {
+        "type": "Revision",
+        "id": id_,
+        "context_id": None,
+        "resource_type": "Control",
+        "resource_id": resource_id,
+    }
+
+  def test_relationship_permissions_memoized(self):
+    """Readable contexts are fetched once per type for all relationships."""
+    resources = [self.relationship(i, i, i) for i in range(10)]
+    with mock.patch.object(common, "_is_creator", return_value=True):
+      with mock.patch.object(common, "permissions") as permissions:
+        permissions.read_contexts_for.side_effect = {
+            "Control": [1], "Market": []}.get
+        permissions.read_resources_for.return_value = [3, 4]
+        filtered = common.filter_resource(resources,
+                                          user_permissions=mock.Mock())
+
+    self.assertEqual([3, 4], [r["id"] for r in filtered])
+    self.assertEqual(
+        ["Control", "Market"],
+        sorted(c[0][0] for c in permissions.read_contexts_for.call_args_list))
+    self.assertEqual(1, permissions.read_resources_for.call_count)
+
+  def test_revision_targets_bulk_loaded(self):
+    """Revision targets are loaded with a single query per type."""
+    resources = [self.revision(i, i % 3) for i in range(9)]
+    user_permissions = mock.Mock()
+    user_permissions.is_allowed_read_for.side_effect = lambda i: i.id != 1
+    instances = [mock.Mock(id=0), mock.Mock(id=1)]
+    with mock.patch.object(common, "_is_creator", return_value=True):
+      with mock.patch.object(common.ggrc.models, "all_models") as all_models:
+        query = all_models.Control.query.filter.return_value
+        query.all.return_value = instances
+        filtered = common.filter_resource(resources,
+                                          user_permissions=user_permissions)
+
+    self.assertEqual([0, 3, 6], [r["id"] for r in filtered])
+    self.assertEqual(1, all_models.Control.query.filter.call_count)
+    self.assertEqual(2, user_permissions.is_allowed_read_for.call_count)
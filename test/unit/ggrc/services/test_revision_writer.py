@@ -0,0 +1,78 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Unit tests for ggrc.services.revision_writer."""
+
+import collections
+import json
+from unittest import TestCase
+
+import mock
+
+from ggrc.models.exceptions import ValidationError
+from ggrc.services import revision_writer
+
+
+class LoggedObject(collections.namedtuple("LoggedObject", ["id", "title"])):
+  """Object with a log_json that counts its calls."""
+
+  calls = collections.Counter()
+
+  def log_json(self):
+    self.calls[self.id] += 1
+    return {"id": self.id, "title": self.title}
+
+
+class TestWriteRevisions(TestCase):
+  """Tests for writing revisions in batches."""
+
+  def setUp(self):
+    LoggedObject.calls.clear()
+    self.session = mock.Mock()
+    self.objects = [LoggedObject(i, u"\u0161" * 10) for i in range(5)]
+
+  def written_rows(self):
+    return [row for call in self.session.execute.call_args_list
+            for row in call[0][1]]
+
+  def test_actions_and_content(self):
+    """Rows keep the order and actions and serialize content once."""
+    actions = [(obj, "created") for obj in self.objects]
+    actions.append((self.objects[0], "modified"))
+    count = revision_writer.write_revisions(
+        self.session, 7, 3, actions, batch_size=10)
+    self.assertEqual(6, count)
+    self.assertEqual(1, self.session.execute.call_count)
+    rows = self.written_rows()
+    self.assertEqual(["created"] * 5 + ["modified"],
+                     [row["action"] for row in rows])
+    self.assertEqual({7}, {row["event_id"] for row in rows})
+    self.assertEqual({3}, {row["modified_by_id"] for row in rows})
+    self.assertEqual(self.objects[0].log_json(),
+                     json.loads(rows[-1]["content"]))
+    self.assertEqual(2, LoggedObject.calls[self.objects[0].id])
+    self.assertEqual(1, LoggedObject.calls[self.objects[1].id])
+
+  def test_batches(self):
+    """Statements are limited by row count and content size."""
+    actions = [(obj, "created") for obj in self.objects]
+    revision_writer.write_revisions(self.session, 1, 1, actions, batch_size=2)
+    self.assertEqual([2, 2, 1], [len(call[0][1]) for call in
+                                 self.session.execute.call_args_list])
+
+    self.session.reset_mock()
+    size = revision_writer.serialize_content(self.objects[0].log_json())[1]
+    revision_writer.write_revisions(self.session, 1, 1, actions,
+                                    batch_size=10, max_batch_bytes=size * 3)
+    self.assertEqual([3, 2], [len(call[0][1]) for call in
+                              self.session.execute.call_args_list])
+    self.assertEqual(5, len(self.written_rows()))
+
+  def test_content_too_long(self):
+    """Content longer than the revisions column is rejected."""
+    with mock.patch.object(revision_writer.LongJsonType, "MAX_TEXT_LENGTH",
+                           10):
+      with self.assertRaises(ValidationError):
+        revision_writer.write_revisions(
+            self.session, 1, 1, [(self.objects[0], "created")])
+    self.session.execute.assert_not_called()
@@ -3,6 +3,10 @@
 
 import unittest
 
+import sqlalchemy as sa
+from sqlalchemy import orm
+from sqlalchemy.ext.declarative import declarative_base
+
 from ggrc import utils
 
 
@@ -155,3 +159,47 @@ class TestUtilsFunctions(unittest.TestCase):
     self.assertEqual(utils.iso_to_us_date("2002-07-11"), "07/11/2002")
     with self.assertRaises(ValueError):
       utils.iso_to_us_date("1002-07-11")
+
+
+class TestGenerateKeysetChunks(unittest.TestCase):
+  """Tests for keyset query chunk generation."""
+
+  def setUp(self):
+    base = declarative_base()
+
+    class Item(base):  # pylint: disable=too-few-public-methods
+      __tablename__ = "items"
+      id = sa.Column(sa.Integer, primary_key=True)
+      name = sa.Column(sa.String(10))
+
+    engine = sa.create_engine("sqlite://")
+    base.metadata.create_all(engine)
+    # sparse ids to make sure chunks do not rely on consecutive values
+    engine.execute(Item.__table__.insert(),
+                   [{"id": i * 3, "name": str(i)} for i in range(1, 26)])
+    self.session = orm.sessionmaker(bind=engine)()
+    self.item = Item
+
+  def test_all_rows_in_order(self):
+    """Test that chunks contain all rows ordered by id."""
+    query = self.session.query(self.item.id, self.item.name)
+    chunks = list(utils.generate_keyset_chunks(query, self.item.id, 10))
+    self.assertEqual([len(chunk) for chunk in chunks], [10, 10, 5])
+    self.assertEqual([row.id for chunk in chunks for row in chunk],
+                     [i * 3 for i in range(1, 26)])
+
+  def test_exact_chunks_and_filters(self):
+    """Test chunking of a filtered query with an existing order."""
+    query = self.session.query(self.item).filter(
+        self.item.id > 15
+    ).order_by(self.item.name)
+    chunks = list(utils.generate_keyset_chunks(query, self.item.id, 5))
+    self.assertEqual([len(chunk) for chunk in chunks], [5, 5, 5, 5])
+    self.assertEqual([item.id for chunk in chunks for item in chunk],
+                     [i * 3 for i in range(6, 26)])
+
+  def test_empty_query(self):
+    """Test that an empty query generates no chunks."""
+    query = self.session.query(self.item.id).filter(self.item.id < 0)
+    self.assertEqual(list(utils.generate_keyset_chunks(query, self.item.id)),
+                     [])
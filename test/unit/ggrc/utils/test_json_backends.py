@@ -0,0 +1,87 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for JSON serializer backends."""
+
+import datetime
+import json
+import unittest
+
+import mock
+
+from ggrc import utils
+from ggrc.utils import json_backends
+
+
+def get_backends():
+  """Get instances of all installed backends."""
+  backends = []
+  for backend_class in json_backends.BACKENDS:
+    try:
+      backends.append(backend_class())
+    except ImportError:
+      pass
+  return backends
+
+
+class TestJsonBackends(unittest.TestCase):
+  """Tests for encoding and decoding with all installed backends."""
+
+  DOCUMENT = {
+      "title": u"Control \u0161",
+      "slug": "CONTROL-1",
+      "url": "http://example.com/a/b",
+      "created_at": datetime.datetime(2017, 5, 1, 12, 30, 5),
+      "updated_at": datetime.datetime(2017, 5, 1),
+      "start_date": datetime.date(2017, 5, 2),
+      "duration": datetime.timedelta(hours=1, minutes=2),
+      "tags": {"a"},
+      "owners": [{"id": 1, "type": "Person", "context_id": None}],
+      "big": 2 ** 70,
+      "ratio": 0.1,
+      "active": True,
+  }
+
+  def test_grc_encoder_compatibility(self):
+    """All backends encode values the same way as GrcEncoder."""
+    expected = json.loads(json.dumps(self.DOCUMENT, cls=utils.GrcEncoder))
+    for backend in get_backends():
+      value = backend.dumps(self.DOCUMENT)
+      self.assertIsInstance(value, str)
+      self.assertEqual(expected, json.loads(value), backend.name)
+      self.assertEqual(expected, backend.loads(value), backend.name)
+
+  def test_surrogate_escapes(self):
+    """Surrogate escapes are decoded without changes."""
+    for document in ({"title": u"ab\ud800cd"}, {"title": u"\U0001f600"},
+                     {"title": u"ab\udfffcd"}):
+      for backend in get_backends():
+        value = backend.dumps(document)
+        self.assertEqual(document, backend.loads(value), backend.name)
+    for backend in get_backends():
+      self.assertEqual({"title": u"ab\ud800cd"},
+                       backend.loads('{"title": "ab\\uD800cd"}'),
+                       backend.name)
+
+  def test_unsupported_type(self):
+    """Values that GrcEncoder can not encode are rejected."""
+    for backend in get_backends():
+      with self.assertRaises(TypeError):
+        backend.dumps({"value": object()})
+
+  def test_byte_length(self):
+    """Byte length is counted without encoding ASCII strings."""
+    value = utils.as_json({"title": u"\u0161"})
+    self.assertEqual(len(value.encode("utf-8")),
+                     json_backends.byte_length(value))
+    self.assertEqual(3, json_backends.byte_length(u"\u0161a"))
+
+  def test_fallback(self):
+    """Backends that are not installed fall back to the standard library."""
+    with mock.patch.object(json_backends, "_backend", None):
+      with mock.patch("ggrc.settings.JSON_BACKEND", "missing", create=True):
+        self.assertEqual("json", json_backends.get_backend().name)
+      with mock.patch.object(json_backends.UjsonBackend, "__init__",
+                             side_effect=ImportError):
+        json_backends._backend = None  # pylint: disable=protected-access
+        self.assertEqual("json", json_backends.get_backend().name)